@@ -6,8 +6,22 @@ import logging
 import re
 import sys
 import io
-from flask import Flask, render_template, jsonify, send_from_directory, request
-from src.supplier_analysis.supplier_analysis import run_analysis
+import gzip
+import itertools
+from flask import Flask, Response, abort, render_template, jsonify, send_from_directory, request
+from src.supplier_analysis.instrumentation import span, start_timeline, stop_timeline, render_prometheus
+from src.supplier_analysis import token_accounting
+from src.supplier_analysis.run_state import RunStatus, StatusPublisher, create_checkpoint_store, create_run_state_store
+from src.supplier_analysis.static_assets import AssetManifest, IMMUTABLE_CACHE_CONTROL
+from src.supplier_analysis.cancellation import CHECK_INTERVAL, RunCancelled, RunControl
+from src.supplier_analysis.search_limiter import search_limiter
+from src.supplier_analysis.logging_setup import (
+    CAPTURE_LOGGER_NAME, AsyncConsoleWriter, capture_diagnostics_enabled, configure_logging)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 # Helper function to clean ANSI escape sequences
 def clean_ansi(text):
@@ -16,9 +30,45 @@ def clean_ansi(text):
         return text
     return re.sub(r'\x1B\[[0-9;]*[mK]', '', text)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging: records are queued and written to the console/log file by a listener thread
+configure_logging()
 logger = logging.getLogger(__name__)
+# Diagnostics of the log capture itself, off unless SUPPLIER_ANALYSIS_CAPTURE_DEBUG is set
+capture_logger = logging.getLogger(CAPTURE_LOGGER_NAME)
+
+# The analysis stack (crewai, duckduckgo_search, pandas) is imported on first use, so the
+# server starts and serves pages and /api/status without paying for it
+run_analysis = None
+
+def load_analysis():
+    """Import the analysis stack and return run_analysis."""
+    global run_analysis
+    if run_analysis is None:
+        with span('phase', phase='import_analysis'):
+            from src.supplier_analysis.supplier_analysis import run_analysis as imported_run_analysis
+        run_analysis = imported_run_analysis
+    return run_analysis
+
+def warm_up_analysis():
+    """Import the analysis stack and precompute the tools and inputs of both scenarios."""
+    load_analysis()
+    from src.supplier_analysis.supplier_analysis import pipeline
+    with span('phase', phase='warm_up'):
+        pipeline.warm_up()
+
+def preload_analysis():
+    """Import and warm up the analysis stack in a background thread once the server is up."""
+    def preload():
+        started = time.time()
+        try:
+            warm_up_analysis()
+            logger.info(f"Analysis stack preloaded in {time.time() - started:.2f}s")
+        except Exception as e:
+            logger.error(f"Error preloading analysis stack: {str(e)}")
+
+    thread = threading.Thread(target=preload, name='preload-analysis')
+    thread.daemon = True
+    thread.start()
 
 # Function to monitor email summary file
 def monitor_email_summary(process_status):
@@ -42,7 +92,7 @@ def monitor_email_summary(process_status):
             # If file was modified since we started monitoring
             if current_mtime > initial_mtime:
                 logger.info("Email summary file has been updated, confirming email generation")
-                process_status['logs'].append("Email has been generated and saved to email_summary.txt")
+                process_status.append_log("Email has been generated and saved to email_summary.txt")
                 
                 # Try to read the file to confirm recipient
                 try:
@@ -50,7 +100,7 @@ def monitor_email_summary(process_status):
                         first_line = f.readline().strip()
                         if 'To:' in first_line:
                             recipient = first_line.replace('To:', '').strip()
-                            process_status['logs'].append(f"Email prepared for recipient: {recipient}")
+                            process_status.append_log(f"Email prepared for recipient: {recipient}")
                             
                             # Read the entire email content
                             f.seek(0)
@@ -86,6 +136,10 @@ class UILogHandler(logging.Handler):
         self.logged_messages = set()
 
     def emit(self, record):
+        with span('ui_log_handler', timeline=False):
+            self.process_record(record)
+
+    def process_record(self, record):
         try:
             log_message = self.format(record)
             
@@ -130,87 +184,19 @@ class UILogHandler(logging.Handler):
                 
                 # Only add agent-related logs
                 if is_agent_related:
-                    self.process_status['logs'].append(log_message)
+                    self.process_status.append_log(log_message)
                     self.logged_messages.add(msg_hash)
-                
-                # Try to extract agent information to update status
-                # First, check for explicit CrewAI terminal format
-                agent_match = re.search(r"Agent:\s*([^,\n]+)", log_message)
-                status_match = re.search(r"Status:\s*(Completed|In Progress)", log_message)
-                
-                # Check specifically for completion indicators
-                is_completed = ("✓ Completed" in log_message or 
-                               "✅ Completed" in log_message or 
-                               "Status: Completed" in log_message or 
-                               "Task completed" in log_message)
-                
-                # Check specifically for working/in-progress indicators
-                is_working = ("Task: " in log_message or 
-                             "Executing Task" in log_message or 
-                             "In Progress" in log_message or
-                             "working on" in log_message.lower() or
-                             "starting task" in log_message.lower() or
-                             "analyzing" in log_message.lower() or
-                             "processing" in log_message.lower())
-                
-                if agent_match:
-                    agent_name = clean_ansi(agent_match.group(1).strip())
-                    
-                    # Default to In Progress if agent is mentioned with a task
-                    status = "Completed" if is_completed else "In Progress" if is_working else "In Progress"
-                    
-                    if status_match:
-                        status_text = status_match.group(1).strip()
-                        if "Completed" in status_text:
-                            status = "Completed"
-                    
-                    self.process_status['current_agent'] = clean_ansi(f"Agent: {agent_name}, Status: {status}")
-                    print(f"UILogHandler detected agent status: {agent_name} - {status}")
-                
-                # Also look for "Assigned to" format
-                assigned_to_match = re.search(r"Assigned to:\s*([^\n]+)", log_message)
-                if assigned_to_match:
-                    agent_name = clean_ansi(assigned_to_match.group(1).strip())
-                    # When an agent is assigned to a task, they're automatically "working"
-                    status = "Completed" if is_completed else "In Progress"
-                    self.process_status['current_agent'] = clean_ansi(f"Agent: {agent_name}, Status: {status}")
-                    print(f"UILogHandler detected assigned agent: {agent_name} - {status}")
-                
-                # Looking for generic agent names in the format "Name Name"
-                if not agent_match and not assigned_to_match:
-                    # Try to extract standalone agent names like "Demand Forecasting Specialist"
-                    agent_name_match = re.search(r"([A-Z][a-z]+ [A-Z][a-z]+ [A-Z][a-z]+|[A-Z][a-z]+ [A-Z][a-z]+)", log_message)
-                    if agent_name_match:
-                        agent_name = agent_name_match.group(1).strip()
-                        
-                        # Determine status based on the message content
-                        if is_completed:
-                            status = "Completed"
-                        elif is_working:
-                            status = "In Progress"
-                        else:
-                            # Default to working if agent is mentioned
-                            status = "In Progress"
-                        
-                        # Only update if the extracted name looks like an agent
-                        if any(agent_term in agent_name.lower() for agent_term in ['specialist', 'analyst', 'researcher', 'communication']):
-                            self.process_status['current_agent'] = clean_ansi(f"Agent: {agent_name}, Status: {status}")
-                            print(f"UILogHandler detected agent name in text: {agent_name} - {status}")
-                
-                # Also pass through anything that looks like it might be agent-related
-                if 'agent' in log_message.lower() or 'task' in log_message.lower() or 'crew' in log_message.lower():
-                    self.process_status['current_agent'] = log_message
             
             # Check for email-related logs
             if 'email' in log_message.lower():
                 # Highlight email logs more prominently
                 if 'sent' in log_message.lower() and ('success' in log_message.lower() or 'completed' in log_message.lower()):
-                    self.process_status['logs'].append(f"✅ EMAIL SENT: {log_message}")
+                    self.process_status.append_log(f"✅ EMAIL SENT: {log_message}")
                 elif 'fail' in log_message.lower() or 'error' in log_message.lower():
-                    self.process_status['logs'].append(f"❌ EMAIL ERROR: {log_message}")
+                    self.process_status.append_log(f"❌ EMAIL ERROR: {log_message}")
                 elif 'capgemini.com' in log_message.lower():
                     # Only add meaningful email logs
-                    self.process_status['logs'].append(f"📧 EMAIL: {log_message}")
+                    self.process_status.append_log(f"📧 EMAIL: {log_message}")
 
             # If we found a message that contains an email JSON string, format it for better readability
             if log_message.startswith("{\"recipient\":"):
@@ -247,19 +233,39 @@ class UILogHandler(logging.Handler):
                 except Exception as e:
                     logger.error(f"Error formatting email: {str(e)}")
         except Exception as e:
-            print(f"Error in UILogHandler: {str(e)}")
+            capture_logger.error(f"Error in UILogHandler: {str(e)}")
 
 app = Flask(__name__, 
             static_folder='frontend',
             template_folder='frontend')
 
-# Global variables to track process status
-process_status = {
-    'status': 'idle',  # 'idle', 'running', 'completed', 'error'
-    'logs': [],
-    'current_agent': None,
-    'result': None
-}
+# Fingerprinted CSS/JS, built at startup; templates reference them with asset_url('css/styles.css')
+static_assets = AssetManifest(os.path.join(app.root_path, 'frontend')).build()
+app.jinja_env.globals['asset_url'] = static_assets.url
+
+# Global run status ('idle', 'running', 'completed', 'error'), safe to update from any thread
+process_status = RunStatus()
+
+# Shared run state for multi-process serving (SUPPLIER_ANALYSIS_STATE_DB). When set, web
+# workers only enqueue runs and read status, and `python app.py --worker` processes execute them.
+# Without it all state stays in process_status above.
+shared_state = create_run_state_store()
+
+# Task outputs saved as each task finishes, so failed or cancelled runs can be resumed
+checkpoints = create_checkpoint_store()
+
+# Control of the in-process run, used by the cancel endpoint; ids of in-process runs continue
+# after the last checkpointed run, so checkpoints of earlier server processes keep their ids.
+# The lock makes starting a run and publishing its control one step for the cancel endpoint.
+active_control = None
+active_control_lock = threading.Lock()
+run_ids = itertools.count(checkpoints.last_run_id() + 1)
+
+# Monitoring scheduler of this process, see start_monitor()
+monitor = None
+
+# Time a cancelled analysis gets to unwind from its next checkpoint before it is abandoned
+CANCEL_GRACE_SECONDS = 5
 
 # Function for real-time log capturing
 def capture_logs(process_status):
@@ -293,15 +299,21 @@ class StdoutCapture:
         self.process_status = process_status
         self.logged_messages = set()
         self.original_stdout = sys.stdout
+        self.console = None
         self.buffer = ""
         self.current_tree = []
         self.processing_tree = False
         
     def start(self):
+        # Console echo happens on a writer thread so capturing never waits on the terminal
+        self.console = AsyncConsoleWriter(self.original_stdout)
         sys.stdout = self
         
     def stop(self):
         sys.stdout = self.original_stdout
+        if self.console:
+            self.console.close()
+            self.console = None
         # Process any remaining buffer
         if self.buffer:
             self.process_output(self.buffer)
@@ -310,8 +322,12 @@ class StdoutCapture:
             self.extract_status_from_tree(self.current_tree)
         
     def write(self, text):
+        with span('stdout_capture', timeline=False):
+            self.process_text(text)
+
+    def process_text(self, text):
         # Write to the original stdout to maintain console output
-        self.original_stdout.write(text)
+        (self.console or self.original_stdout).write(text)
         
         # Add to buffer for processing complete lines
         self.buffer += text
@@ -339,17 +355,12 @@ class StdoutCapture:
                         self.process_output(line)
             
     def flush(self):
-        self.original_stdout.flush()
+        # The console writer flushes after each batch it writes
+        if not self.console:
+            self.original_stdout.flush()
     
     def extract_status_from_tree(self, lines):
-        """Process a multi-line CrewAI tree output to extract agent statuses"""
-        # Reset for a fresh process
-        self.current_processing = {
-            'current_agent': None,
-            'current_task': None,
-            'current_status': None
-        }
-        
+        """Add a multi-line CrewAI tree output to the logs (agent statuses come from the crew's events)"""
         # Clean all lines from ANSI escape sequences
         cleaned_lines = []
         for line in lines:
@@ -363,110 +374,14 @@ class StdoutCapture:
         full_tree = "\n".join(lines)
         if full_tree.strip():
             # Add to logs as a single entry for easier parsing by frontend
-            self.process_status['logs'].append(full_tree)
-            self.original_stdout.write(f"Added complete tree structure to logs ({len(lines)} lines)\n")
-            
-            # Also extract individual agent/status pairs from the tree
-            # This is the most reliable way to get agent statuses
-            for agent_name in [
-                "Demand Forecasting Specialist", 
-                "Availability Analyst", 
-                "Alternative Supplier Researcher", 
-                "Supplier Performance Analyst", 
-                "Communication Specialist"
-            ]:
-                # Look for completed status indicators
-                if (f"Assigned to: {agent_name}" in full_tree and 
-                    ("Status: ✅ Completed" in full_tree or 
-                     "Status: ✓ Completed" in full_tree or 
-                     "Status: Completed" in full_tree)):
-                    
-                    # Add explicit status update
-                    self.process_status['current_agent'] = clean_ansi(f"Agent: {agent_name}, Status: Completed")
-                    self.original_stdout.write(f"TREE EXTRACTION: {agent_name} -> Completed\n")
-                    
-                # Look for in-progress status indicators
-                elif (f"Assigned to: {agent_name}" in full_tree and 
-                      ("Status: In Progress" in full_tree or 
-                       "Status: Executing Task..." in full_tree)):
-                    
-                    # Add explicit status update
-                    self.process_status['current_agent'] = clean_ansi(f"Agent: {agent_name}, Status: In Progress")
-                    self.original_stdout.write(f"TREE EXTRACTION: {agent_name} -> In Progress\n")
-        
-        # Debug the extracted tree line by line
-        for i, line in enumerate(lines):
-            self.original_stdout.write(f"Tree line {i}: {line}\n")
-            
-            # Look for task assignments
-            task_match = re.search(r"Task:\s*([a-f0-9-]+)", line)
-            if task_match:
-                self.current_processing['current_task'] = task_match.group(1).strip()
-                self.original_stdout.write(f"Found task: {self.current_processing['current_task']}\n")
-                continue
-            
-            # Look for agent assignments
-            assigned_to_match = re.search(r"Assigned to:\s*([^\n]+)", line)
-            if assigned_to_match:
-                agent_name = clean_ansi(assigned_to_match.group(1).strip())
-                self.current_processing['current_agent'] = agent_name
-                self.original_stdout.write(f"Found agent assignment: {agent_name}\n")
-                
-                # When an agent is assigned, it is automatically "working" unless specified otherwise
-                self.process_status['current_agent'] = clean_ansi(f"Agent: {agent_name}, Status: In Progress")
-                self.original_stdout.write(f"Setting assigned agent to working: {agent_name}\n")
-                
-                # Check the next few lines for status information
-                status_line_index = i + 1
-                while status_line_index < min(i + 5, len(lines)):
-                    status_line = lines[status_line_index]
-                    if "Status:" in status_line:
-                        if "Completed" in status_line or "✅" in status_line or "✓" in status_line:
-                            self.process_status['current_agent'] = clean_ansi(f"Agent: {agent_name}, Status: Completed")
-                            self.original_stdout.write(f"NEARBY STATUS: Setting {agent_name} to Completed\n")
-                        elif "In Progress" in status_line or "Executing" in status_line:
-                            self.process_status['current_agent'] = clean_ansi(f"Agent: {agent_name}, Status: In Progress")
-                            self.original_stdout.write(f"NEARBY STATUS: Setting {agent_name} to In Progress\n")
-                        break
-                    status_line_index += 1
-                continue
-            
-            # Look for agent declarations
-            agent_match = re.search(r"Agent:\s*([^\n]+)", line)
-            if agent_match and not line.strip().startswith('│'): # Only match main agent line, not indented ones
-                agent_name = clean_ansi(agent_match.group(1).strip())
-                self.current_processing['current_agent'] = agent_name
-                self.original_stdout.write(f"Found agent declaration: {agent_name}\n")
-                
-                # Default agent to working when mentioned, unless status is specified
-                if not re.search(r"Status:", line):
-                    self.process_status['current_agent'] = clean_ansi(f"Agent: {agent_name}, Status: In Progress")
-                    self.original_stdout.write(f"Setting declared agent to working: {agent_name}\n")
-                continue
-            
-            # Look for status indicators - IMPORTANT: Only update current agent's status
-            status_match = re.search(r"Status:\s*([^\n]+)", line)
-            current_agent = self.current_processing.get('current_agent')
-            
-            if status_match and current_agent:
-                status_text = status_match.group(1).strip()
-                self.original_stdout.write(f"Found status for {current_agent}: {status_text}\n")
-                
-                # Process different status types
-                if re.search(r"(?:[✓|✅]\s*)?[Cc]ompleted", status_text):
-                    # We found a completed agent
-                    self.process_status['current_agent'] = clean_ansi(f"Agent: {current_agent}, Status: Completed")
-                    self.original_stdout.write(f"COMPLETION MARKER found for agent: {current_agent}\n")
-                elif re.search(r"Executing Task|In Progress|Working|processing|thinking", status_text, re.IGNORECASE):
-                    # We found an executing/working/in-progress agent
-                    self.process_status['current_agent'] = clean_ansi(f"Agent: {current_agent}, Status: In Progress")
-                    self.original_stdout.write(f"Detected in-progress agent from tree: {current_agent}\n")
-                continue
+            self.process_status.append_log(full_tree)
+            if capture_diagnostics_enabled():
+                capture_logger.debug(f"Added complete tree structure to logs ({len(lines)} lines)")
         
         # Add each line individually as well to ensure the frontend can parse them
         for line in lines:
             if line.strip():
-                self.process_status['logs'].append(line)
+                self.process_status.append_log(line)
                 self.logged_messages.add(line.strip())
         
     def process_output(self, text):
@@ -508,92 +423,8 @@ class StdoutCapture:
             # Only add agent-related logs
             if is_agent_related:
                 # Add to process status logs
-                self.process_status['logs'].append(text)
+                self.process_status.append_log(text)
                 self.logged_messages.add(msg_hash)
-            
-            # Try to extract agent and status info
-            # Check for CrewAI output in original format with emojis
-            if '🤖 Agent:' in text or 'Agent:' in text:
-                agent_match = re.search(r"Agent:\s*([^\n,]+)", text)
-                status_match = re.search(r"Status:\s*(Completed|In Progress|✅ Completed|✓ Completed)", text)
-                
-                if agent_match:
-                    agent_name = agent_match.group(1).strip()
-                    
-                    # Default status is "working" unless a status is specified
-                    status = "In Progress"
-                    
-                    # Check completion indicators first - prioritize completion detection
-                    if "✓ Completed" in text or "✅ Completed" in text or "Task complete" in text or "Task completed" in text:
-                        status = "Completed"
-                        self.original_stdout.write(f"COMPLETION DETECTED for agent {agent_name}\n")
-                    # Then check for status match
-                    elif status_match:
-                        status = status_match.group(1).strip()
-                        
-                        # Clean up the status
-                        if "✅" in status or "✓" in status or "Completed" in status or "completed" in status:
-                            status = "Completed"
-                            self.original_stdout.write(f"COMPLETION DETECTED via status for agent {agent_name}\n")
-                    
-                    # More explicit completion checks
-                    if re.search(r"completed|done|finished|finalized", text, re.IGNORECASE) and not re.search(r"task not completed", text, re.IGNORECASE):
-                        status = "Completed"
-                        self.original_stdout.write(f"COMPLETION DETECTED via regex for agent {agent_name}\n")
-                    
-                    # Only check for In Progress indicators if we haven't found a Completed status
-                    if status != "Completed" and ("In Progress" in text or "Executing" in text or "Thinking" in text):
-                        status = "In Progress"
-                        self.original_stdout.write(f"Setting agent to In Progress based on keywords: {agent_name}\n")
-                    
-                    # Update current agent status
-                    self.process_status['current_agent'] = clean_ansi(f"Agent: {agent_name}, Status: {status}")
-                    self.original_stdout.write(f"Captured agent info: Agent {agent_name} with status {status}\n")
-            
-            # Check for CrewAI tree format elements
-            if 'Task:' in text or 'Assigned to:' in text:
-                assigned_to_match = re.search(r"Assigned to:\s*([^\n]+)", text)
-                status_completed = re.search(r"Status:\s*(?:[✓|✅]\s*)?Completed", text) or "✓ Completed" in text
-                status_executing = "Status: Executing Task" in text or "Status: In Progress" in text
-                
-                if assigned_to_match:
-                    agent_name = assigned_to_match.group(1).strip()
-                    
-                    # When an agent is assigned to a task, it should be marked as working unless completed
-                    status = "Completed" if status_completed else "In Progress"
-                    
-                    # Update current agent status
-                    self.process_status['current_agent'] = clean_ansi(f"Agent: {agent_name}, Status: {status}")
-                    self.original_stdout.write(f"Captured tree format element: Agent {agent_name} with status {status}\n")
-            
-            # Check standalone task completion messages
-            if "Task complete" in text or "Task completed" in text:
-                # Try to extract agent name
-                agent_match = re.search(r"Agent:\s*([^\n,]+)", text)
-                if agent_match:
-                    agent_name = agent_match.group(1).strip()
-                    # Update current agent status
-                    self.process_status['current_agent'] = clean_ansi(f"Agent: {agent_name}, Status: Completed")
-                    self.original_stdout.write(f"Captured task completion: Agent {agent_name} completed\n")
-            
-            # Check standalone "Thinking..." messages which indicate an agent is working
-            if "Thinking..." in text:
-                # Try to extract agent name from nearby context
-                agent_match = re.search(r"Agent:\s*([^\n,]+)", text)
-                if agent_match:
-                    agent_name = agent_match.group(1).strip()
-                    # Update current agent status to working
-                    self.process_status['current_agent'] = clean_ansi(f"Agent: {agent_name}, Status: In Progress")
-                    self.original_stdout.write(f"Captured agent thinking (in progress): {agent_name}\n")
-            
-            # Check for any generic agent-task assignments or start indicators
-            if "starting" in text.lower() or "beginning" in text.lower() or "initializing" in text.lower():
-                agent_match = re.search(r"Agent:\s*([^\n,]+)", text) or re.search(r"([A-Z][a-z]+ [A-Z][a-z]+ [A-Z][a-z]+|[A-Z][a-z]+ [A-Z][a-z]+)", text)
-                if agent_match:
-                    agent_name = agent_match.group(1).strip()
-                    # Update current agent status to working
-                    self.process_status['current_agent'] = clean_ansi(f"Agent: {agent_name}, Status: In Progress")
-                    self.original_stdout.write(f"Captured agent starting work: {agent_name}\n")
 
 @app.route('/')
 def index():
@@ -616,19 +447,106 @@ def initiate_demand_page():
     # Rendert die neue Seite für die Demand Initiation
     return render_template('demand_initiation.html')
 
+@app.route('/assets/<path:filename>')
+def serve_asset(filename):
+    """Serve a fingerprinted asset from memory, precompressed, with immutable cache headers."""
+    asset = static_assets.encoded(filename, request.accept_encodings)
+    if asset is None:
+        abort(404)
+    body, encoding, mimetype = asset
+    response = Response(body, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 @app.route('/<path:path>')
 def serve_static(path):
     """Serve static files from the frontend directory."""
     return send_from_directory('frontend', path)
 
+# /api/status bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+
+# Serialized status per state version; ETags are prefixed with a per-process id so they
+# never match a response from an earlier server process
+BOOT_ID = f"{os.getpid():x}{int(time.time()):x}"
+status_cache = {'key': None, 'etag': None, 'body': None, 'encoded': {}}
+status_cache_lock = threading.Lock()
+status_versions = itertools.count(1)
+
+def status_fingerprint():
+    """Cheap key that changes whenever the served status does: the store version plus the live timeline and LLM calls."""
+    return (process_status.version, len(process_status['timeline']), token_accounting.run_call_count())
+
+def status_snapshot():
+    """Return the cache entry (etag, serialized body) for the current status, rebuilding it only on change."""
+    if shared_state is not None:
+        key = tuple(shared_state.latest_version() or (0, 0))
+    else:
+        key = status_fingerprint()
+    with status_cache_lock:
+        if key == status_cache['key']:
+            return status_cache.copy()
+
+    if shared_state is not None:
+        response_data = shared_state.latest_status()
+        version = f"{key[0]}.{key[1]}"
+        etag = version
+    else:
+        response_data = process_status.snapshot()
+        if response_data['status'] == 'running':
+            response_data['token_usage'] = token_accounting.current_usage()
+        version = next(status_versions)
+        etag = f"{BOOT_ID}-{version}"
+    # The version replaces the former per-request timestamp, so unchanged state serializes identically
+    response_data['version'] = version
+    body = json.dumps(response_data, default=str).encode('utf-8')
+
+    with status_cache_lock:
+        status_cache.update({'key': key, 'etag': etag, 'body': body, 'encoded': {}})
+        return status_cache.copy()
+
+def encode_status_body(entry):
+    """Pick brotli or gzip from Accept-Encoding for large bodies; compressed bodies are cached per version."""
+    body = entry['body']
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        encoding = 'br'
+    elif accepted['gzip']:
+        encoding = 'gzip'
+    else:
+        return body, None
+    encoded = entry['encoded'].get(encoding)
+    if encoded is None:
+        encoded = brotli.compress(body, quality=5) if encoding == 'br' else gzip.compress(body, compresslevel=5)
+        # entry['encoded'] is the dict shared with status_cache for this version
+        entry['encoded'][encoding] = encoded
+    return encoded, encoding
+
 @app.route('/api/status')
 def get_status():
-    """Return the current process status."""
+    """Return the current process status.
+
+    Responses carry an ETag per state version; polls sending a matching If-None-Match get a 304.
+    """
     try:
-        # Add timestamp to force client to recognize it as fresh data
-        response_data = process_status.copy()
-        response_data['timestamp'] = time.time()
-        return jsonify(response_data)
+        entry = status_snapshot()
+        if request.if_none_match.contains(entry['etag']):
+            response = Response(status=304)
+        else:
+            body, encoding = encode_status_body(entry)
+            response = Response(body, mimetype='application/json')
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(entry['etag'])
+        # Browsers revalidate on every poll and reuse their cached copy on 304
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
     except Exception as e:
         logger.error(f"Error in status endpoint: {str(e)}")
         return jsonify({
@@ -637,44 +555,174 @@ def get_status():
             'timestamp': time.time()
         }), 500
 
+@app.route('/api/metrics')
+def get_metrics():
+    """Expose span duration histograms, LLM usage and web search counters in the Prometheus text format."""
+    metrics = render_prometheus() + token_accounting.render_prometheus() + search_limiter.render_prometheus()
+    return Response(metrics, mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/run', methods=['POST'])
 def run_demo():
     """Run the analysis demo."""
     try:
-        # Don't run if already running
-        if process_status['status'] == 'running':
-            return jsonify({'error': 'Process is already running'}), 400
-
         # Get scenario from request body (default to 'standard')
         request_data = request.get_json() or {}
         scenario = request_data.get('scenario', 'standard') # 'standard' oder 'limited'
         logger.info(f"Received run request for scenario: {scenario}")
+        return start_run(scenario)
+    except Exception as e:
+        logger.error(f"Error starting demo: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
 
-        # Reset status
-        process_status.update({
-            'status': 'running',
-            'logs': [],
-            'current_agent': None,
-            'result': None,
-            'scenario': scenario # Store scenario in status
-        })
+@app.route('/api/runs/<int:run_id>/resume', methods=['POST'])
+def resume_run(run_id):
+    """Start a new run continuing a failed or cancelled run from its first incomplete task."""
+    try:
+        scenario = checkpoints.run_scenario(run_id)
+        if scenario is None:
+            return jsonify({'error': f'No checkpoints saved for run {run_id}'}), 404
+        logger.info(f"Received request to resume run {run_id} ({scenario} scenario)")
+        return start_run(scenario, resume_from=run_id)
+    except Exception as e:
+        logger.error(f"Error resuming run {run_id}: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+def start_run(scenario, resume_from=None):
+    """Start (or with shared state, enqueue) a run unless one is already running."""
+    run_id = launch_run(scenario, resume_from)
+    if run_id is None:
+        return jsonify({'error': 'Process is already running'}), 400
+    return jsonify({'status': 'started', 'run_id': run_id})
+
+def launch_run(scenario, resume_from=None):
+    """Start or enqueue a run and return its id, or None if a run is already running."""
+    # With shared state an analysis worker picks the run up
+    if shared_state is not None:
+        return shared_state.enqueue_run(scenario, resume_from)
+
+    # Reset status, unless a run is already running; a cancel request sees the run and its control together
+    global active_control
+    run_id = next(run_ids)
+    control = RunControl()
+    with active_control_lock:
+        if not process_status.begin_run({'scenario': scenario, 'run_id': run_id, 'resumed_from': resume_from}):
+            return None
+        active_control = control
 
-        # Start the analysis in a separate thread, passing the scenario
-        thread = threading.Thread(target=run_demo_thread, args=(scenario,)) # Pass scenario to thread
-        thread.daemon = True
-        thread.start()
+    # Start the analysis in a separate thread, passing the scenario
+    thread = threading.Thread(target=run_demo_thread, args=(scenario, control, resume_from))
+    thread.daemon = True
+    thread.start()
+    return run_id
 
-        return jsonify({'status': 'started'})
+def trigger_monitored_run(scenario, reason):
+    """Start a run for a condition the monitoring scheduler found."""
+    logger.info(f"Monitoring triggered a {scenario} run: {reason}")
+    return launch_run(scenario)
+
+def start_monitor(background=True):
+    """Run the monitoring scheduler in this process if it is enabled, in a thread unless ``background`` is False."""
+    global monitor
+    load_analysis()
+    from src.supplier_analysis.monitoring import create_monitor, monitoring_enabled
+    if not monitoring_enabled():
+        logger.info("Monitoring is disabled")
+        return
+    monitor = create_monitor(trigger_monitored_run)
+    if background:
+        monitor.start()
+    else:
+        monitor.run_forever()
+
+@app.route('/api/monitor')
+def get_monitor():
+    """Monitoring scheduler settings, counters and the conditions of each tracked part."""
+    if monitor is None:
+        return jsonify({'running': False})
+    return jsonify(monitor.status())
+
+@app.route('/api/runs/<int:run_id>/cancel', methods=['POST'])
+def cancel_run(run_id):
+    """Cancel a queued or running analysis. A running one stops at its next checkpoint and keeps its partial results."""
+    try:
+        if shared_state is not None:
+            status = shared_state.request_cancel(run_id)
+        else:
+            with active_control_lock:
+                status = process_status['status'] if process_status.get('run_id') == run_id else None
+                control = active_control
+            if status == 'running' and control is not None:
+                control.cancel()
+                status = 'cancelling'
+
+        if status is None:
+            return jsonify({'error': f'Unknown run {run_id}'}), 404
+        if status not in ('cancelling', 'cancelled'):
+            return jsonify({'error': f'Run {run_id} is not running', 'status': status}), 409
+        logger.info(f"Cancellation requested for run {run_id}")
+        return jsonify({'status': status, 'run_id': run_id}), 202
     except Exception as e:
-        logger.error(f"Error starting demo: {str(e)}")
+        logger.error(f"Error cancelling run {run_id}: {str(e)}")
         return jsonify({
             'status': 'error',
             'error': str(e)
         }), 500
 
-def run_demo_thread(scenario='standard'): # Add scenario parameter with default
+def run_analysis_until_done(scenario, control, resume_from=None):
+    """Run the analysis in its own thread while watching the run's cancellation flag and deadlines.
+
+    Raises RunCancelled once the run is cancelled or timed out. The analysis gets
+    CANCEL_GRACE_SECONDS to unwind from its next checkpoint; after that it is abandoned, so a
+    hanging LLM call cannot hold the run slot.
+    """
+    analysis = load_analysis()
+    run_id = process_status.get('run_id')
+    outcome = {}
+
+    def record_task_result(output):
+        # Ignore tasks an abandoned analysis finishes after the next run started
+        if process_status.get('run_id') == run_id:
+            process_status.add_task_result(output.name, output.agent, output.raw)
+
+    def target():
+        try:
+            # Agent transitions from the crew's events feed the per-agent status map
+            outcome['result'] = analysis(scenario=scenario, task_callback=record_task_result,
+                                         agent_status_callback=process_status.set_agent_status, control=control,
+                                         run_id=run_id, checkpoints=checkpoints, resume_from=resume_from,
+                                         memoize=os.environ.get('SUPPLIER_ANALYSIS_MEMO', '1') != '0')
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, name=f'analysis-{run_id}', daemon=True)
+    thread.start()
+    while thread.is_alive() and not control.cancelled:
+        thread.join(CHECK_INTERVAL)
+        control.check_deadlines()
+    if control.cancelled:
+        thread.join(CANCEL_GRACE_SECONDS)
+        if thread.is_alive():
+            logger.warning(f"Analysis did not stop within {CANCEL_GRACE_SECONDS} seconds, abandoning it")
+
+    if 'result' in outcome:
+        return outcome['result']
+    if control.cancelled:
+        raise RunCancelled(control.status, control.reason)
+    raise outcome['error']
+
+def run_demo_thread(scenario='standard', control=None, resume_from=None): # Add scenario parameter with default
     """Run the analysis demo in a separate thread."""
-    global process_status
+    control = control or RunControl()
+    # Collect the per-run span timeline; the list is filled live while the run progresses
+    process_status.update(timeline=start_timeline())
+    token_accounting.start_run()
+    stdout_capture = None
     try:
         # Log simulation thread
         log_thread = threading.Thread(target=capture_logs, args=(process_status,))
@@ -692,10 +740,7 @@ def run_demo_thread(scenario='standard'): # Add scenario parameter with default
 
         # Run the actual analysis, passing the scenario
         print(f"Starting analysis for scenario '{scenario}' with CrewAI agents...")
-        result = run_analysis(scenario=scenario) # Pass scenario to run_analysis
-
-        # Stop stdout capture
-        stdout_capture.stop()
+        result = run_analysis_until_done(scenario, control, resume_from)
 
         # Update process status
         process_status.update({
@@ -705,6 +750,19 @@ def run_demo_thread(scenario='standard'): # Add scenario parameter with default
 
         # Ensure log contains email confirmation
         logger.info(f"Email has been sent with analysis results ({scenario} scenario)")
+    except RunCancelled as e:
+        # Agents still working when the run stopped are marked as cancelled, unless their task
+        # finished just before; finished tasks keep their results
+        task_results = process_status['task_results'] or []
+        finished_agents = {entry['agent'] for entry in task_results}
+        for agent, entry in (process_status['agents'] or {}).items():
+            if entry['status'] == 'In Progress':
+                process_status.set_agent_status(agent, 'Completed' if agent in finished_agents else 'Cancelled')
+        completed = [entry['task'] for entry in task_results]
+        process_status.update({
+            'status': e.status,
+            'result': f"Analysis ({scenario} scenario) stopped: {e.reason}. Completed tasks: {', '.join(completed) or 'none'}"
+        })
     except Exception as e:
         # Update process status on error
         error_msg = f"Error in {scenario} scenario: {str(e)}"
@@ -713,7 +771,58 @@ def run_demo_thread(scenario='standard'): # Add scenario parameter with default
             'status': 'error',
             'result': error_msg
         })
+    finally:
+        # Release the capture hooks however the run ended
+        if stdout_capture is not None:
+            stdout_capture.stop()
+        stop_timeline()
+        # Store the token and cost rollup with the finished run
+        process_status.update(token_usage=token_accounting.stop_run())
+
+def run_worker(poll_interval=1.0):
+    """Execute queued runs from the shared state store, one at a time, publishing their status."""
+    if shared_state is None:
+        raise RuntimeError("SUPPLIER_ANALYSIS_STATE_DB must be set to run an analysis worker")
+    warm_up_analysis()
+    logger.info(f"Analysis worker {os.getpid()} waiting for runs in {shared_state.path}")
+    while True:
+        claimed = shared_state.claim_next_run()
+        if claimed is None:
+            time.sleep(poll_interval)
+            continue
+        run_id, scenario, resume_from = claimed
+        logger.info(f"Worker {os.getpid()} claimed run {run_id} ({scenario} scenario)")
+        process_status.begin_run({'scenario': scenario, 'run_id': run_id, 'resumed_from': resume_from})
+        control = RunControl()
+        publisher = StatusPublisher(shared_state, run_id, process_status, control=control,
+                                    extra=lambda: {'token_usage': token_accounting.current_usage()}).start()
+        try:
+            run_demo_thread(scenario, control, resume_from)
+        finally:
+            publisher.stop()
 
 if __name__ == '__main__':
+    if '--worker' in sys.argv[1:]:
+        run_worker()
+        sys.exit(0)
+    if '--monitor' in sys.argv[1:]:
+        # Standalone scheduler enqueueing runs for the analysis workers
+        if shared_state is None:
+            raise RuntimeError("SUPPLIER_ANALYSIS_STATE_DB must be set to run the monitor on its own")
+        os.environ.setdefault('SUPPLIER_ANALYSIS_MONITOR', '1')
+        start_monitor(background=False)
+        sys.exit(0)
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True) 
\ No newline at end of file
+    # The development server runs in one process; several web processes need a WSGI server
+    if int(os.environ.get('WEB_PROCESSES', 1)) > 1:
+        raise RuntimeError("WEB_PROCESSES is no longer supported, serve app:app with a WSGI server instead, "
+                           "e.g. gunicorn -w 4 -b 0.0.0.0:5000 app:app (with SUPPLIER_ANALYSIS_STATE_DB set)")
+    # With the debug reloader only the serving child process (WERKZEUG_RUN_MAIN) should preload;
+    # with shared state the analysis workers import the stack instead
+    if (shared_state is None and os.environ.get('SUPPLIER_ANALYSIS_PRELOAD', '1') != '0'
+            and os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        preload_analysis()
+    # The monitoring scheduler runs in the serving process; with shared state use --monitor
+    if shared_state is None and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        threading.Thread(target=start_monitor, name='start-monitor', daemon=True).start()
+    app.run(host='0.0.0.0', port=port, debug=True)
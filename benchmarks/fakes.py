@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import re
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from crewai import LLM
+from litellm import Usage
+
+# Canned tool inputs the fake LLM uses the first time an agent has tools available
+TOOL_INPUTS = {
+    'search_market_trends': {'query': 'SMC pneumatic valve demand forecast trend'},
+    'search_suppliers': {'query': 'VQC4101-51 SMC valve supplier price'},
+    'allocate_order': {'quantity': 120},
+    'send_email': {'input_dict': {
+        'recipient': 'agenticai.capgemini@gmail.com',
+        'subject': 'Executive Summary: Supply Chain Risk Assessment - VQC4101-51 SMC Valve',
+        'body': '**Supply Chain Status**\n- Benchmark run, all figures are synthetic.',
+    }},
+}
+
+FINAL_ANSWERS = {
+    'Demand Forecasting Specialist': 'Forecast: 45 units/month for the next 3 months. Reorder 120 units now. Safety stock 7 units.',
+    'Availability Analyst': 'Supplier availability reviewed against the database.',
+    'Alternative Supplier Researcher': 'Alternative suppliers listed from search results with fetched prices.',
+    'Supplier Performance Analyst': 'Ranked suppliers by lead time, price and quality.',
+    'Communication Specialist': 'Executive summary sent to agenticai.capgemini@gmail.com.',
+}
+
+
+class FakeLLM(LLM):
+    """Deterministic LLM for benchmarks.
+
+    Each agent with tools calls its first tool once with canned input, then every
+    agent returns a canned final answer. ``latency`` simulates model response time.
+    """
+
+    def __init__(self, latency=0.0, model="fake-benchmark-llm"):
+        super().__init__(model=model)
+        self.latency = latency
+        self.call_times = []
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        self.call_times.append(time.perf_counter())
+        if self.latency:
+            time.sleep(self.latency)
+        if isinstance(messages, str):
+            messages = [{'role': 'user', 'content': messages}]
+
+        prompt = "\n".join(m['content'] for m in messages)
+        response = self._respond(prompt, messages)
+
+        # Report usage like CrewAI does for real models, approximating tokens from text length
+        usage = Usage(prompt_tokens=len(prompt) // 4, completion_tokens=len(response) // 4,
+                      total_tokens=(len(prompt) + len(response)) // 4)
+        for callback in callbacks or []:
+            if hasattr(callback, 'log_success_event'):
+                callback.log_success_event(kwargs={}, response_obj={'usage': usage}, start_time=0, end_time=0)
+        return response
+
+    def _respond(self, prompt, messages):
+        role_match = re.search(r"You are (.+?)\.", prompt)
+        role = role_match.group(1) if role_match else ''
+        tools_match = re.search(r"only one name of \[([^\]]*)\]", prompt)
+        has_observation = any(m['role'] == 'assistant' for m in messages)
+
+        if tools_match and not has_observation:
+            tool_name = tools_match.group(1).split(',')[0].strip()
+            return (f"Thought: I need more information\nAction: {tool_name}\n"
+                    f"Action Input: {json.dumps(TOOL_INPUTS.get(tool_name, {}))}")
+        return f"Thought: I now can give a great answer\nFinal Answer: {FINAL_ANSWERS.get(role, 'Done.')}"
+
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply("220 localhost SMTP sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply("250-localhost")
+                self.reply("250 AUTH PLAIN LOGIN")
+            elif verb == 'AUTH':
+                self.reply("235 Authentication successful")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                message = []
+                for data_line in self.rfile:
+                    if data_line in (b".\r\n", b".\n"):
+                        break
+                    message.append(data_line)
+                self.server.messages.append(b"".join(message))
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Local SMTP server that accepts any login and keeps the delivered messages in memory."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), _SMTPSinkHandler)
+        self.messages = []
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class _PageServerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        host = self.headers.get('Host', '')
+        with server.lock:
+            server.requests += 1
+            server.in_flight[host] = server.in_flight.get(host, 0) + 1
+            server.max_in_flight[host] = max(server.max_in_flight.get(host, 0), server.in_flight[host])
+        try:
+            self._respond()
+        except ConnectionError:
+            pass  # the client stopped reading: size limit, timeout or all markers found
+        finally:
+            with server.lock:
+                server.in_flight[host] -= 1
+
+    def _respond(self):
+        name = self.path.strip('/').split('?')[0]
+        if name == 'slow':
+            time.sleep(self.server.slow_seconds)
+            name = 'text_offer.html'
+        if name == 'large':
+            # A valid page without markers that keeps going well past any sane size limit
+            filler = b'<p>' + b'Datasheet and CAD downloads. ' * 30 + b'</p>\n'
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(filler) * 20000))
+            self.end_headers()
+            for _ in range(20000):
+                self.wfile.write(filler)
+            return
+        body = self.server.pages.get(name)
+        if body is None:
+            self.send_error(404)
+            return
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.server.not_modified += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class PageServer(ThreadingHTTPServer):
+    """Local keep-alive HTTP server for canned supplier pages, with ETag revalidation.
+
+    Serves the files of ``page_dir`` by name plus ``/slow`` (a page after ``slow_seconds``)
+    and ``/large`` (an oversized page), and counts requests, 304 answers and the peak
+    number of requests in flight per Host header.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, page_dir, host='127.0.0.1', port=0, slow_seconds=2.0):
+        super().__init__((host, port), _PageServerHandler)
+        self.pages = {}
+        for name in os.listdir(page_dir):
+            with open(os.path.join(page_dir, name), 'rb') as f:
+                self.pages[name] = f.read()
+        self.slow_seconds = slow_seconds
+        self.lock = threading.Lock()
+        self.requests = self.not_modified = 0
+        self.in_flight, self.max_in_flight = {}, {}
+
+    def url(self, name, host=None):
+        return f"http://{host or self.server_address[0]}:{self.server_address[1]}/{name}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,383 @@
+"""End-to-end benchmarks for the supplier analysis pipeline.
+
+Runs ``run_analysis`` for both scenarios and drives the Flask API with a deterministic
+fake LLM, the fixture search provider and a local SMTP sink, so no network access or
+API key is needed. Results are printed as JSON and can be stored as baselines:
+
+    python -m benchmarks.run_benchmarks --save baseline
+    python -m benchmarks.run_benchmarks --compare baseline --tolerance 0.25
+
+With ``--cassette`` the pipeline benchmark also replays a recorded run (see cassette.py)
+instead of using the fake LLM and the fixtures:
+
+    python -m benchmarks.run_benchmarks --cassette run.json --replay-latency zero
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from functools import partial
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCHMARK_DIR)
+BASELINE_DIR = os.path.join(BENCHMARK_DIR, 'baselines')
+SEARCH_FIXTURES = os.path.join(BENCHMARK_DIR, 'fixtures', 'search_results.json')
+PAGE_FIXTURES = os.path.join(BENCHMARK_DIR, 'fixtures', 'pages')
+EMAIL_SUMMARY_PATH = os.path.join(PROJECT_ROOT, 'src', 'supplier_analysis', 'email_summary.txt')
+SCENARIOS = ('standard', 'limited')
+
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault('OTEL_SDK_DISABLED', 'true')
+os.environ.setdefault('CREWAI_DISABLE_TELEMETRY', 'true')
+
+from benchmarks.fakes import FakeLLM, PageServer, SMTPSink  # noqa: E402
+
+# Synthetic CrewAI console output used to measure log capture throughput
+SAMPLE_OUTPUT = """# Agent: Demand Forecasting Specialist
+## Task: Analyze the demand patterns for VQC4101-51 SMC 5/2-Wegeventil valve
+🚀 Crew: crew
+├── 📋 Task: 3f0c2a9e-1b7d-4c55-9a1e-{n:012d}
+│   Assigned to: Demand Forecasting Specialist
+│   Status: Executing Task...
+│   └── 🔧 Using search_market_trends (1)
+
+# Agent: Demand Forecasting Specialist
+## Thought: I need market data for run {n}
+## Using tool: search_market_trends
+## Final Answer: Forecast {n} completed
+"""
+
+SAMPLE_LOG_MESSAGES = [
+    "Agent: Availability Analyst, Status: In Progress ({n})",
+    "Task completed by Supplier Performance Analyst ({n})",
+    "Alternative Supplier Researcher is analyzing search results ({n})",
+    "Email configuration: server=127.0.0.1, port=25, user=benchmark ({n})",
+    "Loaded 10 suppliers from suppliers_limited.csv ({n})",
+]
+
+
+@contextlib.contextmanager
+def benchmark_environment():
+    """Point the pipeline at the fixture search, an SMTP sink and a temporary config.
+
+    email_summary.txt is restored afterwards, because the email tool overwrites it.
+    """
+    with open(EMAIL_SUMMARY_PATH, 'rb') as f:
+        original_summary = f.read()
+    with SMTPSink() as sink, tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, 'benchmark.toml')
+        with open(config_path, 'w') as f:
+            f.write(f"""[tool.crewai.llm]
+api_key = "benchmark-key"
+
+[tool.email]
+server = "127.0.0.1"
+port = {sink.port}
+user = "benchmark@example.com"
+password = "benchmark"
+starttls = false
+""")
+        # Memoized task outputs would let later runs skip the LLM calls being measured
+        overrides = {'SUPPLIER_ANALYSIS_CONFIG': config_path, 'SUPPLIER_ANALYSIS_SEARCH_FIXTURES': SEARCH_FIXTURES,
+                     'SUPPLIER_ANALYSIS_MEMO': '0'}
+        saved = {key: os.environ.get(key) for key in overrides}
+        os.environ.update(overrides)
+        try:
+            yield sink
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            with open(EMAIL_SUMMARY_PATH, 'wb') as f:
+                f.write(original_summary)
+
+
+def bench_pipeline(scenario, sink, cassette_path=None, replay_latency='zero'):
+    """Wall time per instrumented stage of one run_analysis call, plus peak memory of a second traced run.
+
+    The pipeline is warmed up first, as the server does at startup; the warm-up is reported separately.
+    With ``cassette_path`` both runs replay that recording instead of using the fake LLM.
+    """
+    from src.supplier_analysis import token_accounting
+    from src.supplier_analysis.cassette import Cassette
+    from src.supplier_analysis.instrumentation import start_timeline, stop_timeline
+    from src.supplier_analysis.supplier_analysis import pipeline, run_analysis
+
+    def analysis_args():
+        if cassette_path:
+            return {'llm': None, 'cassette': Cassette.load(cassette_path, replay_latency)}
+        return {'llm': FakeLLM()}
+
+    start = time.perf_counter()
+    pipeline.warm_up(scenarios=(scenario,))
+    warm_up_time = time.perf_counter() - start
+
+    emails_before = len(sink.messages)
+
+    start_timeline()
+    token_accounting.start_run()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_analysis(scenario=scenario, **analysis_args())
+    wall_time = time.perf_counter() - start
+    timeline = stop_timeline()
+    token_usage = token_accounting.stop_run()
+    emails_sent = len(sink.messages) - emails_before
+
+    # Stage key is the span name plus its main label, e.g. "phase:kickoff" or "tool:search_suppliers"
+    stages = {}
+    for entry in timeline:
+        label = entry.get('phase') or entry.get('agent') or entry.get('tool') or entry.get('attempt', '')
+        key = f"{entry['span']}:{label}"
+        stages[key] = stages.get(key, 0.0) + entry['duration_s']
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_analysis(scenario=scenario, **analysis_args())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'warm_up_s': warm_up_time,
+        'wall_time_s': wall_time,
+        'stages_s': stages,
+        'llm_calls': token_usage['calls'],
+        'prompt_tokens': token_usage['prompt_tokens'],
+        'completion_tokens': token_usage['completion_tokens'],
+        'emails_sent': emails_sent,
+        'peak_memory_mb': peak / 2**20,
+    }
+
+
+def bench_log_capture(repeats=300):
+    """Throughput of StdoutCapture and UILogHandler on synthetic CrewAI output."""
+    import app
+    from src.supplier_analysis.run_state import RunStatus
+
+    status = RunStatus(status='running')
+    chunks = [SAMPLE_OUTPUT.format(n=n) for n in range(repeats)]
+    line_count = sum(chunk.count('\n') for chunk in chunks)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        capture = app.StdoutCapture(status)
+        capture.start()
+        start = time.perf_counter()
+        for chunk in chunks:
+            capture.write(chunk)
+        stdout_elapsed = time.perf_counter() - start
+        capture.stop()
+
+        handler = app.UILogHandler(status)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        records = [logging.LogRecord('benchmark', logging.INFO, __file__, 0, message.format(n=n), None, None)
+                   for n in range(repeats) for message in SAMPLE_LOG_MESSAGES]
+        start = time.perf_counter()
+        for record in records:
+            handler.emit(record)
+        handler_elapsed = time.perf_counter() - start
+
+    return {
+        'stdout_lines_per_s': line_count / stdout_elapsed,
+        'ui_handler_records_per_s': len(records) / handler_elapsed,
+        'captured_log_entries': len(status['logs']),
+    }
+
+
+def bench_page_fetch(copies=4):
+    """Fetch canned supplier pages from a local server cold, then again with ETag revalidation.
+
+    Besides timings, reports what the scan found on the two marker pages and checks the
+    per-host limit, the size limit (``/large``) and the timeout (``/slow``, served under a
+    second host name so it does not hold the offer pages' slots).
+    """
+    import asyncio
+    from src.supplier_analysis.page_fetcher import PageFetcher
+
+    limits = {'max_pages': 2 * copies + 2, 'per_host': 2, 'max_bytes': 64 * 1024, 'timeout': 0.5, 'fresh_seconds': 0}
+    fetcher = PageFetcher(limits)
+    with PageServer(PAGE_FIXTURES, slow_seconds=2 * limits['timeout']) as server:
+        offer_urls = [server.url(f"{name}?copy={n}") for n in range(copies)
+                      for name in ('schema_offer.html', 'text_offer.html')]
+        large_url, slow_url = server.url('large', 'localhost'), server.url('slow', 'localhost')
+        start = time.perf_counter()
+        pages = {page.url: page for page in asyncio.run(fetcher.fetch_all(offer_urls + [large_url, slow_url]))}
+        cold_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        revalidated = asyncio.run(fetcher.fetch_all(offer_urls))
+        revalidate_elapsed = time.perf_counter() - start
+        schema_page, text_page = pages[offer_urls[0]], pages[offer_urls[1]]
+        return {
+            'cold_s': cold_elapsed,
+            'revalidate_s': revalidate_elapsed,
+            'requests': server.requests,
+            'not_modified': server.not_modified,
+            'max_in_flight_per_host': max(server.max_in_flight.values()),
+            'schema_page_markers': f"{', '.join(schema_page.prices)} / {schema_page.stock}",
+            'text_page_markers': f"{', '.join(text_page.prices)} / {text_page.stock}",
+            'large_page_truncated': pages[large_url].truncated,
+            'slow_page_timed_out': bool(pages[slow_url].error),
+            'revalidated_from_cache': sum(page.cached for page in revalidated),
+            'bytes_read_kb': fetcher.stats['bytes'] / 1024,
+        }
+
+
+def bench_flask(scenario, timeout=120, poll_interval=0.05):
+    """Drive /api/run and /api/status through the Flask test client until the run finishes.
+
+    Polls revalidate with If-None-Match like a browser, so unchanged state is answered with a 304.
+    """
+    import app
+    from src.supplier_analysis.supplier_analysis import run_analysis
+
+    app.run_analysis = partial(run_analysis, llm=FakeLLM())
+    client = app.app.test_client()
+    baseline_threads = threading.active_count()
+    payload_sizes, poll_latencies = [], []
+    not_modified, etag, status = 0, None, None
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        response = client.post('/api/run', json={'scenario': scenario})
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/run failed: {response.get_data(as_text=True)}")
+        while time.perf_counter() - start < timeout:
+            poll_start = time.perf_counter()
+            response = client.get('/api/status', headers={'If-None-Match': etag} if etag else {})
+            poll_latencies.append(time.perf_counter() - poll_start)
+            payload_sizes.append(len(response.data))
+            if response.status_code == 304:
+                not_modified += 1
+            else:
+                etag, status = response.headers.get('ETag'), response.get_json()['status']
+            if status != 'running':
+                break
+            time.sleep(poll_interval)
+        wall_time = time.perf_counter() - start
+        final_status = status
+
+        # Let the log capture and email monitor threads wind down before the next run
+        deadline = time.perf_counter() + 5
+        while threading.active_count() > baseline_threads and time.perf_counter() < deadline:
+            time.sleep(0.1)
+
+    return {
+        'final_status': final_status,
+        'run_wall_time_s': wall_time,
+        'status_polls': len(payload_sizes),
+        'status_not_modified_polls': not_modified,
+        'status_poll_latency_ms_mean': 1000 * sum(poll_latencies) / len(poll_latencies),
+        'status_payload_bytes_max': max(payload_sizes),
+        'status_payload_bytes_final': payload_sizes[-1],
+    }
+
+
+def run_benchmarks(cassette_path=None, replay_latency='zero'):
+    import crewai
+    from src.supplier_analysis.cassette import Cassette
+
+    # Keep console logging quiet, the UI handlers attach to the root logger separately
+    for handler in logging.getLogger().handlers:
+        handler.setLevel(logging.WARNING)
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'crewai': crewai.__version__,
+        },
+        'pipeline': {},
+        'log_capture': bench_log_capture(),
+        'page_fetch': bench_page_fetch(),
+        'flask': {},
+    }
+    with benchmark_environment() as sink:
+        for scenario in SCENARIOS:
+            results['pipeline'][scenario] = bench_pipeline(scenario, sink)
+        if cassette_path:
+            scenario = Cassette.load(cassette_path).scenario or 'standard'
+            results['replay'] = {scenario: bench_pipeline(scenario, sink, cassette_path, replay_latency)}
+        for scenario in SCENARIOS:
+            results['flask'][scenario] = bench_flask(scenario)
+    return results
+
+
+def flatten_metrics(results, prefix=''):
+    """Numeric leaves of a result dict as {'pipeline.standard.wall_time_s': value}."""
+    metrics = {}
+    for key, value in results.items():
+        if key == 'meta':
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten_metrics(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = value
+    return metrics
+
+
+def compare_results(baseline, current, tolerance):
+    """Return (metric, baseline, current, change) tuples for metrics that got worse by more than tolerance.
+
+    Throughput metrics (``*_per_s``) regress when they drop, all others when they grow.
+    """
+    baseline_metrics = flatten_metrics(baseline)
+    regressions = []
+    for name, value in flatten_metrics(current).items():
+        reference = baseline_metrics.get(name)
+        if not reference:
+            continue
+        change = value / reference - 1
+        worse = -change if name.endswith('_per_s') else change
+        if worse > tolerance:
+            regressions.append((name, reference, value, change))
+    return regressions
+
+
+def baseline_path(name):
+    return name if name.endswith('.json') else os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--save', metavar='NAME', help='store the results as a baseline')
+    parser.add_argument('--compare', metavar='NAME', help='compare the results against a stored baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative regression (default 0.25)')
+    parser.add_argument('--cassette', metavar='PATH', help='also benchmark a replay of this recorded run')
+    parser.add_argument('--replay-latency', choices=('zero', 'original'), default='zero',
+                        help='replay recorded calls immediately or with their recorded latency (default zero)')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.cassette, args.replay_latency)
+    print(json.dumps(results, indent=2))
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path(args.save), 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {baseline_path(args.save)}")
+
+    if args.compare:
+        with open(baseline_path(args.compare)) as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, results, args.tolerance)
+        for name, reference, value, change in regressions:
+            print(f"REGRESSION {name}: {reference:.4g} -> {value:.4g} ({change:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} compared to {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 document.addEventListener('DOMContentLoaded', function() {
     // Get DOM elements
     const runDemoBtn = document.getElementById('run-demo-btn');
+    const cancelRunBtn = document.getElementById('cancel-run-btn');
+    const resumeRunBtn = document.getElementById('resume-run-btn');
     const statusIndicator = document.getElementById('status-indicator');
     const workflowDiagram = document.getElementById('workflow-diagram');
     const agentLogs = document.getElementById('agent-logs');
@@ -190,10 +192,28 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // API state variables
     let statusPollingInterval = null;
+    let lastStatusVersion = null; // Version of the last status processed, unchanged polls are skipped
+    let currentRunId = null; // Id returned by /api/run, used to cancel the run
     let useSimulation = false; // Set to false to use real backend API
     
     // Handle run demo button click
     runDemoBtn.addEventListener('click', function() {
+        // Determine the scenario based on the current page URL
+        const isLimitedScenario = window.location.pathname === '/limited';
+        const scenarioData = isLimitedScenario ? { scenario: 'limited' } : {};
+        startRun('/api/run', scenarioData);
+    });
+    
+    // Resume a failed, cancelled or timed out run from its first incomplete task
+    if (resumeRunBtn) {
+        resumeRunBtn.addEventListener('click', function() {
+            if (currentRunId === null) return;
+            startRun(`/api/runs/${currentRunId}/resume`, {});
+        });
+    }
+    
+    // Reset the view and start a run through the given endpoint
+    function startRun(url, requestData) {
         // Reset the state
         resetWorkflow();
         
@@ -201,6 +221,9 @@ document.addEventListener('DOMContentLoaded', function() {
         agentLogs.innerHTML = '';
         completeLogEntries.length = 0;
         summaryLogEntries.length = 0;
+        renderedLogRange = null;
+        lastLogIndex = 0;
+        resetLogScanState();
         
         // Reset the agent summary state tracker - ensure each agent shows one working and one completed entry
         Object.keys(agentSummaryState).forEach(key => {
@@ -211,25 +234,25 @@ document.addEventListener('DOMContentLoaded', function() {
         // Update status
         statusIndicator.className = 'status-indicator running';
         statusIndicator.textContent = 'Status: Running';
+        lastStatusVersion = null;
         
         // Disable the button during execution
         runDemoBtn.disabled = true;
-        
-        // Determine the scenario based on the current page URL
-        const isLimitedScenario = window.location.pathname === '/limited';
-        const scenarioData = isLimitedScenario ? { scenario: 'limited' } : {};
+        if (resumeRunBtn) resumeRunBtn.disabled = true;
 
         // Call the API to start the demo, sending the scenario data
-        fetch('/api/run', {
+        fetch(url, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify(scenarioData) // Send scenario in the request body
+            body: JSON.stringify(requestData) // Send scenario in the request body
         })
         .then(response => response.json())
         .then(data => {
             if (data.status === 'started') {
+                currentRunId = data.run_id;
+                if (cancelRunBtn) cancelRunBtn.disabled = false;
                 // Start polling for status updates
                 startStatusPolling();
             } else {
@@ -245,7 +268,28 @@ document.addEventListener('DOMContentLoaded', function() {
             statusIndicator.textContent = 'Status: Error';
             runDemoBtn.disabled = false;
         });
-    });
+    }
+    
+    // Cancel the running analysis; the backend stops it at its next checkpoint and keeps finished task results
+    if (cancelRunBtn) {
+        cancelRunBtn.addEventListener('click', function() {
+            if (currentRunId === null) return;
+            cancelRunBtn.disabled = true;
+            fetch(`/api/runs/${currentRunId}/cancel`, { method: 'POST' })
+                .then(response => response.json())
+                .then(data => {
+                    if (data.error) {
+                        addLogEntry('system', 'Error cancelling the run: ' + data.error);
+                    } else {
+                        statusIndicator.textContent = 'Status: Cancelling';
+                    }
+                })
+                .catch(error => {
+                    addLogEntry('system', 'Error cancelling the run: ' + error.message);
+                    cancelRunBtn.disabled = false;
+                });
+        });
+    }
     
     // Add event listener for summary view toggle
     summaryViewToggle.addEventListener('change', function() {
@@ -258,13 +302,8 @@ document.addEventListener('DOMContentLoaded', function() {
         let errorCount = 0;
         const maxErrors = 3; // Allow up to 3 consecutive errors before showing error state
         
-        // Reset button after 60 seconds as a fail-safe
-        const buttonSafetyTimeout = setTimeout(() => {
-            console.log("Safety timeout triggered - enabling button");
-            runDemoBtn.disabled = false;
-            statusIndicator.className = 'status-indicator';
-            statusIndicator.textContent = 'Status: Ready';
-        }, 60000); // 60 Sekunden
+        // No client-side fail-safe timeout: the backend's run, task and tool deadlines end every
+        // run with 'timed_out', and the cancel button stops it earlier
         
         // Poll every 500ms for more responsive updates
         statusPollingInterval = setInterval(() => {
@@ -277,11 +316,17 @@ document.addEventListener('DOMContentLoaded', function() {
                     return response.json();
                 })
                 .then(data => {
-                    // Clear the safety timeout if we get a valid response
                     if (data && data.status !== 'running') {
-                        clearTimeout(buttonSafetyTimeout);
                         runDemoBtn.disabled = false;
+                        if (cancelRunBtn) cancelRunBtn.disabled = true;
+                        // Unfinished runs keep checkpoints of their completed tasks and can be resumed
+                        if (resumeRunBtn) resumeRunBtn.disabled = !['error', 'cancelled', 'timed_out'].includes(data.status);
+                    }
+                    // The server answers unchanged state with a 304, which the browser turns into the cached copy
+                    if (data && data.version !== undefined && data.version === lastStatusVersion) {
+                        return;
                     }
+                    lastStatusVersion = data ? data.version : null;
                     updateUIFromStatus(data);
                 })
                 .catch(error => {
@@ -292,7 +337,7 @@ document.addEventListener('DOMContentLoaded', function() {
                     if (errorCount >= maxErrors) {
                         // Stop polling on persistent error
                         clearInterval(statusPollingInterval);
-                        clearTimeout(buttonSafetyTimeout);
+                        if (cancelRunBtn) cancelRunBtn.disabled = true;
                         
                         // Update UI
                         statusIndicator.className = 'status-indicator error';
@@ -326,7 +371,7 @@ document.addEventListener('DOMContentLoaded', function() {
             const elem = document.getElementById(agent.id);
             if (elem) {
                 // Remove all status classes
-                elem.classList.remove('agent-waiting', 'agent-working', 'agent-completed');
+                elem.classList.remove('agent-waiting', 'agent-working', 'agent-completed', 'agent-failed', 'agent-cancelled');
                 // Add the correct class
                 elem.classList.add(`agent-${status}`);
                 
@@ -342,11 +387,34 @@ document.addEventListener('DOMContentLoaded', function() {
         return false;
     }
     
+    // Backend agent statuses mapped to the diagram states
+    const agentStatusMapping = {
+        'In Progress': 'working',
+        'Completed': 'completed',
+        'Failed': 'failed',
+        'Cancelled': 'cancelled'
+    };
+    
+    // Apply the backend's per-agent status map: O(agents) work per update
+    function applyAgentStatusMap(agentMap) {
+        let changed = false;
+        for (const [name, entry] of Object.entries(agentMap)) {
+            const agent = agents.find(a => a.name === name);
+            if (!agent || !entry) continue;
+            const tool = entry.tool || null;
+            if (agent.tool !== tool) {
+                agent.tool = tool;
+                changed = true;
+            }
+            if (updateExactAgentStatus(name, agentStatusMapping[entry.status] || 'waiting')) {
+                changed = true;
+            }
+        }
+        return changed;
+    }
+    
     // Function to update UI based on status from the API
     function updateUIFromStatus(statusData) {
-        // Debug the raw data received
-        console.log("Raw status data received:", JSON.stringify(statusData));
-        
         // Safety check - if response is empty or invalid, don't process it
         if (!statusData || typeof statusData !== 'object') {
             console.error('Invalid status data received:', statusData);
@@ -354,6 +422,7 @@ document.addEventListener('DOMContentLoaded', function() {
             runDemoBtn.disabled = false;
             return;
         }
+        console.log(`Status update: ${statusData.status}, version ${statusData.version}`);
         
         // Update global status
         if (statusData.status !== 'running') {
@@ -387,81 +456,49 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         }
         
-        // Update status indicator
+        // Update status indicator ('timed_out' is shown as "Timed out")
         if (statusData.status) {
             statusIndicator.className = `status-indicator ${statusData.status}`;
-            statusIndicator.textContent = `Status: ${capitalizeFirstLetter(statusData.status)}`;
+            statusIndicator.textContent = `Status: ${capitalizeFirstLetter(statusData.status.replace('_', ' '))}`;
         }
         
         let statusChanged = false;
+        
+        // Authoritative per-agent statuses from the backend; the log scanning below is only
+        // the fallback for responses without the map
+        const hasAgentMap = statusData.agents && typeof statusData.agents === 'object';
+        if (hasAgentMap && applyAgentStatusMap(statusData.agents)) {
+            statusChanged = true;
+        }
 
-        // SPECIAL CASE: Look for the completion of "Alternative Supplier Researcher" specifically in the raw logs
-        if (statusData.logs && Array.isArray(statusData.logs)) {
-            const allLogsText = statusData.logs.join('\n');
-            
-            // Check explicitly for markers that the researcher agent has completed
-            if (allLogsText.includes('Alternative Supplier Researcher') && 
-                allLogsText.includes('Alternative suppliers identified') ||
-                allLogsText.includes('Found alternative suppliers')) {
-                
-                console.log("Found evidence that Alternative Supplier Researcher has completed!");
-                if (updateExactAgentStatus('Alternative Supplier Researcher', 'completed')) {
-                    statusChanged = true;
-                }
-            }
-            
-            // Scan the logs for explicit completion evidence for each agent
-            for (const agentName of exactAgentNames) {
-                // Check for completed phrases in any proximity to the agent name
-                const agentCompletedRegex = new RegExp(`${agentName}[\\s\\S]{1,200}(✅ Completed|✓ Completed|Status: Completed|task complete|Task completed)`, 'i');
-                const completedAgentRegex = new RegExp(`(✅ Completed|✓ Completed|Status: Completed|task complete|Task completed)[\\s\\S]{1,200}${agentName}`, 'i');
-                
-                if (agentCompletedRegex.test(allLogsText) || completedAgentRegex.test(allLogsText)) {
-                    console.log(`Found completion evidence for ${agentName} in log proximity search`);
-                    if (updateExactAgentStatus(agentName, 'completed')) {
-                        statusChanged = true;
-                    }
-                }
+        // Only entries past the last seen index are new; the backend's logs only grow within a run
+        let newLogs = [];
+        if (Array.isArray(statusData.logs)) {
+            if (statusData.logs.length < lastLogIndex) {
+                // A new run replaced the logs
+                lastLogIndex = 0;
+                resetLogScanState();
             }
+            newLogs = statusData.logs.slice(lastLogIndex).filter(logEntry => logEntry && typeof logEntry === 'string');
+            lastLogIndex = statusData.logs.length;
         }
 
-        // Process all logs for explicit agent mentions
-        if (statusData.logs && Array.isArray(statusData.logs)) {
-            // First scan all logs for mentions of "Supplier Performance Analyst" and "Communication Specialist"
-            // These agents seem to get stuck most often
-            const allLogsText = statusData.logs.join('\n');
-            
-            for (const agentName of exactAgentNames) {
-                // Check for completed status
-                if (allLogsText.includes(`${agentName}`) && 
-                    (allLogsText.includes("Status: ✅ Completed") || 
-                     allLogsText.includes(`${agentName}`) && allLogsText.includes("Status: Completed"))) {
-                    if (updateExactAgentStatus(agentName, 'completed')) {
-                        statusChanged = true;
-                    }
-                }
-                // Check for working status
-                else if (allLogsText.includes(`${agentName}`) && 
-                         (allLogsText.includes("Status: In Progress") || 
-                          allLogsText.includes("Status: Executing Task"))) {
-                    if (updateExactAgentStatus(agentName, 'working')) {
-                        statusChanged = true;
-                    }
-                }
+        // Fallback without the agent map: scan the new entries and keep what was found per agent
+        if (!hasAgentMap && newLogs.length > 0) {
+            if (scanNewLogsForAgentStatus(newLogs)) {
+                statusChanged = true;
             }
             
             // Process individual logs for more detailed updates
-            statusData.logs.forEach(logEntry => {
-                if (!logEntry || typeof logEntry !== 'string') return;
-                
+            newLogs.forEach(logEntry => {
                 if (updateAgentStatusFromLog(logEntry)) {
                     statusChanged = true;
                 }
             });
         }
         
-        // DIRECT MAPPING: Check current_agent from backend (most reliable)
-        if (statusData.current_agent) {
+        // DIRECT MAPPING: Check current_agent from backend
+        if (!hasAgentMap && statusData.current_agent) {
             console.log("Direct agent status update:", statusData.current_agent);
             
             // Parse "Agent: X, Status: Y" format
@@ -492,26 +529,98 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         }
 
-        // Update logs display
-        if (statusData.logs && Array.isArray(statusData.logs)) {
-            const currentLogCount = document.querySelectorAll('.log-entry').length;
-            
-            // Only add new logs
-            if (statusData.logs.length > currentLogCount) {
-                const newLogs = statusData.logs.slice(currentLogCount);
-                newLogs.forEach(logEntry => {
-                    if (logEntry && typeof logEntry === 'string') {
-                        addLogEntry('system', logEntry);
-                    }
-                });
-            }
-        }
+        // Update logs display, only new logs are added
+        newLogs.forEach(logEntry => {
+            addLogEntry('system', logEntry);
+        });
         
         // Re-render workflow if any statuses changed
         if (statusChanged) {
             console.log("Re-rendering workflow due to status changes");
-            renderWorkflow();
+            scheduleWorkflowRender();
+        }
+    }
+    
+    // Index of the next backend log entry to process
+    let lastLogIndex = 0;
+    
+    // What the log scan has found so far, so each poll only scans the new entries
+    const logScanState = {
+        tail: '',
+        mentionedAgents: new Set(),
+        completedMarker: false,
+        progressMarker: false,
+        alternativesIdentified: false,
+        alternativesFound: false
+    };
+    
+    // Characters of earlier log text kept so completion phrases near an agent name are found across polls
+    const LOG_SCAN_OVERLAP = 400;
+    
+    // Proximity patterns per agent, compiled once
+    const agentCompletionPatterns = exactAgentNames.map(agentName => [
+        agentName,
+        new RegExp(`${agentName}[\\s\\S]{1,200}(✅ Completed|✓ Completed|Status: Completed|task complete|Task completed)`, 'i'),
+        new RegExp(`(✅ Completed|✓ Completed|Status: Completed|task complete|Task completed)[\\s\\S]{1,200}${agentName}`, 'i')
+    ]);
+    
+    function resetLogScanState() {
+        logScanState.tail = '';
+        logScanState.mentionedAgents.clear();
+        logScanState.completedMarker = false;
+        logScanState.progressMarker = false;
+        logScanState.alternativesIdentified = false;
+        logScanState.alternativesFound = false;
+    }
+    
+    // Update agent statuses from newly received log entries
+    function scanNewLogsForAgentStatus(newLogs) {
+        let statusChanged = false;
+        const text = logScanState.tail + '\n' + newLogs.join('\n');
+        logScanState.tail = text.slice(-LOG_SCAN_OVERLAP);
+        
+        for (const agentName of exactAgentNames) {
+            if (text.includes(agentName)) {
+                logScanState.mentionedAgents.add(agentName);
+            }
+        }
+        logScanState.completedMarker = logScanState.completedMarker || text.includes("Status: ✅ Completed") || text.includes("Status: Completed");
+        logScanState.progressMarker = logScanState.progressMarker || text.includes("Status: In Progress") || text.includes("Status: Executing Task");
+        logScanState.alternativesIdentified = logScanState.alternativesIdentified || text.includes('Alternative suppliers identified');
+        logScanState.alternativesFound = logScanState.alternativesFound || text.includes('Found alternative suppliers');
+        
+        // SPECIAL CASE: Check explicitly for markers that the researcher agent has completed
+        if (logScanState.mentionedAgents.has('Alternative Supplier Researcher') && logScanState.alternativesIdentified ||
+            logScanState.alternativesFound) {
+            if (updateExactAgentStatus('Alternative Supplier Researcher', 'completed')) {
+                console.log("Found evidence that Alternative Supplier Researcher has completed!");
+                statusChanged = true;
+            }
         }
+        
+        // Check for completed phrases in any proximity to the agent name
+        for (const [agentName, agentCompletedRegex, completedAgentRegex] of agentCompletionPatterns) {
+            if (agentCompletedRegex.test(text) || completedAgentRegex.test(text)) {
+                if (updateExactAgentStatus(agentName, 'completed')) {
+                    console.log(`Found completion evidence for ${agentName} in log proximity search`);
+                    statusChanged = true;
+                }
+            }
+        }
+        
+        // Agents mentioned anywhere, together with a status marker anywhere in the logs
+        for (const agentName of logScanState.mentionedAgents) {
+            if (logScanState.completedMarker) {
+                if (updateExactAgentStatus(agentName, 'completed')) {
+                    statusChanged = true;
+                }
+            } else if (logScanState.progressMarker) {
+                if (updateExactAgentStatus(agentName, 'working')) {
+                    statusChanged = true;
+                }
+            }
+        }
+        return statusChanged;
     }
     
     // Function to update agent status based on log entries
@@ -858,12 +967,16 @@ document.addEventListener('DOMContentLoaded', function() {
         // Reset agent states
         agents.forEach(agent => {
             agent.status = 'waiting';
+            agent.tool = null;
         });
         
         // Clear logs
         agentLogs.innerHTML = '';
         completeLogEntries.length = 0;
         summaryLogEntries.length = 0;
+        renderedLogRange = null;
+        lastLogIndex = 0;
+        resetLogScanState();
         
         // Reset the agent summary state tracker
         Object.keys(agentSummaryState).forEach(key => {
@@ -943,7 +1056,7 @@ document.addEventListener('DOMContentLoaded', function() {
             <div class="agent-icon">${iconType}</div>
             <div class="agent-name">${agent.name}</div>
             <div class="agent-role">${agent.role}</div>
-            <div class="agent-status ${agent.status}">${capitalizeFirstLetter(agent.status)}</div>
+            <div class="agent-status ${agent.status}">${capitalizeFirstLetter(agent.status)}${agent.status === 'working' && agent.tool ? ` · ${agent.tool}` : ''}</div>
         `;
         
         // Append to agent container instead of workflow diagram
@@ -1182,21 +1295,96 @@ document.addEventListener('DOMContentLoaded', function() {
             const summaryLogEntry = createSummaryLogEntry(agentId, message);
             summaryLogEntries.push(summaryLogEntry);
             
-            // When in summary view, reorder the logs every time we add an entry
+            // When in summary view, the logs are reordered on the next frame
             if (summaryViewEnabled) {
-                updateLogDisplay();
-                return; // Skip the normal update if we're in summary view
+                scheduleLogRender();
+                return;
             }
         }
         
-        // If we're not in summary view or didn't create a summary entry, just append to the display
+        // If we're not in summary view, the new entry shows up when the log window is rendered
         if (!summaryViewEnabled) {
-            agentLogs.appendChild(completeLogEntry);
-            // Auto-scroll to bottom
+            scheduleLogRender();
+        }
+    }
+    
+    // Log rendering is batched: any number of new entries cause one render per animation frame
+    let logRenderScheduled = false;
+    let workflowRenderScheduled = false;
+    
+    function scheduleLogRender() {
+        if (logRenderScheduled) return;
+        logRenderScheduled = true;
+        requestAnimationFrame(() => {
+            logRenderScheduled = false;
+            if (summaryViewEnabled) {
+                updateLogDisplay();
+            } else {
+                renderLogWindow();
+            }
+        });
+    }
+    
+    function scheduleWorkflowRender() {
+        if (workflowRenderScheduled) return;
+        workflowRenderScheduled = true;
+        requestAnimationFrame(() => {
+            workflowRenderScheduled = false;
+            renderWorkflow();
+        });
+    }
+    
+    // The complete log view is virtualized: only rows around the viewport are in the DOM,
+    // spacers above and below stand in for the rest using the measured average row height
+    const LOG_ROW_OVERSCAN = 20;
+    const logTopSpacer = document.createElement('div');
+    const logBottomSpacer = document.createElement('div');
+    let estimatedLogRowHeight = 28;
+    let renderedLogRange = null;
+    
+    function renderLogWindow(force = false) {
+        const total = completeLogEntries.length;
+        const windowRendered = renderedLogRange !== null && logTopSpacer.parentNode === agentLogs;
+        const atBottom = !windowRendered ||
+            agentLogs.scrollTop + agentLogs.clientHeight >= agentLogs.scrollHeight - estimatedLogRowHeight;
+        
+        // Refine the row height estimate from the rows currently rendered
+        if (windowRendered && renderedLogRange[1] > renderedLogRange[0]) {
+            const renderedHeight = logBottomSpacer.offsetTop - logTopSpacer.offsetTop - logTopSpacer.offsetHeight;
+            if (renderedHeight > 0) {
+                estimatedLogRowHeight = renderedHeight / (renderedLogRange[1] - renderedLogRange[0]);
+            }
+        }
+        
+        const visibleRows = Math.ceil(agentLogs.clientHeight / estimatedLogRowHeight) + 1;
+        const first = atBottom
+            ? Math.max(0, total - visibleRows - LOG_ROW_OVERSCAN)
+            : Math.max(0, Math.floor(agentLogs.scrollTop / estimatedLogRowHeight) - LOG_ROW_OVERSCAN);
+        const last = Math.min(total, first + visibleRows + 2 * LOG_ROW_OVERSCAN);
+        
+        if (!force && windowRendered && renderedLogRange[0] === first && renderedLogRange[1] === last &&
+            renderedLogRange[2] === total) {
+            return;
+        }
+        renderedLogRange = [first, last, total];
+        
+        logTopSpacer.style.height = `${first * estimatedLogRowHeight}px`;
+        logBottomSpacer.style.height = `${(total - last) * estimatedLogRowHeight}px`;
+        agentLogs.replaceChildren(logTopSpacer, ...completeLogEntries.slice(first, last), logBottomSpacer);
+        
+        // Auto-scroll to bottom unless the user scrolled up to read earlier entries
+        if (atBottom) {
             agentLogs.scrollTop = agentLogs.scrollHeight;
         }
     }
     
+    // Scrolling the complete view brings other rows into the window
+    agentLogs.addEventListener('scroll', () => {
+        if (!summaryViewEnabled) {
+            scheduleLogRender();
+        }
+    }, { passive: true });
+    
     // Function to create a complete log entry (original format)
     function createCompleteLogEntry(agentId, message) {
         // Create log entry element
@@ -1937,11 +2125,15 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Function to update the log display based on current view mode
     function updateLogDisplay() {
+        // The complete view is rendered as a virtualized window
+        if (!summaryViewEnabled) {
+            renderLogWindow(true);
+            return;
+        }
+        
         // Clear the current logs display
         agentLogs.innerHTML = '';
-        
-        // Display either the complete logs or the summary logs
-        const logsToDisplay = summaryViewEnabled ? summaryLogEntries : completeLogEntries;
+        renderedLogRange = null;
         
         if (summaryViewEnabled) {
             // In summary view, we sort logs according to the workflow sequence
@@ -2092,11 +2284,6 @@ document.addEventListener('DOMContentLoaded', function() {
                     });
                 }
             });
-        } else {
-            // For complete logs, maintain chronological order (as they were added)
-            logsToDisplay.forEach(logEntry => {
-                agentLogs.appendChild(logEntry);
-            });
         }
         
         // Auto-scroll to bottom
@@ -0,0 +1,112 @@
+import asyncio
+import base64
+import copy
+import logging
+import re
+import smtplib
+import socket
+import ssl
+from email import policy
+from email.utils import getaddresses
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSMTP:
+    """Minimal asyncio SMTP client: EHLO, optional STARTTLS, AUTH PLAIN/LOGIN and one message per send.
+
+    Server errors raise the smtplib exceptions, so callers handle both clients alike.
+    """
+
+    def __init__(self, host, port, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.extensions = {}
+
+    async def __aenter__(self):
+        self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        await self._expect(220)
+        await self.ehlo()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                await self.command('QUIT', 221)
+        finally:
+            self.writer.close()
+        return False
+
+    async def ehlo(self):
+        _, lines = await self.command(f"EHLO {socket.getfqdn()}", 250)
+        self.extensions = {}
+        for line in lines[1:]:
+            keyword, _, params = line.partition(' ')
+            self.extensions[keyword.upper()] = params.upper().split()
+
+    async def starttls(self):
+        await self.command('STARTTLS', 220)
+        await asyncio.wait_for(self.writer.start_tls(ssl.create_default_context(), server_hostname=self.host),
+                               self.timeout)
+        await self.ehlo()
+
+    async def login(self, user, password):
+        methods = self.extensions.get('AUTH', [])
+        if 'PLAIN' in methods or not methods:
+            token = base64.b64encode(f"\0{user}\0{password}".encode()).decode()
+            await self.command(f"AUTH PLAIN {token}", 235, log_as='AUTH PLAIN <credentials>')
+        else:
+            await self.command('AUTH LOGIN', 334)
+            await self.command(base64.b64encode(user.encode()).decode(), 334, log_as='<username>')
+            await self.command(base64.b64encode(password.encode()).decode(), 235, log_as='<password>')
+
+    async def send_message(self, msg):
+        """Send an email.message.Message to its To/Cc/Bcc recipients, like smtplib.SMTP.send_message.
+
+        ``msg`` itself is left unchanged; the Bcc header is only dropped from the copy that is sent.
+        """
+        sender = getaddresses([msg['From'] or ''])[0][1]
+        recipients = [address for _, address in getaddresses(msg.get_all('To', []) + msg.get_all('Cc', [])
+                                                            + msg.get_all('Bcc', []))]
+        if msg['Bcc'] is not None:
+            msg = copy.copy(msg)
+            del msg['Bcc']
+        await self.command(f"MAIL FROM:<{sender}>", 250)
+        for recipient in recipients:
+            await self.command(f"RCPT TO:<{recipient}>", 250, 251)
+        await self.command('DATA', 354)
+        data = msg.as_bytes(policy=policy.SMTP)
+        # Dot-stuffing, and the message must end with CRLF before the terminating dot
+        data = re.sub(rb'(?m)^\.', b'..', data)
+        if not data.endswith(b'\r\n'):
+            data += b'\r\n'
+        self.writer.write(data + b'.\r\n')
+        await self._expect(250)
+
+    async def command(self, line, *expected, log_as=None):
+        """Send a command line and return the (code, lines) reply; ``log_as`` replaces a line with credentials in the log."""
+        logger.debug(f"SMTP send: {log_as or line}")
+        self.writer.write(f"{line}\r\n".encode())
+        return await self._expect(*expected)
+
+    async def _expect(self, *expected):
+        await asyncio.wait_for(self.writer.drain(), self.timeout)
+        code, lines = await asyncio.wait_for(self._read_reply(), self.timeout)
+        if code not in expected:
+            raise smtplib.SMTPResponseException(code, "\n".join(lines))
+        return code, lines
+
+    async def _read_reply(self):
+        lines = []
+        while True:
+            raw = await self.reader.readline()
+            if not raw:
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            line = raw.decode(errors='replace').rstrip('\r\n')
+            lines.append(line[4:])
+            if len(line) < 4 or line[3] != '-':
+                logger.debug(f"SMTP reply: {line}")
+                return int(line[:3]), lines
@@ -0,0 +1,74 @@
+from collections import namedtuple
+
+# Overridable in [tool.crewai.fast_path]: whether clear-cut availability situations skip the
+# Availability Analyst's LLM call, and up to how many suppliers with stock count as clear-cut
+DEFAULT_FAST_PATH = {'enabled': True, 'max_in_stock': 1}
+
+# Availability values of suppliers that can deliver; any other value counts as no stock
+IN_STOCK_STATUSES = ('Available', 'Limited Stock')
+
+PRODUCT = 'VQC4101-51 SMC 5/2-Wegeventil valve'
+
+AvailabilityAssessment = namedtuple('AvailabilityAssessment', 'in_stock limited unavailable')
+AvailabilityAssessment.__doc__ = """Supplier names by availability, in the order of the supplier file.
+
+``in_stock`` includes the ``limited`` suppliers; ``unavailable`` maps the others to their status.
+"""
+
+
+def assess_availability(suppliers_df):
+    """AvailabilityAssessment of the suppliers in ``suppliers_df``."""
+    in_stock, limited, unavailable = [], [], {}
+    for name, status in zip(suppliers_df['supplier_name'], suppliers_df['availability']):
+        if status in IN_STOCK_STATUSES:
+            in_stock.append(name)
+            if status == 'Limited Stock':
+                limited.append(name)
+        else:
+            unavailable[name] = status
+    return AvailabilityAssessment(in_stock, limited, unavailable)
+
+
+def _supplier_line(row):
+    return (f"- {row['supplier_name']}: {row['availability']}, on-time delivery {row['on_time_delivery_rate']}, "
+            f"defect rate {row['quality_defect_rate']}, ${float(row['price_per_unit']):.2f} per unit, "
+            f"minimum order {row['minimum_order_quantity']} units, response time {row['response_time_hours']} hours, "
+            f"rating {row['rating']}")
+
+
+def templated_availability(assessment, suppliers_df, max_in_stock=DEFAULT_FAST_PATH['max_in_stock']):
+    """Availability analysis written from the rules, or None when it needs the Availability Analyst.
+
+    Clear-cut are the situations where no supplier, or at most ``max_in_stock`` suppliers, have stock.
+    An empty supplier table is not: there is nothing to report from, so it is left to the analyst.
+    """
+    if suppliers_df.empty or len(assessment.in_stock) > max_in_stock:
+        return None
+    excluded = ', '.join(f"{name} ({status})" for name, status in assessment.unavailable.items())
+    if not assessment.in_stock:
+        return (f"CRITICAL SUPPLY CHAIN RISK: no supplier in the database has stock of the {PRODUCT}.\n\n"
+                f"All {len(assessment.unavailable)} current suppliers are excluded from recommendations: {excluded}.\n\n"
+                f"Supply chain risks:\n"
+                f"- No current supplier can deliver, so the demand forecast cannot be covered from existing sources\n"
+                f"- Alternative suppliers must be identified and qualified immediately")
+
+    rows = suppliers_df[suppliers_df['supplier_name'].isin(assessment.in_stock)].to_dict('records')
+    verb = "has" if len(assessment.in_stock) == 1 else "have"
+    lines = [f"{len(assessment.in_stock)} of {len(suppliers_df)} current suppliers of the {PRODUCT} {verb} stock:"]
+    lines += [_supplier_line(row) for row in rows]
+    lines += ["", "Supply chain risks:"]
+    if len(assessment.in_stock) == 1:
+        lines.append(f"- Single source: {assessment.in_stock[0]} is the only current supplier with stock")
+    if assessment.limited:
+        lines.append(f"- Limited stock at {', '.join(assessment.limited)}, larger orders may not be covered")
+    lines.append("- Lead times are not recorded in the supplier database and must be confirmed with the supplier")
+    if excluded:
+        lines += ["", f"Excluded from recommendations: {excluded}."]
+    return "\n".join(lines)
+
+
+def unavailable_summary(assessment):
+    """Replacement for the supplier table in later prompts when no current supplier has stock."""
+    return (f"None of the {len(assessment.unavailable)} current suppliers has stock "
+            f"({', '.join(f'{name}: {status}' for name, status in assessment.unavailable.items())}). "
+            f"All of them are excluded, so only alternative suppliers can be ranked.")
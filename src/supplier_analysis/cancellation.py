@@ -0,0 +1,218 @@
+import asyncio
+import functools
+import inspect
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Deadlines in seconds, overridable in [tool.crewai.timeouts]; None disables a deadline
+DEFAULT_TIMEOUTS = {'run': 1800, 'task': 600, 'tool': 120}
+
+# How often a waiting run checks for cancellation and passed deadlines
+CHECK_INTERVAL = 0.1
+
+_current = threading.local()
+
+
+class RunCancelled(Exception):
+    """Raised inside a run at its next checkpoint once it was cancelled or passed a deadline.
+
+    ``status`` is 'cancelled' or 'timed_out'.
+    """
+
+    def __init__(self, status, reason):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+class RunControl:
+    """Cancellation flag and deadlines of a single run.
+
+    Cancellation is cooperative: the run checks the flag before every LLM call and while it
+    waits for a tool, which runs in its own thread so a hanging call can be abandoned.
+    Task deadlines start with each task; a tool that passes its deadline is abandoned and the
+    agent continues without its result, while a task or the run passing its deadline times out the run.
+    """
+
+    def __init__(self, timeouts=None):
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self.status = None
+        self.reason = None
+        self.started = time.monotonic()
+        self.task = None
+        self._task_started = None
+        # The run's Cassette, if it is recorded or replayed; tool threads see it through current_control()
+        self.cassette = None
+        # send_email calls with a recipient made by this run, so a task can tell whether it sent its email
+        self.email_attempts = 0
+        self.set_timeouts(timeouts)
+
+    def set_timeouts(self, timeouts=None):
+        """Apply {'run', 'task', 'tool'} defaults plus optional {'tasks': {name: s}, 'tools': {name: s}} overrides."""
+        timeouts = timeouts or {}
+        self.timeouts = {key: timeouts.get(key, default) for key, default in DEFAULT_TIMEOUTS.items()}
+        self.task_timeouts = dict(timeouts.get('tasks') or {})
+        self.tool_timeouts = dict(timeouts.get('tools') or {})
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self, status='cancelled', reason='Cancelled by user'):
+        """Request the run to stop; returns False if it was already stopping."""
+        with self._lock:
+            if self._cancelled.is_set():
+                return False
+            self.status, self.reason = status, reason
+            self._cancelled.set()
+        logger.warning(f"Run {status.replace('_', ' ')}: {reason}")
+        return True
+
+    def start_task(self, name):
+        self.task = name
+        self._task_started = time.monotonic()
+
+    def end_task(self):
+        self.task = None
+        self._task_started = None
+
+    def check_deadlines(self):
+        """Time the run out if it or its current task ran past the deadline."""
+        now = time.monotonic()
+        run_timeout = self.timeouts['run']
+        if run_timeout and now - self.started > run_timeout:
+            self.cancel('timed_out', f"Run exceeded its deadline of {run_timeout} seconds")
+        task, task_started = self.task, self._task_started
+        if task_started is not None:
+            task_timeout = self.task_timeouts.get(task, self.timeouts['task'])
+            if task_timeout and now - task_started > task_timeout:
+                self.cancel('timed_out', f"Task '{task}' exceeded its deadline of {task_timeout} seconds")
+
+    def check(self):
+        """Raise RunCancelled if the run was cancelled or passed a deadline."""
+        self.check_deadlines()
+        if self._cancelled.is_set():
+            raise RunCancelled(self.status, self.reason)
+
+    def run_tool(self, name, func, *args, **kwargs):
+        """Run a tool call in its own thread and wait for it while checking cancellation and deadlines.
+
+        On cancellation the call is abandoned and RunCancelled is raised; past the tool's deadline
+        the call is abandoned and a message telling the agent to continue without it is returned.
+        The tool thread runs under this control, so an abandoned call that reaches
+        check_side_effect() stops there instead of acting for a run that moved on.
+        """
+        self.check()
+        outcome = {}
+        done = threading.Event()
+        abandoned = threading.Event()
+
+        def target():
+            set_current_control(self)
+            _current.abandoned = abandoned
+            try:
+                outcome['result'] = func(*args, **kwargs)
+            except BaseException as e:
+                outcome['error'] = e
+            finally:
+                done.set()
+
+        threading.Thread(target=target, name=f'tool-{name}', daemon=True).start()
+        timeout = self.tool_timeouts.get(name, self.timeouts['tool'])
+        started = time.monotonic()
+        while not done.wait(CHECK_INTERVAL):
+            try:
+                self.check()
+            except RunCancelled:
+                abandoned.set()
+                raise
+            if timeout and time.monotonic() - started > timeout:
+                abandoned.set()
+                logger.warning(f"Tool {name} exceeded its deadline of {timeout} seconds, abandoning the call")
+                return f"The {name} tool did not respond within {timeout} seconds. Continue without its result."
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['result']
+
+    async def arun_tool(self, name, coro):
+        """Async variant of run_tool: await ``coro`` while checking cancellation and deadlines.
+
+        On cancellation or past the tool's deadline the coroutine itself is cancelled.
+        """
+        self.check()
+        task = asyncio.ensure_future(coro)
+        timeout = self.tool_timeouts.get(name, self.timeouts['tool'])
+        started = time.monotonic()
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=CHECK_INTERVAL)
+            if done:
+                return task.result()
+            try:
+                self.check()
+            except RunCancelled:
+                task.cancel()
+                raise
+            if timeout and time.monotonic() - started > timeout:
+                task.cancel()
+                logger.warning(f"Tool {name} exceeded its deadline of {timeout} seconds, cancelling the call")
+                return f"The {name} tool did not respond within {timeout} seconds. Continue without its result."
+
+
+def set_current_control(control):
+    """Make ``control`` the RunControl of the run executing in this thread (None to clear)."""
+    _current.control = control
+
+
+def current_control():
+    return getattr(_current, 'control', None)
+
+
+def check_side_effect():
+    """Raise RunCancelled before a side effect (e.g. sending mail) of a cancelled run or an abandoned tool call."""
+    control = current_control()
+    if control is not None:
+        control.check()
+    abandoned = getattr(_current, 'abandoned', None)
+    if abandoned is not None and abandoned.is_set():
+        raise RunCancelled('timed_out', 'The tool call was abandoned after its deadline')
+
+
+def cancellable_tool(run):
+    """Decorator for BaseTool._run and async _arun methods: run the call under the current RunControl, if any."""
+    if inspect.iscoroutinefunction(run):
+        @functools.wraps(run)
+        async def async_wrapper(self, *args, **kwargs):
+            control = current_control()
+            if control is None:
+                return await run(self, *args, **kwargs)
+            return await control.arun_tool(self.name, run(self, *args, **kwargs))
+        return async_wrapper
+
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        control = current_control()
+        if control is None:
+            return run(self, *args, **kwargs)
+        return control.run_tool(self.name, run, self, *args, **kwargs)
+    return wrapper
+
+
+def make_cancellable(llm):
+    """Wrap ``llm.call`` to check the current RunControl before every call. Idempotent."""
+    if llm is None or getattr(llm, '_cancellable', False):
+        return llm
+    original_call = llm.call
+
+    def call(*args, **kwargs):
+        control = current_control()
+        if control is not None:
+            control.check()
+        return original_call(*args, **kwargs)
+
+    llm.call = call
+    llm._cancellable = True
+    return llm
@@ -0,0 +1,323 @@
+import asyncio
+import hashlib
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from .cancellation import current_control
+from .token_accounting import current_task, new_usage_recorder
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the file layout changes; replaying a cassette of another version fails
+CASSETTE_VERSION = 1
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when the run makes a call that the cassette has no recording for."""
+
+
+class ReplayedError(Exception):
+    """Stand-in for a recorded exception whose type cannot be recreated from its message."""
+
+
+class Cassette:
+    """Recording of a run's outbound interactions: LLM calls, web searches, page fetches and SMTP sessions.
+
+    In 'record' mode interactions pass through to the real services and are appended to the
+    cassette, which save() writes as versioned JSON. In 'replay' mode they are served from the
+    cassette instead, in recorded order per key (agent and task for LLM calls, the query for
+    searches, the URLs for page fetches; SMTP sessions in order, wherever the replaying
+    configuration points). ``latency`` 'original' waits as long as the recorded call took,
+    'zero' answers immediately.
+    """
+
+    def __init__(self, path, mode='record', latency='original', scenario=None):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if latency not in ('original', 'zero'):
+            raise ValueError(f"Unknown cassette latency: {latency}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.scenario = scenario
+        self._lock = threading.Lock()
+        self.interactions = []
+        self._queues = {}  # (kind, key) -> deque of recorded interactions
+        self._warned = set()
+
+    @classmethod
+    def load(cls, path, latency='original'):
+        """Open a recorded cassette for replay."""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != CASSETTE_VERSION:
+            raise ValueError(f"Cassette {path} has version {data.get('version')}, expected {CASSETTE_VERSION}")
+        cassette = cls(path, 'replay', latency, data.get('scenario'))
+        cassette.interactions = data['interactions']
+        for interaction in cassette.interactions:
+            cassette._queues.setdefault((interaction['kind'], interaction['key']), deque()).append(interaction)
+        logger.info(f"Replaying {len(cassette.interactions)} interactions from {path} with {latency} latency")
+        return cassette
+
+    @property
+    def recording(self):
+        return self.mode == 'record'
+
+    def save(self):
+        """Write the recorded interactions to the cassette file."""
+        if not self.recording:
+            return
+        with self._lock:
+            data = {'version': CASSETTE_VERSION, 'recorded_at': datetime.now().isoformat(timespec='seconds'),
+                    'scenario': self.scenario, 'interactions': list(self.interactions)}
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+        os.replace(temporary_path, self.path)
+        logger.info(f"Recorded {len(data['interactions'])} interactions to {self.path}")
+
+    def record(self, kind, key, request, response=None, error=None, latency=0.0, **extra):
+        interaction = {'kind': kind, 'key': key, 'request': request, 'response': response,
+                       'latency_s': round(latency, 4), **extra}
+        if error is not None:
+            interaction['error'] = {'type': f"{type(error).__module__}.{type(error).__qualname__}",
+                                    'message': str(error)}
+        with self._lock:
+            self.interactions.append(interaction)
+
+    async def arecord(self, kind, key, request, coro_func):
+        """Await ``coro_func()`` and record its result, or replay the recorded one for ``key``."""
+        if not self.recording:
+            interaction = self.next(kind, key)
+            await asyncio.sleep(self.delay(interaction))
+            return self.replay_result(interaction, request)
+        started = time.perf_counter()
+        try:
+            response = await coro_func()
+        except Exception as e:
+            self.record(kind, key, request, error=e, latency=time.perf_counter() - started)
+            raise
+        self.record(kind, key, request, response, latency=time.perf_counter() - started)
+        return response
+
+    def next(self, kind, key):
+        """Pop the next recorded interaction for ``key``, or raise CassetteMiss."""
+        with self._lock:
+            queue = self._queues.get((kind, key))
+            if not queue:
+                raise CassetteMiss(f"No recorded {kind} interaction left for {key!r} in {self.path}")
+            return queue.popleft()
+
+    def delay(self, interaction):
+        return interaction['latency_s'] if self.latency == 'original' else 0.0
+
+    def check_request(self, interaction, request):
+        """Warn once per key when a replayed request differs from the recorded one (e.g. an embedded date)."""
+        if interaction['request'] != request and interaction['key'] not in self._warned:
+            self._warned.add(interaction['key'])
+            logger.warning(f"Replayed {interaction['kind']} request for {interaction['key']!r} differs from the recording")
+
+    def replay_result(self, interaction, request=None):
+        """The recorded response of ``interaction``, or its recorded exception raised again."""
+        if request is not None:
+            self.check_request(interaction, request)
+        error = interaction.get('error')
+        if error:
+            raise _recreate_error(error)
+        return interaction['response']
+
+
+def _recreate_error(error):
+    module_name, _, class_name = error['type'].rpartition('.')
+    try:
+        error_type = getattr(importlib.import_module(module_name), class_name)
+        return error_type(error['message'])
+    except Exception:
+        return ReplayedError(f"{error['type']}: {error['message']}")
+
+
+def active_cassette():
+    """Cassette of the run executing in this thread, which its LLM, search, fetch and SMTP calls go through, or None.
+
+    It is the ``cassette`` of the thread's RunControl, so overlapping runs each use their own.
+    """
+    control = current_control()
+    return control.cassette if control is not None else None
+
+
+def cassette_from_env(scenario=None):
+    """Cassette configured by SUPPLIER_ANALYSIS_CASSETTE (path), _CASSETTE_MODE and _CASSETTE_LATENCY, or None."""
+    path = os.environ.get('SUPPLIER_ANALYSIS_CASSETTE')
+    if not path:
+        return None
+    mode = os.environ.get('SUPPLIER_ANALYSIS_CASSETTE_MODE', 'replay')
+    latency = os.environ.get('SUPPLIER_ANALYSIS_CASSETTE_LATENCY', 'original')
+    if mode == 'replay':
+        return Cassette.load(path, latency)
+    return Cassette(path, mode, latency, scenario)
+
+
+def _messages_digest(messages):
+    return hashlib.sha256(json.dumps(messages, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def record_llm_calls(llm):
+    """Wrap ``llm.call`` to record it to or replay it from the active cassette. Idempotent.
+
+    The usage CrewAI reports through the callbacks is recorded too and reported again on
+    replay, so token accounting sees the same numbers.
+    """
+    if llm is None or getattr(llm, '_cassette_hooked', False):
+        return llm
+    original_call = llm.call
+
+    def call(messages, tools=None, callbacks=None, available_functions=None):
+        cassette = active_cassette()
+        if cassette is None:
+            return original_call(messages, tools, callbacks, available_functions)
+        agent, task = current_task()
+        key = f"{agent}/{task}"
+        request = {'model': getattr(llm, 'model', None), 'messages_sha256': _messages_digest(messages)}
+        if not cassette.recording:
+            interaction = cassette.next('llm', key)
+            time.sleep(cassette.delay(interaction))
+            usage = interaction.get('usage')
+            for callback in callbacks or []:
+                if usage and hasattr(callback, 'log_success_event'):
+                    callback.log_success_event(kwargs={}, response_obj={'usage': usage}, start_time=0, end_time=0)
+            return cassette.replay_result(interaction, request)
+        recorder = new_usage_recorder()
+        started = time.perf_counter()
+        try:
+            response = original_call(messages, tools, [*(callbacks or []), recorder], available_functions)
+        except Exception as e:
+            cassette.record('llm', key, request, error=e, latency=time.perf_counter() - started)
+            raise
+        latency = time.perf_counter() - started
+        usage = ({field: _usage_field(recorder.usage, field) for field in ('prompt_tokens', 'completion_tokens', 'total_tokens')}
+                 if recorder.usage else None)
+        cassette.record('llm', key, request, response, latency=latency, usage=usage)
+        return response
+
+    llm.call = call
+    llm._cassette_hooked = True
+    return llm
+
+
+def _usage_field(usage, field):
+    if isinstance(usage, dict):
+        return int(usage.get(field) or 0)
+    return int(getattr(usage, field, 0) or 0)
+
+
+class CassetteSearchClient:
+    """Search client recording to or replaying from a cassette; ``open_client`` creates the real client when recording."""
+
+    def __init__(self, cassette, open_client):
+        self.cassette = cassette
+        self.client = open_client() if cassette.recording else None
+
+    async def __aenter__(self):
+        if self.client is not None:
+            await self.client.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return await self.client.__aexit__(exc_type, exc, tb) if self.client is not None else False
+
+    async def atext(self, keywords, **kwargs):
+        key = f"{keywords} (max {kwargs.get('max_results')})"
+        if not self.cassette.recording:
+            interaction = self.cassette.next('search', key)
+            await asyncio.sleep(self.cassette.delay(interaction))
+            return self.cassette.replay_result(interaction)
+        started = time.perf_counter()
+        try:
+            results = await self.client.atext(keywords, **kwargs)
+        except Exception as e:
+            self.cassette.record('search', key, {'keywords': keywords}, error=e, latency=time.perf_counter() - started)
+            raise
+        self.cassette.record('search', key, {'keywords': keywords}, results, latency=time.perf_counter() - started)
+        return results
+
+
+class CassetteSMTP:
+    """AsyncSMTP session recording to or replaying from a cassette, as one interaction per session.
+
+    The interaction holds the steps taken and, if one failed, its error; replay raises it at the same step.
+    """
+
+    def __init__(self, cassette, host, port, timeout=30):
+        self.cassette = cassette
+        self.key = 'session'
+        self.host, self.port, self.timeout = host, port, timeout
+        self.server = None
+        self.steps = []
+        self.sent = []
+        self.interaction = None  # the replayed interaction
+        self.recorded = False
+        self.started = None
+
+    async def _step(self, name, operation=None):
+        self.steps.append(name)
+        if not self.cassette.recording:
+            failed = self.interaction['response'].get('failed_step')
+            if failed == name:
+                self.cassette.replay_result(self.interaction)
+            return
+        try:
+            await operation()
+        except Exception as e:
+            self.cassette.record('smtp', self.key, self._request(), {'failed_step': name}, error=e, latency=time.perf_counter() - self.started)
+            self.recorded = True
+            raise
+
+    async def __aenter__(self):
+        self.started = time.perf_counter()
+        if not self.cassette.recording:
+            self.interaction = self.cassette.next('smtp', self.key)
+            await asyncio.sleep(self.cassette.delay(self.interaction))
+            await self._step('connect')
+            return self
+        from .async_smtp import AsyncSMTP
+        self.server = AsyncSMTP(self.host, self.port, self.timeout)
+        await self._step('connect', self.server.__aenter__)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.cassette.recording:
+            try:
+                await self.server.__aexit__(exc_type, exc, tb)
+            finally:
+                if not self.recorded:
+                    self.cassette.record('smtp', self.key, self._request(), {},
+                                         latency=time.perf_counter() - self.started)
+        return False
+
+    def _request(self):
+        return {'server': f"{self.host}:{self.port}", 'steps': self.steps, 'messages': self.sent}
+
+    async def starttls(self):
+        await self._step('starttls', self.server.starttls if self.server else None)
+
+    async def login(self, user, password):
+        await self._step('login', (lambda: self.server.login(user, password)) if self.server else None)
+
+    async def send_message(self, msg):
+        self.sent.append({'to': msg['To'], 'subject': msg['Subject']})
+        await self._step('send_message', (lambda: self.server.send_message(msg)) if self.server else None)
+
+
+def open_smtp(host, port, timeout=30):
+    """AsyncSMTP session, recorded or replayed when a cassette is active."""
+    cassette = active_cassette()
+    if cassette is not None:
+        return CassetteSMTP(cassette, host, port, timeout)
+    from .async_smtp import AsyncSMTP
+    return AsyncSMTP(host, port, timeout)
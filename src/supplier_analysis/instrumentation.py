@@ -0,0 +1,167 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# Histogram bucket upper bounds in seconds, from log parsing (sub-millisecond) up to LLM tasks (minutes)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+METRIC_NAME = 'supplier_analysis_span_duration_seconds'
+
+_enabled = os.environ.get('SUPPLIER_ANALYSIS_INSTRUMENTATION', '1').lower() not in ('0', 'false', 'no')
+_lock = threading.Lock()
+_histograms = {}
+_timeline = None
+_timeline_origin = 0.0
+_NOOP_SPAN = nullcontext()
+
+
+def is_enabled():
+    return _enabled
+
+
+def set_enabled(enabled):
+    """Switch instrumentation on or off at runtime; disabled spans cost a single function call."""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+class _Span:
+    __slots__ = ('name', 'labels', 'timeline', 'started')
+
+    def __init__(self, name, labels, timeline):
+        self.name = name
+        self.labels = labels
+        self.timeline = timeline
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _observe(self.name, self.labels, self.started, time.perf_counter(), self.timeline, exc_type is not None)
+        return False
+
+
+def span(name, timeline=True, **labels):
+    """Context manager timing a block into the span histogram.
+
+    With ``timeline=True`` the span is also appended to the active run timeline; hot paths
+    such as log capture pass ``timeline=False`` and only feed the histogram.
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(name, labels, timeline)
+
+
+def record_span(name, started, timeline=True, fields=None, **labels):
+    """Record a span that started at ``started`` (time.perf_counter()) and ends now.
+
+    ``fields`` are added to the timeline entry only, not to the histogram labels. Returns the
+    end time, so consecutive phases can be chained.
+    """
+    ended = time.perf_counter()
+    if _enabled:
+        _observe(name, labels, started, ended, timeline, False, fields)
+    return ended
+
+
+def mean_duration(name, **labels):
+    """Mean duration in seconds of the spans ``name`` recorded in this process with ``labels`` (and any others), or None."""
+    wanted = {(k, str(v)) for k, v in labels.items()}
+    total, count = 0.0, 0
+    with _lock:
+        for (span_name, span_labels), histogram in _histograms.items():
+            if span_name == name and wanted <= set(span_labels):
+                total += histogram['sum']
+                count += histogram['count']
+    return total / count if count else None
+
+
+def traced_tool(run):
+    """Decorator for BaseTool._run and async _arun methods recording a 'tool' span labelled with the tool name."""
+    if inspect.iscoroutinefunction(run):
+        @functools.wraps(run)
+        async def async_wrapper(self, *args, **kwargs):
+            with span('tool', tool=self.name):
+                return await run(self, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        with span('tool', tool=self.name):
+            return run(self, *args, **kwargs)
+    return wrapper
+
+
+def _observe(name, labels, started, ended, timeline, failed, fields=None):
+    duration = ended - started
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'buckets': [0] * len(DEFAULT_BUCKETS), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(DEFAULT_BUCKETS):
+            if duration <= bound:
+                histogram['buckets'][i] += 1
+        histogram['sum'] += duration
+        histogram['count'] += 1
+        if timeline and _timeline is not None:
+            entry = {'span': name, **labels,
+                     'start_s': round(started - _timeline_origin, 4),
+                     'duration_s': round(duration, 4)}
+            if fields:
+                entry.update(fields)
+            if failed:
+                entry['error'] = True
+            _timeline.append(entry)
+
+
+def start_timeline():
+    """Begin collecting timeline spans for a new run and return the (live) timeline list."""
+    global _timeline, _timeline_origin
+    with _lock:
+        _timeline = []
+        _timeline_origin = time.perf_counter()
+        return _timeline
+
+
+def stop_timeline():
+    """Stop collecting timeline spans and return the finished timeline."""
+    global _timeline
+    with _lock:
+        timeline, _timeline = _timeline, None
+        return timeline or []
+
+
+def reset_metrics():
+    with _lock:
+        _histograms.clear()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (k + '="' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for k, v in labels)
+    return '{' + ','.join(escaped) + '}'
+
+
+def render_prometheus():
+    """Render all span histograms in the Prometheus text exposition format."""
+    with _lock:
+        snapshot = {key: {'buckets': list(h['buckets']), 'sum': h['sum'], 'count': h['count']}
+                    for key, h in _histograms.items()}
+
+    lines = [f"# HELP {METRIC_NAME} Duration of instrumented pipeline spans.",
+             f"# TYPE {METRIC_NAME} histogram"]
+    for (name, labels), histogram in sorted(snapshot.items()):
+        base = (('span', name),) + labels
+        for bound, count in zip(DEFAULT_BUCKETS, histogram['buckets']):
+            lines.append(f"{METRIC_NAME}_bucket{_format_labels(base + (('le', repr(float(bound))),))} {count}")
+        lines.append(f"{METRIC_NAME}_bucket{_format_labels(base + (('le', '+Inf'),))} {histogram['count']}")
+        lines.append(f"{METRIC_NAME}_sum{_format_labels(base)} {histogram['sum']:.6f}")
+        lines.append(f"{METRIC_NAME}_count{_format_labels(base)} {histogram['count']}")
+    return "\n".join(lines) + "\n"
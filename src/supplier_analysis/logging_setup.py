@@ -0,0 +1,116 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+CAPTURE_LOGGER_NAME = 'supplier_analysis.capture'
+
+_listener = None
+_queue_handler = None
+_capture_sample_rate = 0.0
+
+
+def configure_logging(level=None, log_file=None, capture_debug=None):
+    """Route all log records through a queue to a background listener thread.
+
+    Loggers only enqueue records; the listener thread writes them to the console and,
+    with SUPPLIER_ANALYSIS_LOG_FILE (or ``log_file``), to a file. The level comes from
+    SUPPLIER_ANALYSIS_LOG_LEVEL (default INFO). Log capture diagnostics are off unless
+    SUPPLIER_ANALYSIS_CAPTURE_DEBUG sets a sample rate (1 logs every diagnostic, 0.1 every tenth).
+    Calling it again has no effect.
+    """
+    global _listener, _queue_handler, _capture_sample_rate
+    if _listener is not None:
+        return _listener
+
+    level = level or os.environ.get('SUPPLIER_ANALYSIS_LOG_LEVEL', 'INFO').upper()
+    log_file = log_file or os.environ.get('SUPPLIER_ANALYSIS_LOG_FILE')
+    if capture_debug is None:
+        capture_debug = os.environ.get('SUPPLIER_ANALYSIS_CAPTURE_DEBUG', '0')
+    _capture_sample_rate = min(max(float(capture_debug), 0.0), 1.0)
+
+    formatter = logging.Formatter('%(levelname)s:%(name)s:%(message)s')
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(formatter)
+    handlers = [console_handler]
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s:%(name)s:%(message)s'))
+        handlers.append(file_handler)
+
+    _queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(_queue_handler)
+    root_logger.setLevel(level)
+
+    # Diagnostics only go to the console/file, never into the UI logs attached to the root logger
+    capture_logger = logging.getLogger(CAPTURE_LOGGER_NAME)
+    capture_logger.propagate = False
+    capture_logger.addHandler(_queue_handler)
+    capture_logger.setLevel(logging.DEBUG if _capture_sample_rate > 0 else logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    # Forked server processes have no listener thread, so they log synchronously
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_log_directly)
+    return _listener
+
+
+def _log_directly():
+    for logger in (logging.getLogger(), logging.getLogger(CAPTURE_LOGGER_NAME)):
+        if _queue_handler in logger.handlers:
+            logger.removeHandler(_queue_handler)
+            for handler in _listener.handlers:
+                logger.addHandler(handler)
+
+
+def capture_diagnostics_enabled():
+    """Whether this log capture diagnostic should be emitted, honouring the sample rate."""
+    return _capture_sample_rate > 0 and (_capture_sample_rate >= 1 or random.random() < _capture_sample_rate)
+
+
+class AsyncConsoleWriter:
+    """Write text to a stream from a background thread, so callers never wait on terminal I/O."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='console-writer', daemon=True)
+        self._thread.start()
+
+    def write(self, text):
+        self._queue.put(text)
+
+    def close(self):
+        """Write everything queued so far and stop the thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            text = self._queue.get()
+            if text is None:
+                break
+            try:
+                self.stream.write(text)
+                # Drain what queued up meanwhile before paying for a flush
+                while True:
+                    try:
+                        text = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if text is None:
+                        self.stream.flush()
+                        return
+                    self.stream.write(text)
+                self.stream.flush()
+            except Exception:
+                pass
@@ -0,0 +1,50 @@
+import os
+from collections import namedtuple
+
+# [tool.crewai.models.auto]: when enabled, the listed lightweight tasks run on ``fast_model``
+# unless their agent has a model of its own, and run again on the agent's model when their
+# output fails validation
+DEFAULT_AUTO_POLICY = {'enabled': False, 'fast_model': 'gpt-4o-mini',
+                       'tasks': ('availability_analysis', 'executive_summary')}
+
+MODEL_SETTINGS = ('model', 'temperature', 'max_tokens')
+
+ModelChoice = namedtuple('ModelChoice', 'model temperature max_tokens baseline_model auto',
+                         defaults=(None, None, None, None, False))
+ModelChoice.__doc__ = """LLM settings of an agent.
+
+``model`` None means CrewAI's default model. ``baseline_model`` is the model the agent uses
+without the auto policy; ``auto`` tells whether the policy moved it to the fast model.
+"""
+
+
+def default_model():
+    """The model CrewAI gives agents without an LLM of their own."""
+    from crewai.cli.constants import DEFAULT_LLM_MODEL
+    return os.environ.get('OPENAI_MODEL_NAME') or DEFAULT_LLM_MODEL
+
+
+def choose_model(config, role, task):
+    """ModelChoice of agent ``role`` for ``task`` from the [tool.crewai.models] section ``config``.
+
+    Agent settings in [tool.crewai.models.agents."<role>"] override the section's defaults.
+    """
+    agent_config = config.get('agents', {}).get(role, {})
+    settings = {key: agent_config.get(key, config.get(key)) for key in MODEL_SETTINGS}
+    baseline_model = settings['model'] or default_model()
+    auto = {**DEFAULT_AUTO_POLICY, **config.get('auto', {})}
+    if (auto['enabled'] and task in auto['tasks'] and 'model' not in agent_config
+            and auto['fast_model'] != baseline_model):
+        return ModelChoice(auto['fast_model'], settings['temperature'], settings['max_tokens'], baseline_model, True)
+    return ModelChoice(settings['model'], settings['temperature'], settings['max_tokens'], baseline_model)
+
+
+def build_llm(choice, model=None):
+    """CrewAI LLM for ``choice``, on ``model`` instead of its own if given; None when nothing is configured."""
+    model = model or choice.model
+    if model is None and choice.temperature is None and choice.max_tokens is None:
+        return None
+    from crewai import LLM
+    options = {key: value for key, value in (('temperature', choice.temperature), ('max_tokens', choice.max_tokens))
+               if value is not None}
+    return LLM(model=model or default_model(), **options)
@@ -0,0 +1,207 @@
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+from .instrumentation import span
+from .run_state import create_monitor_store
+from .supplier_analysis import SCENARIO_FILES, compute_demand_signals, get_crewai_section
+
+logger = logging.getLogger(__name__)
+
+# Overridable in [tool.crewai.monitor]: seconds between checks, seconds after a triggered run
+# during which new conditions are held back, and the demand trend (in %) that counts as rising
+DEFAULT_MONITOR = {'enabled': False, 'interval': 300, 'cooldown': 6 * 3600, 'trend_threshold': 20.0}
+
+# Tracked parts when [[tool.crewai.monitor.parts]] lists none: the valve of the bundled data.
+# 'history' is the demand history file, 'scenario' selects the supplier file and the run to start
+DEFAULT_PARTS = ({'part': 'VQC4101-51', 'scenario': 'standard', 'history': 'valve_history.csv'},)
+
+# Conditions that hold as long as the data says so; 'availability_changed' is reported once per change
+LEVEL_CONDITIONS = ('below_safety_stock', 'below_reorder_point', 'demand_rising')
+
+PartCheck = namedtuple('PartCheck', 'part conditions new triggered run_id skipped')
+PartCheck.__doc__ = """Outcome of checking one part.
+
+``conditions`` are the conditions that hold, ``new`` those not reported before, ``triggered``
+tells whether a run was started for them (``run_id``). ``skipped`` checks found the data files
+unchanged since the last check and did not read them.
+"""
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _signature(paths):
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        signature.append([stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def evaluate_part(part, history_path, supplier_path, trend_threshold):
+    """(DemandSignals, active level conditions, {supplier: availability}) of ``part`` from its data files."""
+    history_df = pd.read_csv(history_path, usecols=['date', 'valves_used', 'inventory_level', 'lead_time_days'])
+    history_df['date'] = pd.to_datetime(history_df['date'])
+    signals = compute_demand_signals(history_df)
+    conditions = []
+    if signals.current_inventory < signals.safety_stock_level:
+        conditions.append('below_safety_stock')
+    if signals.current_inventory <= signals.reorder_point:
+        conditions.append('below_reorder_point')
+    if signals.trend_pct >= trend_threshold:
+        conditions.append('demand_rising')
+
+    suppliers_df = pd.read_csv(supplier_path, usecols=['supplier_name', 'product', 'availability'])
+    offering = suppliers_df[suppliers_df['product'].str.contains(part, regex=False)]
+    if offering.empty:
+        offering = suppliers_df
+    availability = dict(zip(offering['supplier_name'], offering['availability']))
+    return signals, conditions, availability
+
+
+class MonitorScheduler:
+    """Checks the tracked parts on a timer and starts the crew only when something needs attention.
+
+    A check reads a part's demand history and supplier file (skipped while both are unchanged),
+    evaluates the inventory against the safety stock, the reorder point and the demand trend,
+    and compares supplier availability with what the last triggered run saw. Only conditions
+    that were not reported before start a run; conditions that clear are re-armed. New
+    conditions found during the cooldown after a run, or while a run is busy, stay pending and
+    are retried on the next check. The per-part state is persisted, so a restart does not
+    report the same conditions again.
+
+    ``trigger(scenario, reason)`` starts a run and returns its id, or None if none could start.
+    """
+
+    def __init__(self, trigger, store=None, config=None):
+        self.trigger = trigger
+        self.store = store
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._parts = {}  # part -> last PartCheck
+        self.stats = {'checks': 0, 'skipped': 0, 'triggers': 0, 'last_check': None, 'last_check_ms': None}
+        self.configure(config)
+
+    def configure(self, config=None):
+        config = config or {}
+        with self._lock:
+            self.config = {key: config.get(key, default) for key, default in DEFAULT_MONITOR.items()}
+            self.parts = [dict(part) for part in config.get('parts') or DEFAULT_PARTS]
+
+    def check(self):
+        """Check every tracked part once; returns their PartChecks."""
+        started = time.perf_counter()
+        with self._lock, span('monitor_check', timeline=False):
+            results = []
+            for part in self.parts:
+                try:
+                    results.append(self._check_part(part))
+                except Exception as e:
+                    logger.error(f"Error checking part {part.get('part')}: {str(e)}")
+            self.stats['checks'] += 1
+            self.stats['last_check'] = time.time()
+            self.stats['last_check_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            return results
+
+    def _check_part(self, part):
+        name = part['part']
+        scenario = part.get('scenario', 'standard')
+        history_path = os.path.join(DATA_DIR, part.get('history', 'valve_history.csv'))
+        supplier_path = os.path.join(DATA_DIR, part.get('suppliers') or SCENARIO_FILES.get(scenario, SCENARIO_FILES['standard']))
+        state = (self.store.load(name) if self.store else None) or self._parts.get(name, {}).get('state') or {}
+        signature = _signature((history_path, supplier_path))
+
+        if state.get('signature') == signature and not state.get('pending'):
+            self.stats['skipped'] += 1
+            result = PartCheck(name, state.get('active', []), [], False, None, True)
+            self._remember(name, state, result)
+            return result
+
+        signals, conditions, availability = evaluate_part(name, history_path, supplier_path,
+                                                          self.config['trend_threshold'])
+        known_availability = state.get('availability')
+        if known_availability is not None and known_availability != availability:
+            conditions.append('availability_changed')
+        reported = set(state.get('active', []))
+        new = [condition for condition in conditions if condition not in reported]
+
+        state = {**state, 'signature': signature, 'signals': signals._asdict()}
+        if known_availability is None:
+            state['availability'] = availability
+        run_id = None
+        if new:
+            since_trigger = time.time() - state.get('last_trigger', 0)
+            if since_trigger < self.config['cooldown']:
+                logger.info(f"Monitor: {name} {', '.join(new)}, held back during the cooldown "
+                            f"({self.config['cooldown'] - since_trigger:.0f}s left)")
+            else:
+                reason = f"{name}: {', '.join(new)}"
+                run_id = self.trigger(scenario, reason)
+                if run_id is None:
+                    logger.info(f"Monitor: {reason}, no run could start, retrying on the next check")
+                else:
+                    self.stats['triggers'] += 1
+                    logger.info(f"Monitor: {reason}, started run {run_id}")
+                    state.update(last_trigger=time.time(), last_run_id=run_id, availability=availability)
+        triggered = run_id is not None
+        state['pending'] = bool(new) and not triggered
+        # Reported conditions that cleared are re-armed; pending ones are not reported yet
+        state['active'] = [condition for condition in conditions if condition in LEVEL_CONDITIONS
+                           and (triggered or condition in reported)]
+        if self.store:
+            self.store.save(name, state)
+        result = PartCheck(name, conditions, new, triggered, run_id, False)
+        self._remember(name, state, result)
+        return result
+
+    def _remember(self, name, state, result):
+        self._parts[name] = {'state': state, 'check': result}
+
+    def status(self):
+        """Scheduler settings, counters and the last check of each part, for /api/monitor."""
+        parts = {}
+        for name, entry in self._parts.items():
+            state, result = entry['state'], entry['check']
+            parts[name] = {'conditions': result.conditions, 'pending': state.get('pending', False),
+                           'signals': state.get('signals'), 'availability': state.get('availability'),
+                           'last_trigger': state.get('last_trigger'), 'last_run_id': state.get('last_run_id')}
+        return {'running': self._thread is not None and self._thread.is_alive(), **self.config, **self.stats,
+                'parts': parts}
+
+    def start(self):
+        """Check in a background thread every ``interval`` seconds until stop()."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def run_forever(self):
+        logger.info(f"Monitoring {', '.join(part['part'] for part in self.parts)} "
+                    f"every {self.config['interval']}s")
+        while not self._stop.is_set():
+            self.check()
+            self._stop.wait(self.config['interval'])
+
+
+def monitoring_enabled():
+    """On when [tool.crewai.monitor] enables it or SUPPLIER_ANALYSIS_MONITOR=1; SUPPLIER_ANALYSIS_MONITOR=0 turns it off."""
+    override = os.environ.get('SUPPLIER_ANALYSIS_MONITOR')
+    if override is not None:
+        return override != '0'
+    return bool(get_crewai_section('monitor').get('enabled', DEFAULT_MONITOR['enabled']))
+
+
+def create_monitor(trigger):
+    """MonitorScheduler starting runs through ``trigger``, configured from [tool.crewai.monitor]."""
+    return MonitorScheduler(trigger, store=create_monitor_store(), config=get_crewai_section('monitor'))
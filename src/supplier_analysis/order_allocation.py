@@ -0,0 +1,175 @@
+import itertools
+import logging
+import time
+
+from .stockout_simulation import ORDERABLE_STATES, parse_rate
+
+logger = logging.getLogger(__name__)
+
+# Up to this many orderable suppliers every subset is enumerated, which is exact and still takes milliseconds
+EXACT_SUPPLIER_LIMIT = 12
+
+
+def expected_unit_cost(price, defect_rate, on_time_rate, defect_cost_factor=1.0, late_cost_factor=0.1):
+    """Price plus the expected cost of replacing defective units and of late deliveries."""
+    return price * (1 + defect_rate * defect_cost_factor + (1 - on_time_rate) * late_cost_factor)
+
+
+def allocate_order(suppliers_df, quantity, max_defect_rate=None, min_on_time_rate=None,
+                   max_supplier_share=1.0, limited_stock_share=0.5,
+                   defect_cost_factor=1.0, late_cost_factor=0.1):
+    """Split an order across the orderable suppliers at minimum expected total cost.
+
+    Constraints:
+    - a supplier either gets nothing or at least its minimum order quantity
+    - suppliers above ``max_defect_rate`` or below ``min_on_time_rate`` are excluded
+    - no supplier gets more than ``max_supplier_share`` of the quantity, "Limited Stock"
+      suppliers no more than ``limited_stock_share``, unless the whole order is no larger
+      than the supplier's minimum order quantity: then it may take the order alone
+
+    Minimum order quantities may force buying slightly more than ``quantity``. The result
+    always carries a lower bound (the LP relaxation without minimum order quantities, or the
+    order rounded up at a single supplier), so the optimality gap is known even for the
+    greedy fallback. A non-positive ``quantity`` raises ValueError.
+    """
+    start = time.perf_counter()
+    quantity = int(quantity)
+    if quantity <= 0:
+        raise ValueError(f"Order quantity must be positive, got {quantity}")
+    candidates, excluded = [], []
+
+    for _, supplier in suppliers_df.iterrows():
+        name = supplier['supplier_name']
+        if supplier['availability'] not in ORDERABLE_STATES:
+            excluded.append({'supplier': name, 'reason': supplier['availability']})
+            continue
+        defect_rate = parse_rate(supplier['quality_defect_rate'])
+        on_time_rate = parse_rate(supplier['on_time_delivery_rate'])
+        if max_defect_rate is not None and defect_rate > max_defect_rate:
+            excluded.append({'supplier': name, 'reason': f"defect rate {defect_rate:.1%} above limit"})
+            continue
+        if min_on_time_rate is not None and on_time_rate < min_on_time_rate:
+            excluded.append({'supplier': name, 'reason': f"on-time rate {on_time_rate:.1%} below limit"})
+            continue
+
+        share = limited_stock_share if supplier['availability'] == 'Limited Stock' else max_supplier_share
+        capacity = int(quantity * share)
+        minimum_order = int(supplier.get('minimum_order_quantity', 0) or 0)
+        # An order no larger than the minimum order quantity can still go to this supplier alone
+        if capacity < max(minimum_order, 1) and quantity > minimum_order:
+            excluded.append({'supplier': name, 'reason': f"capacity {capacity} below minimum order quantity {minimum_order}"})
+            continue
+
+        price = float(supplier['price_per_unit'])
+        candidates.append({
+            'supplier': name,
+            'availability': supplier['availability'],
+            'unit_price': price,
+            'expected_unit_cost': expected_unit_cost(price, defect_rate, on_time_rate, defect_cost_factor, late_cost_factor),
+            'minimum_order_quantity': minimum_order,
+            'capacity': capacity,
+        })
+
+    candidates.sort(key=lambda c: c['expected_unit_cost'])
+    lower_bound = _relaxation_bound(candidates, quantity)
+
+    if len(candidates) <= EXACT_SUPPLIER_LIMIT:
+        method = 'exact'
+        best = None
+        for size in range(1, len(candidates) + 1):
+            for subset in itertools.combinations(candidates, size):
+                allocation = _fill_subset(subset, quantity)
+                if allocation and (best is None or _cost(allocation) < _cost(best)):
+                    best = allocation
+    else:
+        method = 'greedy'
+        best = _greedy(candidates, quantity)
+        for c in candidates:
+            single = _fill_subset((c,), quantity)
+            if single and (best is None or _cost(single) < _cost(best)):
+                best = single
+
+    result = {
+        'requested_quantity': quantity,
+        'feasible': best is not None,
+        'method': method,
+        'allocations': [],
+        'total_quantity': 0,
+        'expected_total_cost': None,
+        'lower_bound': round(lower_bound, 2) if lower_bound is not None else None,
+        'optimality_gap': None,
+        'excluded': excluded,
+    }
+    if best:
+        total_cost = _cost(best)
+        total_quantity = sum(units for _, units in best)
+        result.update({
+            'allocations': [{
+                'supplier': c['supplier'],
+                'availability': c['availability'],
+                'quantity': units,
+                'share': round(units / total_quantity, 3),
+                'unit_price': c['unit_price'],
+                'expected_unit_cost': round(c['expected_unit_cost'], 2),
+                'expected_cost': round(units * c['expected_unit_cost'], 2),
+            } for c, units in best],
+            'total_quantity': total_quantity,
+            'expected_total_cost': round(total_cost, 2),
+            'optimality_gap': round(total_cost / lower_bound - 1, 4) if lower_bound else None,
+        })
+    result['solve_time_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    logger.info(f"Allocated {result['total_quantity']} of {quantity} units across {len(result['allocations'])} suppliers ({method})")
+    return result
+
+
+def _cost(allocation):
+    return sum(c['expected_unit_cost'] * units for c, units in allocation)
+
+
+def _fill_subset(subset, quantity):
+    """Optimal allocation when exactly the suppliers in ``subset`` are used (sorted by unit cost)."""
+    if len(subset) == 1 and quantity <= subset[0]['minimum_order_quantity']:
+        return [(subset[0], subset[0]['minimum_order_quantity'])]
+    if any(c['capacity'] < max(c['minimum_order_quantity'], 1) for c in subset):
+        return None
+    units = [c['minimum_order_quantity'] for c in subset]
+    remaining = quantity - sum(units)
+    for i, c in enumerate(subset):
+        if remaining <= 0:
+            break
+        extra = min(c['capacity'] - units[i], remaining)
+        units[i] += extra
+        remaining -= extra
+    if remaining > 0 or any(u <= 0 for u in units):
+        return None
+    return list(zip(subset, units))
+
+
+def _greedy(candidates, quantity):
+    """Cheapest-first allocation that tops every selected supplier up to its capacity."""
+    allocation, remaining = [], quantity
+    for c in candidates:
+        if remaining <= 0:
+            break
+        if c['capacity'] < max(c['minimum_order_quantity'], 1):
+            continue
+        units = min(max(remaining, c['minimum_order_quantity']), c['capacity'])
+        allocation.append((c, units))
+        remaining -= units
+    return allocation if remaining <= 0 else None
+
+
+def _relaxation_bound(candidates, quantity):
+    """Lower bound on any allocation: the fractional fill that ignores minimum order quantities,
+    or a cheaper single supplier taking the order rounded up to its minimum order quantity."""
+    bounds = [c['minimum_order_quantity'] * c['expected_unit_cost'] for c in candidates
+              if quantity <= c['minimum_order_quantity']]
+    remaining, cost = quantity, 0.0
+    for c in candidates:
+        units = min(c['capacity'], remaining)
+        cost += units * c['expected_unit_cost']
+        remaining -= units
+        if remaining <= 0:
+            bounds.append(cost)
+            break
+    return min(bounds) if bounds else None
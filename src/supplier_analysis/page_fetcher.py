@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from urllib.parse import urlsplit
+
+import httpx
+from lxml import etree
+
+from .cassette import active_cassette
+
+logger = logging.getLogger(__name__)
+
+# Overridable in [tool.crewai.fetch]: pages fetched per search, concurrent requests per host and
+# in total, bytes read per page, seconds per page, seconds a cached page is reused without
+# revalidation, and cached URLs
+DEFAULT_LIMITS = {'max_pages': 3, 'per_host': 2, 'max_connections': 10, 'max_bytes': 512 * 1024,
+                  'timeout': 8.0, 'fresh_seconds': 300, 'cache_size': 256}
+
+USER_AGENT = 'Mozilla/5.0 (compatible; SupplierAnalysis/1.0; +price-check)'
+
+# Price amounts next to a currency symbol or code, e.g. "$151.20", "149,90 €", "USD 99"
+PRICE_PATTERN = re.compile(
+    r'(?:(?:[$€£]|USD|EUR|GBP)\s?(?:\d{1,3}(?:[.,\s]\d{3})*(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?))'
+    r'|(?:(?:\d{1,3}(?:[.,\s]\d{3})*(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?)\s?(?:[$€£]|USD|EUR|GBP)(?![A-Za-z]))')
+
+# Availability phrases in English and German shop pages; out-of-stock phrases are checked first
+OUT_OF_STOCK_MARKERS = ('out of stock', 'sold out', 'currently unavailable', 'not available', 'nicht lieferbar',
+                        'nicht verfügbar', 'ausverkauft')
+IN_STOCK_MARKERS = ('in stock', 'available from stock', 'ships today', 'auf lager', 'ab lager', 'lieferbar',
+                    'sofort verfügbar')
+
+# Elements whose text never holds prices
+_SKIPPED_TAGS = {'script', 'style', 'noscript', 'svg', 'template', 'head'}
+
+PageInfo = namedtuple('PageInfo', 'url status prices stock cached truncated error', defaults=((), None, False, False, None))
+PageInfo.__doc__ = """Price and stock markers found on a page.
+
+``prices`` are the schema.org offer prices, or else the first distinct currency amounts of the
+visible text, ``stock`` is 'in stock', 'out of
+stock' or None, ``cached`` tells whether the result came from the cache (fresh or revalidated),
+``truncated`` whether the page was cut off at the size limit.
+"""
+
+
+def _format_price(match):
+    return ' '.join(match.group(0).split())
+
+
+def _stock_marker(text):
+    lowered = text.lower()
+    if any(marker in lowered for marker in OUT_OF_STOCK_MARKERS):
+        return 'out of stock'
+    if any(marker in lowered for marker in IN_STOCK_MARKERS):
+        return 'in stock'
+    return None
+
+
+class _MarkerScanner:
+    """Incremental HTML scan for price and stock markers.
+
+    Chunks are fed to lxml's pull parser as they arrive. Structured data (schema.org
+    ``itemprop`` price, priceCurrency and availability) replaces prices and stock phrases
+    matched in the visible text, which also catch shipping thresholds and the like. Finished elements are cleared so memory stays flat.
+    """
+
+    def __init__(self, encoding=None, max_prices=3):
+        self.parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding or 'utf-8')
+        self.max_prices = max_prices
+        self.text_prices = []
+        self.structured_prices = []
+        self.currency = ''
+        self.stock = None
+        self.structured_stock = None
+        self._skipping = 0
+
+    @property
+    def prices(self):
+        if self.structured_prices:
+            return list(dict.fromkeys(f"{amount} {self.currency}".strip() for amount in self.structured_prices))
+        return list(dict.fromkeys(self.text_prices))
+
+    @property
+    def done(self):
+        return bool(self.structured_prices or self.text_prices) and (self.structured_stock or self.stock) is not None
+
+    def feed(self, chunk):
+        self.parser.feed(chunk)
+        self._scan()
+
+    def close(self):
+        try:
+            self.parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        self._scan()
+        self.stock = self.structured_stock or self.stock
+
+    def _scan_text(self, text):
+        if not text or not text.strip():
+            return
+        for match in PRICE_PATTERN.finditer(text):
+            if len(self.text_prices) < self.max_prices:
+                self.text_prices.append(_format_price(match))
+        if self.stock is None:
+            self.stock = _stock_marker(text)
+
+    def _scan_attributes(self, element):
+        itemprop = (element.get('itemprop') or '').lower()
+        value = (element.get('content') or element.get('href') or '').strip()
+        if itemprop == 'pricecurrency' and value:
+            self.currency = value
+        elif itemprop == 'price':
+            amount = value or (element.text or '').strip()
+            if amount and len(self.structured_prices) < self.max_prices:
+                self.structured_prices.append(amount)
+        elif itemprop == 'availability' and self.structured_stock is None:
+            value = (value or element.text or '').lower().replace(' ', '')
+            if 'outofstock' in value or 'discontinued' in value or 'soldout' in value:
+                self.structured_stock = 'out of stock'
+            elif 'instock' in value or 'limitedavailability' in value:
+                self.structured_stock = 'in stock'
+
+    def _scan(self):
+        for event, element in self.parser.read_events():
+            tag = element.tag if isinstance(element.tag, str) else ''
+            if event == 'start':
+                if tag in _SKIPPED_TAGS:
+                    self._skipping += 1
+                continue
+            if tag in _SKIPPED_TAGS:
+                self._skipping = max(self._skipping - 1, 0)
+            elif not self._skipping:
+                self._scan_attributes(element)
+                # An element's tail is parsed after its end event, so it is scanned with the parent's
+                self._scan_text(element.text)
+                for child in element:
+                    self._scan_text(child.tail)
+            element.clear(keep_tail=True)
+
+
+class PageFetcher:
+    """Fetches result pages concurrently over one pooled keep-alive HTTP client.
+
+    The client lives on a background event loop, so connections are reused across tool calls
+    made from any thread or loop. Requests are limited per host and in total, each page is
+    read up to ``max_bytes`` within ``timeout`` seconds and scanned while it streams in.
+    Results are cached by URL; after ``fresh_seconds`` the page is revalidated with its ETag or
+    Last-Modified and a 304 reuses the cached result.
+    """
+
+    def __init__(self, limits=None, transport=None):
+        self._lock = threading.Lock()
+        self._transport = transport
+        self._loop = None
+        self._client = None
+        self._host_slots = {}
+        self._cache = OrderedDict()  # url -> (fetched_at, etag, last_modified, PageInfo)
+        self.stats = {'requests': 0, 'cache_hits': 0, 'revalidated': 0, 'errors': 0, 'bytes': 0}
+        self.configure(limits)
+
+    def configure(self, limits=None):
+        """Apply DEFAULT_LIMITS overridden by ``limits``; the connection pool size is fixed once the client exists."""
+        limits = limits or {}
+        with self._lock:
+            new_limits = {key: limits.get(key, default) for key, default in DEFAULT_LIMITS.items()}
+            if new_limits['per_host'] != getattr(self, 'limits', {}).get('per_host'):
+                self._host_slots = {}
+            self.limits = new_limits
+
+    async def fetch_all(self, urls):
+        """PageInfo for each distinct URL of ``urls`` (at most ``max_pages``), fetched concurrently."""
+        urls = list(dict.fromkeys(url for url in urls if url and url.startswith(('http://', 'https://'))))
+        urls = urls[:self.limits['max_pages']]
+        if not urls:
+            return []
+        cassette = active_cassette()
+        if cassette is not None:
+            pages = await cassette.arecord('fetch', ' '.join(urls), {'urls': urls}, lambda: self._fetch_all_on_loop(urls))
+            return [PageInfo(url, status, tuple(prices), *rest) for url, status, prices, *rest in pages]
+        return await self._fetch_all_on_loop(urls)
+
+    async def _fetch_all_on_loop(self, urls):
+        future = asyncio.run_coroutine_threadsafe(self._fetch_all(urls), self._ensure_loop())
+        return await asyncio.wrap_future(future)
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='page-fetcher', daemon=True).start()
+            return self._loop
+
+    async def _fetch_all(self, urls):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=self._transport, follow_redirects=True, headers={'User-Agent': USER_AGENT},
+                limits=httpx.Limits(max_connections=self.limits['max_connections'], max_keepalive_connections=self.limits['max_connections']))
+        return await asyncio.gather(*(self._fetch(url) for url in urls))
+
+    async def _fetch(self, url):
+        cached = self._cache.get(url)
+        if cached and time.monotonic() - cached[0] < self.limits['fresh_seconds']:
+            self._cache.move_to_end(url)
+            self.stats['cache_hits'] += 1
+            return cached[3]._replace(cached=True)
+        host = urlsplit(url).netloc
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.limits['per_host'])
+        async with slot:
+            try:
+                return await asyncio.wait_for(self._download(url, cached), self.limits['timeout'])
+            except asyncio.TimeoutError:
+                self.stats['errors'] += 1
+                return PageInfo(url, None, error=f"no response within {self.limits['timeout']}s")
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.warning(f"Error fetching {url}: {str(e)}")
+                return PageInfo(url, None, error=str(e))
+
+    async def _download(self, url, cached):
+        headers = {}
+        if cached:
+            if cached[1]:
+                headers['If-None-Match'] = cached[1]
+            if cached[2]:
+                headers['If-Modified-Since'] = cached[2]
+        self.stats['requests'] += 1
+        async with self._client.stream('GET', url, headers=headers) as response:
+            if response.status_code == 304 and cached:
+                self.stats['revalidated'] += 1
+                self._store(url, cached[1], cached[2], cached[3])
+                return cached[3]._replace(cached=True)
+            if response.status_code != 200:
+                return PageInfo(url, response.status_code, error=f"HTTP {response.status_code}")
+            content_type = response.headers.get('content-type', 'text/html')
+            if 'html' not in content_type and 'text' not in content_type:
+                return PageInfo(url, response.status_code, error=f"not a page ({content_type})")
+            scanner = _MarkerScanner(response.charset_encoding)
+            received, truncated = 0, False
+            async for chunk in response.aiter_bytes():
+                received += len(chunk)
+                scanner.feed(chunk)
+                if scanner.done:
+                    break
+                if received >= self.limits['max_bytes']:
+                    truncated = True
+                    break
+            scanner.close()
+            self.stats['bytes'] += received
+            page = PageInfo(url, response.status_code, tuple(scanner.prices), scanner.stock, False, truncated)
+            self._store(url, response.headers.get('etag'), response.headers.get('last-modified'), page)
+            return page
+
+    def _store(self, url, etag, last_modified, page):
+        self._cache[url] = (time.monotonic(), etag, last_modified, page)
+        self._cache.move_to_end(url)
+        while len(self._cache) > self.limits['cache_size']:
+            self._cache.popitem(last=False)
+
+
+def page_fetching_enabled():
+    """Pages are fetched for live searches only, unless SUPPLIER_ANALYSIS_FETCH_PAGES=0 turns it off."""
+    return (os.environ.get('SUPPLIER_ANALYSIS_FETCH_PAGES', '1') != '0'
+            and not os.environ.get('SUPPLIER_ANALYSIS_SEARCH_FIXTURES'))
+
+
+# Shared by all runs and tools of this process
+page_fetcher = PageFetcher()
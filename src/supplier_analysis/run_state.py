@@ -0,0 +1,475 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+# A running run whose worker has not published for this long is treated as abandoned
+STALE_AFTER_SECONDS = 60
+
+IDLE_STATUS = {
+    'status': 'idle',
+    'run_id': None,
+    'resumed_from': None,
+    'logs': [],
+    'current_agent': None,
+    'agents': {},
+    'result': None,
+    'task_results': [],
+    'timeline': [],
+    'token_usage': None
+}
+
+_Snapshot = namedtuple('_Snapshot', 'version fields logs log_count')
+
+
+def _unchanged(old, new):
+    # Containers such as the live timeline list are compared by identity, scalars by value
+    return old is new or (isinstance(new, (str, int, float, bool)) and old == new)
+
+
+class RunStatus:
+    """Status of the current run, shared by the request threads, the analysis thread and the log capture hooks.
+
+    Writers serialize on a short lock and publish a new immutable snapshot; readers take the
+    current snapshot without locking, so polling never blocks the logging path. Logs are
+    append-only within a run: a snapshot records the log count and readers copy that prefix.
+    Every change bumps ``version``.
+    """
+
+    def __init__(self, **fields):
+        self._lock = threading.Lock()
+        initial = {key: value for key, value in IDLE_STATUS.items() if key != 'logs'}
+        self._snapshot = _Snapshot(0, MappingProxyType({**initial, **fields}), [], 0)
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def __getitem__(self, key):
+        snapshot = self._snapshot
+        if key == 'logs':
+            return snapshot.logs[:snapshot.log_count]
+        return snapshot.fields[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def update(self, fields=None, **changes):
+        """Set fields like dict.update; passing ``logs`` replaces the log list. No-op updates keep the version."""
+        changes = {**(fields or {}), **changes}
+        with self._lock:
+            snapshot = self._snapshot
+            logs, log_count = snapshot.logs, snapshot.log_count
+            if 'logs' in changes:
+                logs = list(changes.pop('logs'))
+                log_count = len(logs)
+            elif all(key in snapshot.fields and _unchanged(snapshot.fields[key], value) for key, value in changes.items()):
+                return
+            self._snapshot = _Snapshot(snapshot.version + 1, MappingProxyType({**snapshot.fields, **changes}),
+                                       logs, log_count)
+
+    def begin_run(self, fields):
+        """Atomically reset the status for a new run; returns False if a run is already running."""
+        with self._lock:
+            if self._snapshot.fields['status'] == 'running':
+                return False
+            self._snapshot = _Snapshot(self._snapshot.version + 1, MappingProxyType(
+                {**self._snapshot.fields, 'current_agent': None, 'agents': {}, 'result': None, 'task_results': [],
+                 'timeline': [], 'token_usage': None, **fields, 'status': 'running'}), [], 0)
+            return True
+
+    def set_agent_status(self, agent, status, tool=None):
+        """Record an agent transition in the ``agents`` map (status, started_at, ended_at, tool).
+
+        Repeated reports of the same state are ignored, so the version only moves on transitions.
+        ``current_agent`` mirrors the latest transition as "Agent: X, Status: Y".
+        """
+        now = time.time()
+        with self._lock:
+            snapshot = self._snapshot
+            agents = snapshot.fields.get('agents') or {}
+            previous = agents.get(agent) or {'status': None, 'started_at': None, 'ended_at': None, 'tool': None}
+            if previous['status'] == status and previous['tool'] == tool:
+                return
+            entry = {
+                'status': status,
+                'started_at': previous['started_at'] or now,
+                'ended_at': now if status in ('Completed', 'Failed', 'Cancelled') else None,
+                'tool': tool,
+            }
+            fields = {**snapshot.fields, 'agents': {**agents, agent: entry},
+                      'current_agent': f"Agent: {agent}, Status: {status}"}
+            self._snapshot = _Snapshot(snapshot.version + 1, MappingProxyType(fields), snapshot.logs, snapshot.log_count)
+
+    def add_task_result(self, task, agent, output):
+        """Keep the output of a finished task, so a cancelled run still reports its partial results."""
+        self.update(task_results=[*(self['task_results'] or []), {'task': task, 'agent': agent, 'output': output}])
+
+    def append_log(self, message):
+        with self._lock:
+            snapshot = self._snapshot
+            snapshot.logs.append(message)
+            self._snapshot = _Snapshot(snapshot.version + 1, snapshot.fields, snapshot.logs, snapshot.log_count + 1)
+
+    def snapshot(self):
+        """Plain dict copy of the current state that the caller owns."""
+        snapshot = self._snapshot
+        data = dict(snapshot.fields)
+        data['logs'] = snapshot.logs[:snapshot.log_count]
+        # The timeline is the live list filled by the instrumentation module
+        data['timeline'] = list(data.get('timeline') or [])
+        return data
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scenario TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    state TEXT,
+    resume_from INTEGER
+)
+"""
+
+# Cancellation requests for running runs, picked up by the worker's status publisher
+CANCEL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cancel_requests (
+    run_id INTEGER PRIMARY KEY,
+    requested_at REAL NOT NULL
+)
+"""
+
+
+class _SQLiteStore:
+    """SQLite database in WAL mode with one connection per thread and process."""
+
+    schema = ()
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        for statement in self.schema:
+            self._connection().execute(statement)
+
+    def _connection(self):
+        # sqlite3 connections must not be shared across threads or forked processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+class SQLiteRunStateStore(_SQLiteStore):
+    """Run state shared between processes through a SQLite database in WAL mode.
+
+    Web workers enqueue runs and read the latest run's status; dedicated analysis workers
+    claim queued runs and publish their status. WAL lets readers proceed while a worker writes.
+    """
+
+    schema = (SCHEMA, CANCEL_SCHEMA)
+
+    def __init__(self, path):
+        super().__init__(path)
+        try:
+            # Databases created before runs could be resumed lack the column
+            self._connection().execute('ALTER TABLE runs ADD COLUMN resume_from INTEGER')
+        except sqlite3.OperationalError:
+            pass
+
+    def enqueue_run(self, scenario, resume_from=None):
+        """Queue a run and return its id, or None when a run is already queued or running.
+
+        ``resume_from`` is the id of an earlier run whose task checkpoints the new run continues from.
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._expire_stale_runs(conn, now)
+            active = conn.execute("SELECT id FROM runs WHERE status IN ('queued', 'running') LIMIT 1").fetchone()
+            if active:
+                conn.execute('ROLLBACK')
+                return None
+            state = json.dumps({**IDLE_STATUS, 'status': 'running', 'scenario': scenario})
+            cursor = conn.execute(
+                "INSERT INTO runs (scenario, status, created_at, updated_at, state, resume_from) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (scenario, now, now, state, resume_from))
+            conn.execute('COMMIT')
+            return cursor.lastrowid
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def claim_next_run(self, worker=None):
+        """Mark the oldest queued run as running for this worker and return (run_id, scenario, resume_from)."""
+        worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                "SELECT id, scenario, resume_from FROM runs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row:
+                conn.execute("UPDATE runs SET status = 'running', worker = ?, updated_at = ? WHERE id = ?",
+                             (worker, time.time(), row[0]))
+            conn.execute('COMMIT')
+            return row
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def request_cancel(self, run_id):
+        """Cancel a queued run right away or ask the worker of a running run to stop.
+
+        Returns 'cancelled', 'cancelling', the status of an already finished run, or None for an unknown run.
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT status, state FROM runs WHERE id = ?', (run_id,)).fetchone()
+            if row is None:
+                result = None
+            elif row[0] == 'queued':
+                status = json.loads(row[1]) if row[1] else dict(IDLE_STATUS)
+                status.update({'status': 'cancelled', 'result': 'Run cancelled before it started'})
+                conn.execute("UPDATE runs SET status = 'cancelled', state = ?, updated_at = ?, version = version + 1 WHERE id = ?",
+                             (json.dumps(status), now, run_id))
+                result = 'cancelled'
+            elif row[0] == 'running':
+                conn.execute('INSERT OR IGNORE INTO cancel_requests (run_id, requested_at) VALUES (?, ?)', (run_id, now))
+                result = 'cancelling'
+            else:
+                result = row[0]
+            conn.execute('COMMIT')
+            return result
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def cancel_requested(self, run_id):
+        return self._connection().execute('SELECT 1 FROM cancel_requests WHERE run_id = ?', (run_id,)).fetchone() is not None
+
+    def publish(self, run_id, status, state_json=None):
+        """Store the status of a run; ``state_json`` is the serialized status dict (None only refreshes the heartbeat)."""
+        conn = self._connection()
+        if state_json is None:
+            conn.execute('UPDATE runs SET status = ?, updated_at = ? WHERE id = ?', (status, time.time(), run_id))
+        else:
+            conn.execute('UPDATE runs SET status = ?, state = ?, updated_at = ?, version = version + 1 WHERE id = ?',
+                         (status, state_json, time.time(), run_id))
+
+    def latest_version(self):
+        """(run_id, state version) of the most recent run without loading its state, or None."""
+        return self._connection().execute('SELECT id, version FROM runs ORDER BY id DESC LIMIT 1').fetchone()
+
+    def latest_status(self):
+        """Status dict of the most recent run, or the idle status when nothing has run yet."""
+        row = self._connection().execute('SELECT id, state FROM runs ORDER BY id DESC LIMIT 1').fetchone()
+        if row is None or not row[1]:
+            return dict(IDLE_STATUS)
+        status = json.loads(row[1])
+        status['run_id'] = row[0]
+        return status
+
+    def _expire_stale_runs(self, conn, now):
+        stale = conn.execute(
+            "SELECT id, state FROM runs WHERE status = 'running' AND updated_at < ?",
+            (now - STALE_AFTER_SECONDS,)).fetchall()
+        for run_id, state in stale:
+            logger.error(f"Run {run_id} stopped reporting, marking it as failed")
+            status = json.loads(state) if state else dict(IDLE_STATUS)
+            status.update({'status': 'error', 'result': 'Analysis worker stopped responding'})
+            conn.execute("UPDATE runs SET status = 'error', state = ?, updated_at = ?, version = version + 1 WHERE id = ?",
+                         (json.dumps(status), now, run_id))
+
+
+CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS task_checkpoints (
+    run_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    scenario TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    task TEXT NOT NULL,
+    agent TEXT,
+    output TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (run_id, position)
+)
+"""
+
+# Task outputs across runs, keyed by the content hash of the task's declared inputs
+MEMO_SCHEMA = """
+CREATE TABLE IF NOT EXISTS task_memo (
+    input_key TEXT PRIMARY KEY,
+    task TEXT NOT NULL,
+    agent TEXT,
+    output TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+class TaskCheckpointStore(_SQLiteStore):
+    """Outputs of completed crew tasks, saved as each task finishes.
+
+    Rows are keyed by run id and task position and carry the fingerprint of the run's task
+    inputs, so a failed or cancelled run can be resumed from its first incomplete task as
+    long as its inputs did not change. The memo table keeps task outputs across runs under the
+    hash of each task's declared inputs.
+    """
+
+    schema = (CHECKPOINT_SCHEMA, MEMO_SCHEMA)
+
+    def save(self, run_id, scenario, fingerprint, position, task, agent, output):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO task_checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (run_id, position, scenario, fingerprint, task, agent, output, time.time()))
+
+    def completed_tasks(self, run_id, fingerprint):
+        """Checkpoints of a run as [{'position', 'task', 'agent', 'output'}], up to its first incomplete task.
+
+        Rows saved under another fingerprint are ignored.
+        """
+        rows = self._connection().execute(
+            'SELECT position, task, agent, output FROM task_checkpoints WHERE run_id = ? AND fingerprint = ? ORDER BY position',
+            (run_id, fingerprint)).fetchall()
+        completed = []
+        for position, task, agent, output in rows:
+            if position != len(completed):
+                break
+            completed.append({'position': position, 'task': task, 'agent': agent, 'output': output})
+        return completed
+
+    def run_scenario(self, run_id):
+        """Scenario of a run with checkpoints, or None when nothing was saved for it."""
+        row = self._connection().execute(
+            'SELECT scenario FROM task_checkpoints WHERE run_id = ? LIMIT 1', (run_id,)).fetchone()
+        return row[0] if row else None
+
+    def last_run_id(self):
+        return self._connection().execute('SELECT MAX(run_id) FROM task_checkpoints').fetchone()[0] or 0
+
+    def memoized(self, input_key, max_age):
+        """(agent, output) stored under an input key within the last ``max_age`` seconds, or None."""
+        return self._connection().execute(
+            'SELECT agent, output FROM task_memo WHERE input_key = ? AND created_at >= ?',
+            (input_key, time.time() - max_age)).fetchone()
+
+    def memoize(self, input_key, task, agent, output):
+        self._connection().execute('INSERT OR REPLACE INTO task_memo VALUES (?, ?, ?, ?, ?)',
+                                   (input_key, task, agent, output, time.time()))
+
+
+# Per-part state of the monitoring scheduler, kept so a restart does not report the same conditions again
+MONITOR_SCHEMA = """
+CREATE TABLE IF NOT EXISTS monitor_state (
+    part TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class MonitorStateStore(_SQLiteStore):
+    """JSON state of each part the monitoring scheduler tracks."""
+
+    schema = (MONITOR_SCHEMA,)
+
+    def load(self, part):
+        row = self._connection().execute('SELECT state FROM monitor_state WHERE part = ?', (part,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, part, state):
+        self._connection().execute('INSERT OR REPLACE INTO monitor_state VALUES (?, ?, ?)',
+                                   (part, json.dumps(state), time.time()))
+
+
+class StatusPublisher:
+    """Background thread copying a worker's in-process RunStatus into the shared store.
+
+    The state is only rewritten when its serialization changed; otherwise just the heartbeat
+    is refreshed so the run is not considered abandoned. With a ``control`` (RunControl), cancellation
+    requests stored for the run are passed on to it.
+    """
+
+    def __init__(self, store, run_id, process_status, interval=0.5, extra=None, control=None):
+        self.store = store
+        self.run_id = run_id
+        self.process_status = process_status
+        self.interval = interval
+        # Optional callable returning extra fields, e.g. live token usage
+        self.extra = extra
+        self.control = control
+        self._last = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name=f'publish-run-{run_id}', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread and publish the final state."""
+        self._stop.set()
+        self._thread.join()
+        self.publish()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.publish()
+                if self.control is not None and not self.control.cancelled and self.store.cancel_requested(self.run_id):
+                    self.control.cancel()
+            except Exception as e:
+                logger.error(f"Error publishing run state: {str(e)}")
+
+    def publish(self):
+        snapshot = self.process_status.snapshot()
+        if self.extra and snapshot.get('status') == 'running':
+            snapshot.update(self.extra())
+        state_json = json.dumps(snapshot, default=str)
+        if state_json == self._last:
+            self.store.publish(self.run_id, snapshot['status'])
+        else:
+            self.store.publish(self.run_id, snapshot['status'], state_json)
+            self._last = state_json
+
+
+def create_run_state_store():
+    """Shared store configured via SUPPLIER_ANALYSIS_STATE_DB, or None for in-process state."""
+    path = os.environ.get('SUPPLIER_ANALYSIS_STATE_DB')
+    return SQLiteRunStateStore(path) if path else None
+
+
+def _checkpoint_db_path():
+    return (os.environ.get('SUPPLIER_ANALYSIS_CHECKPOINT_DB') or os.environ.get('SUPPLIER_ANALYSIS_STATE_DB')
+            or os.path.join(tempfile.gettempdir(), 'supplier_analysis_checkpoints.db'))
+
+
+def create_checkpoint_store():
+    """Task checkpoints in SUPPLIER_ANALYSIS_CHECKPOINT_DB, else the shared state database, else the temp directory."""
+    return TaskCheckpointStore(_checkpoint_db_path())
+
+
+def create_monitor_store():
+    """Monitoring scheduler state, in the same database as the task checkpoints."""
+    return MonitorStateStore(_checkpoint_db_path())
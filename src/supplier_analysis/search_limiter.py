@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Overridable in [tool.crewai.search]: token bucket rate (requests per second) and burst,
+# concurrent requests per backend, retries with jittered exponential backoff (seconds),
+# and consecutive rate-limit failures that open the circuit breaker for `cooldown` seconds
+DEFAULT_LIMITS = {'rate': 1.0, 'burst': 3, 'concurrency': 2, 'max_retries': 3,
+                  'backoff_base': 1.0, 'backoff_max': 8.0, 'failure_threshold': 5, 'cooldown': 60}
+
+# How often an async search polls for a free backend slot held by another thread or event loop
+ASYNC_SLOT_POLL_INTERVAL = 0.05
+
+
+class SearchUnavailable(Exception):
+    """Raised instead of searching while the circuit breaker is open or once all retries were rate limited."""
+
+
+class SearchLimiter:
+    """Process-wide token bucket, per-backend concurrency limit and circuit breaker for web searches.
+
+    Every search waits for a token and a backend slot. Rate-limited calls are retried with
+    jittered exponential backoff; after ``failure_threshold`` consecutive rate-limit failures
+    all searches fail fast with SearchUnavailable until ``cooldown`` seconds have passed.
+    """
+
+    def __init__(self, limits=None):
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._counters = {}  # (backend, event) -> count
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self.configure(limits)
+        self._tokens = float(self.limits['burst'])
+        self._refilled = time.monotonic()
+
+    def configure(self, limits=None):
+        """Apply DEFAULT_LIMITS overridden by ``limits``; calls in flight keep their backend slots."""
+        limits = limits or {}
+        with self._lock:
+            new_limits = {key: limits.get(key, default) for key, default in DEFAULT_LIMITS.items()}
+            if new_limits['concurrency'] != getattr(self, 'limits', {}).get('concurrency'):
+                self._semaphores = {}
+            self.limits = new_limits
+
+    @property
+    def circuit_open(self):
+        return time.monotonic() < self._open_until
+
+    async def acall(self, backend, coro_func, retry_on=()):
+        """Await ``coro_func()`` for ``backend`` under the limits, retrying on the ``retry_on`` exceptions.
+
+        Waits for tokens and backend slots without blocking the loop. The slots are shared with
+        the searches of other threads and event loops, and ``coro_func`` only runs once it holds one.
+        """
+        max_retries = self.limits['max_retries']
+        for attempt in range(max_retries + 1):
+            self._check_circuit(backend)
+            throttled = False
+            while (wait := self._reserve_token()) > 0:
+                throttled = True
+                await asyncio.sleep(wait)
+            self._start_request(backend, throttled)
+            semaphore = self._semaphore(backend)
+            while not semaphore.acquire(blocking=False):
+                await asyncio.sleep(ASYNC_SLOT_POLL_INTERVAL)
+            try:
+                result = await coro_func()
+            except retry_on as e:
+                semaphore.release()
+                await asyncio.sleep(self._record_failure(backend, attempt, e))
+                continue
+            except BaseException:
+                semaphore.release()
+                raise
+            semaphore.release()
+            self._record_success()
+            return result
+
+    def _check_circuit(self, backend):
+        remaining = self._open_until - time.monotonic()
+        if remaining > 0:
+            self._count(backend, 'rejected')
+            raise SearchUnavailable(f"searches paused for {remaining:.0f}s after repeated rate limiting")
+
+    def _reserve_token(self):
+        """Take a token and return 0, or return the seconds to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            rate, burst = self.limits['rate'], self.limits['burst']
+            self._tokens = min(burst, self._tokens + (now - self._refilled) * rate)
+            self._refilled = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / rate
+
+    def _start_request(self, backend, throttled):
+        if throttled:
+            self._count(backend, 'throttled')
+        self._count(backend, 'requests')
+
+    def _semaphore(self, backend):
+        with self._lock:
+            semaphore = self._semaphores.get(backend)
+            if semaphore is None:
+                semaphore = self._semaphores[backend] = threading.BoundedSemaphore(self.limits['concurrency'])
+            return semaphore
+
+    def _record_success(self):
+        with self._lock:
+            self._consecutive_failures = 0
+
+    def _record_failure(self, backend, attempt, error):
+        """Count a rate-limited attempt and return the backoff delay, or raise SearchUnavailable when giving up."""
+        self._count(backend, 'rate_limited')
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.limits['failure_threshold']:
+                self._open_until = time.monotonic() + self.limits['cooldown']
+                self._consecutive_failures = 0
+                logger.warning(f"Search circuit breaker open for {self.limits['cooldown']}s after repeated rate limiting")
+        if attempt == self.limits['max_retries'] or self.circuit_open:
+            raise SearchUnavailable(f"rate limited by the search backend ({str(error)})") from error
+        delay = random.uniform(0, min(self.limits['backoff_max'], self.limits['backoff_base'] * 2 ** attempt))
+        logger.warning(f"Search on {backend} backend rate limited, retrying in {delay:.1f}s")
+        self._count(backend, 'retried')
+        return delay
+
+    def _count(self, backend, event):
+        with self._lock:
+            self._counters[(backend, event)] = self._counters.get((backend, event), 0) + 1
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def render_prometheus(self):
+        """Render the search event counters and the circuit breaker state in Prometheus text format."""
+        lines = ["# HELP supplier_analysis_search_events_total Web search requests, local throttling waits, "
+                 "rate-limited responses, retries and fail-fast rejections per backend.",
+                 "# TYPE supplier_analysis_search_events_total counter"]
+        lines += [f'supplier_analysis_search_events_total{{backend="{backend}",event="{event}"}} {count}'
+                  for (backend, event), count in sorted(self.counters().items())]
+        lines += ["# HELP supplier_analysis_search_circuit_open Whether searches currently fail fast.",
+                  "# TYPE supplier_analysis_search_circuit_open gauge",
+                  f"supplier_analysis_search_circuit_open {int(self.circuit_open)}"]
+        return "\n".join(lines) + "\n"
+
+
+# Shared by all runs and tools of this process
+search_limiter = SearchLimiter()
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import logging
+import os
+
+from duckduckgo_search import DDGS
+from duckduckgo_search.exceptions import DuckDuckGoSearchException, RatelimitException, TimeoutException
+
+from .cassette import CassetteSearchClient, active_cassette
+from .search_limiter import search_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class FixtureSearchClient:
+    """Offline stand-in for DDGS that serves canned results from a JSON fixture file.
+
+    The fixture maps lowercase query fragments to result lists; the first fragment
+    contained in the query wins, otherwise the "default" results are returned.
+    """
+
+    def __init__(self, fixture_path):
+        with open(fixture_path, 'r', encoding='utf-8') as f:
+            fixtures = json.load(f)
+        self.queries = fixtures.get('queries', {})
+        self.default = fixtures.get('default', [])
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    async def atext(self, keywords, max_results=None, **kwargs):
+        query = keywords.lower()
+        results = next((hits for fragment, hits in self.queries.items() if fragment in query), self.default)
+        return [dict(r) for r in results[:max_results]]
+
+
+RETRYABLE_ERRORS = (RatelimitException, TimeoutException)
+
+
+class RateLimitedSearchClient:
+    """Routes DuckDuckGo text searches through the process-wide search_limiter.
+
+    DDGS is synchronous, so each search blocks a worker thread while the event loop waits for
+    it. The thread is only started once the search holds one of the limiter's backend slots,
+    so the threads in use stay within the configured concurrency, apart from cancelled
+    searches that are still finishing. Each search gets its own
+    client from ``client_factory``, since a DDGS instance is not safe to share between threads.
+    A cancelled search stops waiting and its result is discarded. Rate-limit and timeout
+    errors are retried with backoff; SearchUnavailable is raised once the retries are used up
+    or while the circuit breaker is open.
+    """
+
+    def __init__(self, client_factory=DDGS):
+        self.client_factory = client_factory
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    async def atext(self, keywords, backend='auto', **kwargs):
+        def search():
+            try:
+                with self.client_factory() as client:
+                    return client.text(keywords, backend=backend, **kwargs)
+            except DuckDuckGoSearchException as e:
+                # With backend='auto', DDGS wraps the last backend's rate-limit error in a plain exception
+                if isinstance(e, RETRYABLE_ERRORS) or not (e.args and isinstance(e.args[0], RETRYABLE_ERRORS)):
+                    raise
+                raise e.args[0] from e
+        return await search_limiter.acall(backend, lambda: asyncio.to_thread(search), retry_on=RETRYABLE_ERRORS)
+
+
+def open_search_client():
+    """Return the async search client used by the search tools' ``_arun``.
+
+    Setting SUPPLIER_ANALYSIS_SEARCH_FIXTURES to a fixture file replaces live DuckDuckGo
+    searches with FixtureSearchClient, e.g. for benchmarks and offline runs. Live searches
+    go through the shared rate limiter. With an active cassette, searches are recorded or replayed.
+    """
+    cassette = active_cassette()
+    if cassette is not None:
+        return CassetteSearchClient(cassette, _open_search_client)
+    return _open_search_client()
+
+
+def _open_search_client():
+    fixture_path = os.environ.get('SUPPLIER_ANALYSIS_SEARCH_FIXTURES')
+    if fixture_path:
+        return FixtureSearchClient(fixture_path)
+    return RateLimitedSearchClient()
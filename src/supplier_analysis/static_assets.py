@@ -0,0 +1,92 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ASSET_EXTENSIONS = ('.css', '.js')
+
+# Smaller files are sent as they are
+COMPRESS_MIN_BYTES = 512
+
+# Hashed URLs change with the content, so browsers may keep them for a year without revalidating
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class AssetManifest:
+    """Content-hashed, precompressed copies of the frontend's CSS and JS, kept in memory.
+
+    ``url('css/styles.css')`` returns e.g. ``/assets/css/styles.3f2a9c1b7d4e.css``. A file is
+    re-read and re-hashed when its modification time changes, so edits show up without a restart;
+    the copy under its previous hash is dropped, so only current versions are kept.
+    """
+
+    def __init__(self, root, url_prefix='/assets'):
+        self.root = root
+        self.url_prefix = url_prefix
+        self._lock = threading.Lock()
+        self._sources = {}  # name -> (mtime, hashed name)
+        self._assets = {}   # hashed name -> {'body', 'gzip', 'br', 'mimetype'}
+
+    def build(self):
+        """Hash and compress every CSS and JS file below the root."""
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in sorted(filenames):
+                if filename.endswith(ASSET_EXTENSIONS):
+                    name = os.path.relpath(os.path.join(dirpath, filename), self.root).replace(os.sep, '/')
+                    self._load(name)
+        return self
+
+    def _load(self, name):
+        path = os.path.join(self.root, name)
+        mtime = os.path.getmtime(path)
+        with open(path, 'rb') as f:
+            body = f.read()
+        base, ext = os.path.splitext(name)
+        hashed = f"{base}.{hashlib.sha256(body).hexdigest()[:12]}{ext}"
+        asset = {
+            'body': body,
+            'gzip': None,
+            'br': None,
+            'mimetype': mimetypes.guess_type(name)[0] or 'application/octet-stream',
+        }
+        if len(body) >= COMPRESS_MIN_BYTES:
+            # mtime=0 keeps the gzip bytes identical across processes and restarts
+            asset['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                asset['br'] = brotli.compress(body, quality=11)
+        with self._lock:
+            previous = self._sources.get(name)
+            if previous is not None and previous[1] != hashed:
+                self._assets.pop(previous[1], None)
+            self._sources[name] = (mtime, hashed)
+            self._assets[hashed] = asset
+        return hashed
+
+    def url(self, name):
+        """Fingerprinted URL of an asset, given its path relative to the root."""
+        source = self._sources.get(name)
+        if source is None or os.path.getmtime(os.path.join(self.root, name)) != source[0]:
+            hashed = self._load(name)
+        else:
+            hashed = source[1]
+        return f"{self.url_prefix}/{hashed}"
+
+    def encoded(self, hashed_name, accept_encodings):
+        """(body, content encoding, mimetype) for a fingerprinted name, preferring brotli over gzip.
+
+        Returns None when the name is unknown.
+        """
+        asset = self._assets.get(hashed_name)
+        if asset is None:
+            return None
+        if asset['br'] is not None and accept_encodings['br']:
+            return asset['br'], 'br', asset['mimetype']
+        if asset['gzip'] is not None and accept_encodings['gzip']:
+            return asset['gzip'], 'gzip', asset['mimetype']
+        return asset['body'], None, asset['mimetype']
@@ -0,0 +1,209 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Availability states under which an order can actually be placed
+ORDERABLE_STATES = ("Available", "Limited Stock")
+
+# Fractions of the expected cover demand that are evaluated as reorder quantities
+DEFAULT_QUANTITY_FACTORS = (0.5, 0.75, 1.0, 1.25, 1.5, 2.0)
+
+
+def parse_rate(value):
+    """Convert CSV rate values such as '98%' or 0.98 to a fraction between 0 and 1."""
+    if isinstance(value, str):
+        value = value.strip()
+        if value.endswith('%'):
+            return float(value[:-1]) / 100
+        value = float(value)
+    value = float(value)
+    return value / 100 if value > 1 else value
+
+
+def build_demand_profile(valve_history_df):
+    """Derive the empirical demand and lead time distributions from the valve history."""
+    dates = pd.to_datetime(valve_history_df['date'])
+    span_days = max((dates.max() - dates.min()).days + 1, 1)
+    event_sizes = valve_history_df['valves_used'].to_numpy(dtype=np.int64)
+    lead_times = valve_history_df.loc[valve_history_df['lead_time_days'] > 0, 'lead_time_days'].to_numpy(dtype=np.int64)
+
+    return {
+        'event_probability': min(len(event_sizes) / span_days, 1.0),
+        'event_sizes': event_sizes,
+        'lead_times': lead_times if len(lead_times) else np.array([30], dtype=np.int64),
+        'current_inventory': int(valve_history_df['inventory_level'].iloc[-1]),
+        'daily_demand': event_sizes.sum() / span_days,
+    }
+
+
+def default_candidate_quantities(profile, review_period_days=30):
+    """Candidate reorder quantities scaled to the expected demand over lead time plus review period."""
+    cover_demand = profile['daily_demand'] * (profile['lead_times'].mean() + review_period_days)
+    quantities = {max(int(round(cover_demand * factor)), 1) for factor in DEFAULT_QUANTITY_FACTORS}
+    return sorted(quantities)
+
+
+def simulate_reorder_risk(valve_history_df, suppliers_df, candidate_quantities=None,
+                          n_trajectories=20000, review_period_days=30, late_delay_fraction=0.5,
+                          limited_stock_min_fill=0.5, seed=42):
+    """Monte Carlo evaluation of stockout risk for each orderable supplier and reorder quantity.
+
+    Every trajectory draws a daily demand path (bootstrapped demand events at the empirical
+    event rate) and a lead time from the history. Supplier attributes then shift the outcome:
+    late deliveries (1 - on-time rate) add up to ``late_delay_fraction`` of the lead time,
+    "Limited Stock" suppliers ship only part of the order and defective units are lost.
+    All suppliers share the same demand paths, so their results are directly comparable.
+
+    Returns a DataFrame with one row per supplier and quantity containing the stockout
+    probability, expected shortfall, fill rate and expected ending inventory.
+    """
+    rng = np.random.default_rng(seed)
+    profile = build_demand_profile(valve_history_df)
+    if candidate_quantities is None:
+        candidate_quantities = default_candidate_quantities(profile, review_period_days)
+
+    orderable = suppliers_df[suppliers_df['availability'].isin(ORDERABLE_STATES)]
+    if orderable.empty:
+        logger.info("No orderable suppliers, simulating the no-reorder baseline only")
+
+    max_lead_time = int(profile['lead_times'].max() * (1 + late_delay_fraction)) + 1
+    horizon = max_lead_time + review_period_days
+
+    # Demand paths shared by all suppliers
+    cumulative_demand = _demand_paths(rng, profile, n_trajectories, horizon)
+    base_lead_times = rng.choice(profile['lead_times'], size=n_trajectories)
+    current_inventory = profile['current_inventory']
+
+    rows = []
+    if orderable.empty:
+        # Without a supplier the current inventory has to cover lead time plus review period
+        end_day = np.minimum(base_lead_times + review_period_days, horizon)
+        demand = np.take_along_axis(cumulative_demand, end_day[:, None], axis=1)[:, 0]
+        rows.append(_summarize('No orderable supplier', 'Not Available', 0,
+                               np.maximum(demand - current_inventory, 0), demand,
+                               np.maximum(current_inventory - demand, 0)))
+        return pd.DataFrame(rows)
+
+    quantities = np.asarray(candidate_quantities, dtype=np.int64)
+    for _, supplier in orderable.iterrows():
+        on_time_rate = parse_rate(supplier['on_time_delivery_rate'])
+        defect_rate = parse_rate(supplier['quality_defect_rate'])
+        minimum_order = int(supplier.get('minimum_order_quantity', 0) or 0)
+
+        late = rng.random(n_trajectories) > on_time_rate
+        delay = np.rint(rng.random(n_trajectories) * late_delay_fraction * base_lead_times).astype(np.int64)
+        lead_time = np.minimum(base_lead_times + np.where(late, delay, 0), max_lead_time)
+
+        # Vectorized over all candidate quantities at once (trajectories x quantities)
+        order_quantities = np.maximum(quantities, minimum_order)
+        shipped = np.broadcast_to(order_quantities, (n_trajectories, len(order_quantities)))
+        if supplier['availability'] == 'Limited Stock':
+            fill = rng.uniform(limited_stock_min_fill, 1.0, size=(n_trajectories, 1))
+            shipped = np.floor(shipped * fill).astype(np.int64)
+        usable = rng.binomial(shipped, 1 - defect_rate)
+        shortfall, demand_total, ending_inventory = _order_outcome(cumulative_demand, lead_time, review_period_days,
+                                                                   current_inventory, usable)
+
+        for column, quantity in enumerate(order_quantities):
+            rows.append(_summarize(supplier['supplier_name'], supplier['availability'], int(quantity),
+                                   shortfall[:, column], demand_total, ending_inventory[:, column]))
+
+    return pd.DataFrame(rows).drop_duplicates(subset=['supplier', 'reorder_quantity'], ignore_index=True)
+
+
+def simulate_demand_risk(valve_history_df, candidate_quantities=None, n_trajectories=20000,
+                         review_period_days=30, seed=42):
+    """Monte Carlo evaluation of stockout risk for each reorder quantity from the history alone.
+
+    Demand paths and lead times are drawn as in simulate_reorder_risk, but the order always
+    arrives complete after the drawn lead time and without defects. The result depends only on
+    the demand and lead time distributions of the history, not on any supplier.
+
+    Returns a DataFrame with one row per quantity, with the columns of simulate_reorder_risk
+    except supplier and availability.
+    """
+    rng = np.random.default_rng(seed)
+    profile = build_demand_profile(valve_history_df)
+    if candidate_quantities is None:
+        candidate_quantities = default_candidate_quantities(profile, review_period_days)
+
+    horizon = int(profile['lead_times'].max()) + review_period_days
+    cumulative_demand = _demand_paths(rng, profile, n_trajectories, horizon)
+    lead_time = rng.choice(profile['lead_times'], size=n_trajectories)
+    quantities = np.asarray(sorted(set(candidate_quantities)), dtype=np.int64)
+    usable = np.broadcast_to(quantities, (n_trajectories, len(quantities)))
+    shortfall, demand_total, ending_inventory = _order_outcome(cumulative_demand, lead_time, review_period_days,
+                                                               profile['current_inventory'], usable)
+
+    rows = [_summarize(None, None, int(quantity), shortfall[:, column], demand_total, ending_inventory[:, column])
+            for column, quantity in enumerate(quantities)]
+    return pd.DataFrame(rows).drop(columns=['supplier', 'availability'])
+
+
+def _demand_paths(rng, profile, n_trajectories, horizon):
+    """Cumulative demand at the end of each day (trajectories x horizon + 1), starting at 0 on day 0."""
+    events = rng.random((n_trajectories, horizon), dtype=np.float32) < profile['event_probability']
+    sizes = rng.choice(profile['event_sizes'], size=(n_trajectories, horizon))
+    cumulative_demand = np.zeros((n_trajectories, horizon + 1), dtype=np.int64)
+    np.cumsum(np.where(events, sizes, 0), axis=1, out=cumulative_demand[:, 1:])
+    return cumulative_demand
+
+
+def _order_outcome(cumulative_demand, lead_time, review_period_days, current_inventory, usable):
+    """(shortfall, total demand, ending inventory) when ``usable`` units (trajectories x quantities) arrive after ``lead_time``."""
+    end_day = lead_time + review_period_days
+    demand_lead = np.take_along_axis(cumulative_demand, lead_time[:, None], axis=1)[:, 0]
+    demand_total = np.take_along_axis(cumulative_demand, end_day[:, None], axis=1)[:, 0]
+    demand_review = demand_total - demand_lead
+
+    # Phase 1: only the current inventory covers demand until the order arrives
+    shortfall_lead = np.maximum(demand_lead - current_inventory, 0)
+    stock_at_arrival = np.maximum(current_inventory - demand_lead, 0)
+
+    # Phase 2: the order and the remaining stock cover the review period
+    on_hand = stock_at_arrival[:, None] + usable
+    shortfall = shortfall_lead[:, None] + np.maximum(demand_review[:, None] - on_hand, 0)
+    ending_inventory = np.maximum(on_hand - demand_review[:, None], 0)
+    return shortfall, demand_total, ending_inventory
+
+
+def _summarize(supplier, availability, quantity, shortfall, demand, ending_inventory):
+    total_demand = demand.sum()
+    return {
+        'supplier': supplier,
+        'availability': availability,
+        'reorder_quantity': quantity,
+        'stockout_probability': float((shortfall > 0).mean()),
+        'expected_shortfall': float(shortfall.mean()),
+        'fill_rate': float(1 - shortfall.sum() / total_demand) if total_demand else 1.0,
+        'expected_ending_inventory': float(ending_inventory.mean()),
+    }
+
+
+def format_risk_table(risk_df, max_rows_per_supplier=3):
+    """Render the simulation results compactly for agent prompts, keeping the best quantities per supplier."""
+    if risk_df.empty:
+        return "No simulation results available."
+    best = (risk_df.sort_values(['supplier', 'stockout_probability', 'reorder_quantity'])
+            .groupby('supplier', sort=False).head(max_rows_per_supplier))
+    return _format_figures(best)
+
+
+def format_demand_risk_table(risk_df):
+    """Render the results of simulate_demand_risk for agent prompts, one row per quantity in increasing order."""
+    if risk_df.empty:
+        return "No simulation results available."
+    return _format_figures(risk_df.sort_values('reorder_quantity'))
+
+
+def _format_figures(risk_df):
+    table = risk_df.assign(
+        stockout_probability=risk_df['stockout_probability'].map('{:.1%}'.format),
+        expected_shortfall=risk_df['expected_shortfall'].map('{:.1f}'.format),
+        fill_rate=risk_df['fill_rate'].map('{:.1%}'.format),
+        expected_ending_inventory=risk_df['expected_ending_inventory'].map('{:.1f}'.format),
+    )
+    return table.to_string(index=False)
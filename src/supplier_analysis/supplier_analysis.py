@@ -1,63 +1,203 @@
 from crewai import Agent, Task, Crew
+from crewai.tasks.task_output import TaskOutput
 from crewai.tools import BaseTool
-from duckduckgo_search import DDGS
+from crewai.utilities.events import (crewai_event_bus, TaskStartedEvent, TaskCompletedEvent, TaskFailedEvent,
+                                     ToolUsageStartedEvent, ToolUsageFinishedEvent, ToolUsageErrorEvent)
+import asyncio
 import os
 import logging
 import tomli
 import pandas as pd
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 import re
 import sys
 import io
+import json
+import time
+import threading
+from collections import namedtuple
+from typing import Optional, Union
+from .instrumentation import span, record_span, mean_duration, traced_tool
+from .order_allocation import allocate_order
+from .search_providers import open_search_client
+from .search_limiter import SearchUnavailable, search_limiter
+from .page_fetcher import page_fetcher, page_fetching_enabled
+from .tool_output import ResultEntry, output_budget
+from .cassette import cassette_from_env, open_smtp, record_llm_calls
+from .token_accounting import track_llm_usage, set_current_task, clear_current_task, current_usage, record_route
+from .model_routing import build_llm, choose_model
+from .availability_rules import (DEFAULT_FAST_PATH, IN_STOCK_STATUSES, assess_availability, templated_availability,
+                                 unavailable_summary)
+from .stockout_simulation import (parse_rate, simulate_demand_risk, simulate_reorder_risk, format_demand_risk_table,
+                                  format_risk_table)
+from .logging_setup import configure_logging
+from .task_inputs import MEMO_MAX_AGE_SECONDS, TaskInputs, task_input_key, tasks_fingerprint
+from .cancellation import (RunCancelled, RunControl, cancellable_tool, check_side_effect, current_control,
+                           make_cancellable, set_current_control)
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# Task spans are measured from CrewAI's task events, keyed by the task object
+_task_start_times = {}
+
+# Called with (agent, status, tool) on agent transitions during run_analysis
+_agent_status_callback = None
+
+def _report_agent_status(agent, status, tool=None):
+    # After a cancellation the caller finalizes the agent statuses itself
+    control = current_control()
+    if control is not None and control.cancelled:
+        return
+    if _agent_status_callback is not None and agent:
+        try:
+            _agent_status_callback(agent, status, tool)
+        except Exception as e:
+            logger.error(f"Error reporting agent status: {str(e)}")
+
+@crewai_event_bus.on(TaskStartedEvent)
+def _on_task_started(source, event):
+    _task_start_times[id(source)] = time.perf_counter()
+    agent = getattr(getattr(source, 'agent', None), 'role', None)
+    set_current_task(agent, getattr(source, 'name', None))
+    control = current_control()
+    if control is not None:
+        control.start_task(getattr(source, 'name', None))
+    _report_agent_status(agent, 'In Progress')
+
+@crewai_event_bus.on(TaskCompletedEvent)
+@crewai_event_bus.on(TaskFailedEvent)
+def _on_task_finished(source, event):
+    started = _task_start_times.pop(id(source), None)
+    if started is not None:
+        agent = getattr(getattr(source, 'agent', None), 'role', 'unknown')
+        status = 'failed' if isinstance(event, TaskFailedEvent) else 'completed'
+        record_span('task', started, agent=agent, status=status)
+    _report_agent_status(getattr(getattr(source, 'agent', None), 'role', None),
+                         'Failed' if isinstance(event, TaskFailedEvent) else 'Completed')
+    clear_current_task()
+    control = current_control()
+    if control is not None:
+        control.end_task()
+
+@crewai_event_bus.on(ToolUsageStartedEvent)
+def _on_tool_started(source, event):
+    _report_agent_status(event.agent_role, 'In Progress', event.tool_name)
+
+@crewai_event_bus.on(ToolUsageFinishedEvent)
+@crewai_event_bus.on(ToolUsageErrorEvent)
+def _on_tool_finished(source, event):
+    _report_agent_status(event.agent_role, 'In Progress')
+
+def get_config_path():
+    """Path of the TOML configuration; SUPPLIER_ANALYSIS_CONFIG overrides the project pyproject.toml."""
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.environ.get('SUPPLIER_ANALYSIS_CONFIG', os.path.join(project_root, "pyproject.toml"))
+
+_config_cache = {}  # path -> ((mtime_ns, size), config)
+
+def load_config():
+    """Parsed configuration, read again only when the file changes. Callers must not modify it."""
+    path = get_config_path()
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _config_cache.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    with open(path, "rb") as f:
+        config = tomli.load(f)
+    _config_cache[path] = (signature, config)
+    return config
+
+def get_crewai_section(name):
+    """Settings of the [tool.crewai.<name>] table, or {} when it is missing or the config cannot be read.
+
+    The sections and the defaults they override: timeouts (cancellation.DEFAULT_TIMEOUTS),
+    search (search_limiter.DEFAULT_LIMITS), fetch (page_fetcher.DEFAULT_LIMITS), tool_output
+    (tool_output.DEFAULT_BUDGET), fast_path (availability_rules.DEFAULT_FAST_PATH), monitor
+    (monitoring.DEFAULT_MONITOR), models (see model_routing) and pricing.
+    """
+    try:
+        return load_config().get("tool", {}).get("crewai", {}).get(name, {})
+    except Exception as e:
+        logger.warning(f"Error loading [tool.crewai.{name}] from config: {str(e)}")
+        return {}
+
+def get_model_pricing():
+    """Model prices from [tool.crewai.pricing] as {model: (prompt, completion)} USD per 1M tokens."""
+    try:
+        return {model: (float(p["prompt"]), float(p["completion"])) for model, p in get_crewai_section("pricing").items()}
+    except Exception as e:
+        logger.warning(f"Error loading model pricing from config: {str(e)}")
+        return {}
+
 def get_api_key():
     try:
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        config_path = os.path.join(project_root, "pyproject.toml")
-        
-        with open(config_path, "rb") as f:
-            config = tomli.load(f)
-            # TOML verwendet eine verschachtelte Struktur
-            if "tool" in config and "crewai" in config["tool"] and "llm" in config["tool"]["crewai"]:
-                return config["tool"]["crewai"]["llm"]["api_key"]
+        config = load_config()
+        # TOML verwendet eine verschachtelte Struktur
+        if "tool" in config and "crewai" in config["tool"] and "llm" in config["tool"]["crewai"]:
+            return config["tool"]["crewai"]["llm"]["api_key"]
     except Exception as e:
         logger.error(f"Error loading API key from config: {str(e)}")
         return None
 
+# Tells the agent to stop searching instead of retrying while the search backend throttles us
+SEARCH_UNAVAILABLE_MESSAGE = ("Web search is temporarily unavailable ({reason}). Do not search again; "
+                              "continue with the information you already have.")
+
+def run_coroutine(coro):
+    """Run a tool coroutine to completion from synchronous code, such as CrewAI's tool calls."""
+    return asyncio.run(coro)
+
 class SupplierSearchTool(BaseTool):
     name: str = "search_suppliers"
     description: str = "Search for alternative suppliers on the internet. Input should be a search query describing the type of supplier you're looking for."
 
+    @traced_tool
+    @cancellable_tool
     def _run(self, query: str) -> str:
+        return run_coroutine(self._search(query))
+
+    @traced_tool
+    @cancellable_tool
+    async def _arun(self, query: str) -> str:
+        return await self._search(query)
+
+    async def _search(self, query):
         try:
-            with DDGS() as ddgs:
+            async with open_search_client() as ddgs:
+                searches = [ddgs.atext(query, max_results=5)]
+                # If price information is needed, perform a more specific search
+                wants_price = "price" in query.lower() or "cost" in query.lower() or "pricing" in query.lower()
+                if wants_price:
+                    # Search specifically for pricing information
+                    price_query = query + " price cost buy purchase"
+                    searches.append(ddgs.atext(price_query, max_results=3))
+                found = await asyncio.gather(*searches)
+
                 results = []
-                for r in ddgs.text(query, max_results=5):
+                sections = [(None, results)]
+                for r in found[0]:
                     if isinstance(r, dict):
                         title = r.get('title', '')
                         href = r.get('href', '')
                         body = r.get('body', '')
                         if title and href and body:
-                            results.append(f"Company: {title}\nWebsite: {href}\nDescription: {body}\n")
+                            results.append(ResultEntry(href, title, body, f"Company: {title}\nWebsite: {href}\nDescription: {body}\n"))
                 
-                # If price information is needed, perform a more specific search
-                if "price" in query.lower() or "cost" in query.lower() or "pricing" in query.lower():
+                if wants_price:
+                    pages = await self._fetch_pages(found[1])
                     price_results = []
-                    # Search specifically for pricing information
-                    price_query = query + " price cost buy purchase"
-                    for r in ddgs.text(price_query, max_results=3):
+                    for r in found[1]:
                         if isinstance(r, dict):
                             title = r.get('title', '')
                             href = r.get('href', '')
                             body = r.get('body', '')
                             price_info = "Price information not explicitly found in search results."
+                            boost = 0.0
                             
                             # Try to extract price information from the body
                             price_patterns = [
@@ -71,43 +211,86 @@ class SupplierSearchTool(BaseTool):
                                 matches = re.findall(pattern, body, re.IGNORECASE)
                                 if matches:
                                     price_info = f"Possible price found: ${matches[0]}"
+                                    boost = 0.5
                                     break
                             
-                            price_results.append(f"Company: {title}\nWebsite: {href}\nPrice Info: {price_info}\nDescription: {body}\n")
+                            # The result page itself is more reliable than the snippet
+                            page = pages.get(href)
+                            if page and page.prices:
+                                price_info = f"Price on website: {', '.join(page.prices)}"
+                                boost = 1.0
+                            if page and page.stock:
+                                price_info += f"\nStock on website: {page.stock}"
+
+                            price_results.append(ResultEntry(href, title, body, f"Company: {title}\nWebsite: {href}\nPrice Info: {price_info}\nDescription: {body}\n", boost))
                     
-                    if price_results:
-                        results += ["\nPRICING INFORMATION:", *price_results]
+                    sections.append(("PRICING INFORMATION:", price_results))
                 
-                return "\n".join(results) if results else "No results found."
+                return output_budget.compact(query, sections, "No results found.")
+        except SearchUnavailable as e:
+            logger.warning(f"Supplier search unavailable: {str(e)}")
+            return SEARCH_UNAVAILABLE_MESSAGE.format(reason=str(e))
         except Exception as e:
             logger.error(f"Error searching for suppliers: {str(e)}")
             return "No results found due to an error."
 
+    async def _fetch_pages(self, results):
+        """Prices and stock read from the top result pages, by URL; empty when page fetching is off or fails."""
+        if not page_fetching_enabled():
+            return {}
+        try:
+            pages = await page_fetcher.fetch_all(r.get('href') for r in results if isinstance(r, dict))
+        except Exception as e:
+            logger.warning(f"Error fetching supplier pages: {str(e)}")
+            return {}
+        for page in pages:
+            if page.error:
+                logger.info(f"Could not read {page.url}: {page.error}")
+        return {page.url: page for page in pages if not page.error}
+
 class MarketTrendSearchTool(BaseTool):
     name: str = "search_market_trends"
     description: str = "Search for supply chain risks, market trends, and demand forecasting information. Input should be a search query describing the market information you're looking for."
 
+    @traced_tool
+    @cancellable_tool
     def _run(self, query: str) -> str:
+        return run_coroutine(self._search(query))
+
+    @traced_tool
+    @cancellable_tool
+    async def _arun(self, query: str) -> str:
+        return await self._search(query)
+
+    async def _search(self, query):
         try:
-            with DDGS() as ddgs:
-                results = []
+            async with open_search_client() as ddgs:
                 # Add supply chain and market trend context to the query
                 enhanced_query = f"{query} supply chain market trends forecast analysis industry report"
-                
-                for r in ddgs.text(enhanced_query, max_results=5):
+                # Also look for supply chain risk factors
+                risk_query = f"{query} supply chain risk shortage delay disruption"
+                searches = [ddgs.atext(enhanced_query, max_results=5), ddgs.atext(risk_query, max_results=3)]
+                # Look for specific market indicators and trends
+                wants_trends = "forecast" in query.lower() or "trend" in query.lower() or "demand" in query.lower()
+                if wants_trends:
+                    # Search specifically for forecasting and trend information
+                    trend_query = f"{query} market forecast trend analysis report data statistics"
+                    searches.append(ddgs.atext(trend_query, max_results=3))
+                found = await asyncio.gather(*searches)
+
+                results = []
+                sections = [(None, results)]
+                for r in found[0]:
                     if isinstance(r, dict):
                         title = r.get('title', '')
                         href = r.get('href', '')
                         body = r.get('body', '')
                         if title and href and body:
-                            results.append(f"Source: {title}\nURL: {href}\nSummary: {body}\n")
+                            results.append(ResultEntry(href, title, body, f"Source: {title}\nURL: {href}\nSummary: {body}\n"))
                 
-                # Look for specific market indicators and trends
-                if "forecast" in query.lower() or "trend" in query.lower() or "demand" in query.lower():
+                if wants_trends:
                     trend_results = []
-                    # Search specifically for forecasting and trend information
-                    trend_query = f"{query} market forecast trend analysis report data statistics"
-                    for r in ddgs.text(trend_query, max_results=3):
+                    for r in found[2]:
                         if isinstance(r, dict):
                             title = r.get('title', '')
                             href = r.get('href', '')
@@ -123,6 +306,7 @@ class MarketTrendSearchTool(BaseTool):
                             ]
                             
                             trend_info = "Specific trend metrics not found in search results."
+                            boost = 0.0
                             for pattern in growth_patterns:
                                 matches = re.findall(pattern, body, re.IGNORECASE)
                                 if matches:
@@ -132,29 +316,29 @@ class MarketTrendSearchTool(BaseTool):
                                         trend_info = f"Decline indicator found: {matches[0]}% decrease"
                                     elif "market size" in pattern:
                                         trend_info = f"Market size indicator: ${matches[0]} billion"
+                                    boost = 0.5
                                     break
                             
-                            trend_results.append(f"Source: {title}\nURL: {href}\nTrend Info: {trend_info}\nSummary: {body}\n")
+                            trend_results.append(ResultEntry(href, title, body, f"Source: {title}\nURL: {href}\nTrend Info: {trend_info}\nSummary: {body}\n", boost))
                     
-                    if trend_results:
-                        results += ["\nMARKET TREND INFORMATION:", *trend_results]
+                    sections.append(("MARKET TREND INFORMATION:", trend_results))
                 
-                # Also look for supply chain risk factors
                 risk_results = []
-                risk_query = f"{query} supply chain risk shortage delay disruption"
-                for r in ddgs.text(risk_query, max_results=3):
+                for r in found[1]:
                     if isinstance(r, dict):
                         title = r.get('title', '')
                         href = r.get('href', '')
                         body = r.get('body', '')
                         
                         if any(risk_term in body.lower() for risk_term in ['shortage', 'delay', 'disruption', 'risk', 'constraint']):
-                            risk_results.append(f"Source: {title}\nURL: {href}\nRisk Factor: Supply chain risk identified\nSummary: {body}\n")
+                            risk_results.append(ResultEntry(href, title, body, f"Source: {title}\nURL: {href}\nRisk Factor: Supply chain risk identified\nSummary: {body}\n", 0.5))
                 
-                if risk_results:
-                    results += ["\nSUPPLY CHAIN RISK INFORMATION:", *risk_results]
+                sections.append(("SUPPLY CHAIN RISK INFORMATION:", risk_results))
                 
-                return "\n".join(results) if results else "No market trend or risk information found."
+                return output_budget.compact(query, sections, "No market trend or risk information found.")
+        except SearchUnavailable as e:
+            logger.warning(f"Market trend search unavailable: {str(e)}")
+            return SEARCH_UNAVAILABLE_MESSAGE.format(reason=str(e))
         except Exception as e:
             logger.error(f"Error searching for market trends: {str(e)}")
             return "No results found due to an error."
@@ -163,7 +347,17 @@ class EmailTool(BaseTool):
     name: str = "send_email"
     description: str = "Send an email with the analysis results. Input should be a dict with 'recipient', 'subject', and 'body'."
 
+    @traced_tool
+    @cancellable_tool
     def _run(self, input_dict: dict) -> str:
+        return run_coroutine(self._send(input_dict))
+
+    @traced_tool
+    @cancellable_tool
+    async def _arun(self, input_dict: dict) -> str:
+        return await self._send(input_dict)
+
+    async def _send(self, input_dict):
         try:
             recipient = input_dict.get('recipient')
             subject = input_dict.get('subject', 'Urgent: Critical Supply Chain Risk - VQC4101-51 SMC 5/2-Wegeventil Valve')
@@ -199,18 +393,17 @@ Multi-Agent System
             if not recipient:
                 logger.error("Email missing recipient")
                 return "Error: Email must include recipient."
+            control = current_control()
+            if control is not None:
+                control.email_attempts += 1
             
             # Get SMTP settings from config
-            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            config_path = os.path.join(project_root, "pyproject.toml")
-            
-            with open(config_path, "rb") as f:
-                config = tomli.load(f)
-                smtp_settings = config.get("tool", {}).get("email", {})
-                smtp_server = smtp_settings.get("server", "")
-                smtp_port = smtp_settings.get("port", 587)
-                smtp_user = smtp_settings.get("user", "")
-                smtp_password = smtp_settings.get("password", "")
+            smtp_settings = load_config().get("tool", {}).get("email", {})
+            smtp_server = smtp_settings.get("server", "")
+            smtp_port = smtp_settings.get("port", 587)
+            smtp_user = smtp_settings.get("user", "")
+            smtp_password = smtp_settings.get("password", "")
+            smtp_starttls = smtp_settings.get("starttls", True)
             
             # Log SMTP server configuration (without password)
             logger.info(f"Email configuration: server={smtp_server}, port={smtp_port}, user={smtp_user}")
@@ -281,32 +474,64 @@ Multi-Agent System
                     logger.info(f"Attempt {attempt} of {max_retries} to send email to {recipient}")
                     
                     # Try to send email with explicit timeout
-                    with smtplib.SMTP(smtp_server, smtp_port, timeout=30) as server:
-                        server.set_debuglevel(1)  # Enable verbose debug output
-                        server.starttls()
-                        server.login(smtp_user, smtp_password)
-                        server.send_message(msg)
+                    with span('smtp_send', attempt=attempt):
+                        async with open_smtp(smtp_server, smtp_port, timeout=30) as server:
+                            if smtp_starttls:
+                                await server.starttls()
+                            await server.login(smtp_user, smtp_password)
+                            # A cancelled run, or a call abandoned after its deadline, must not send the email after all
+                            check_side_effect()
+                            await server.send_message(msg)
                     
                     logger.info(f"Email successfully sent to {recipient} on attempt {attempt}")
                     return f"Email successfully sent to {recipient} and saved to {output_path}"
                 
+                except RunCancelled:
+                    raise
                 except Exception as e:
                     logger.error(f"Attempt {attempt} failed: {str(e)}")
                     if attempt < max_retries:
                         logger.info(f"Retrying in {retry_delay} seconds...")
-                        import time
-                        time.sleep(retry_delay)
+                        await asyncio.sleep(retry_delay)
                         retry_delay *= 2  # Exponential backoff
                     else:
                         logger.error(f"All {max_retries} attempts to send email failed. Last error: {str(e)}")
                         return f"Failed to send email after {max_retries} attempts. Last error: {str(e)}. Email content saved to {output_path}"
             
+        except RunCancelled as e:
+            logger.warning(f"Email to {input_dict.get('recipient')} not sent: {e.reason}")
+            raise
         except Exception as e:
             logger.error(f"Error creating email: {str(e)}")
             return f"Failed to create email: {str(e)}"
 
+class OrderAllocationTool(BaseTool):
+    name: str = "allocate_order"
+    description: str = "Split an order quantity across the current database suppliers at minimum expected total cost, respecting minimum order quantities and stock limits. Input should be the total number of units to order, optionally with max_defect_rate (e.g. 0.005 or \"0.5%\") and min_on_time_rate (e.g. 0.9 or \"90%\") to exclude riskier suppliers. Returns the allocation as JSON."
+    supplier_records: list = []
+
+    @traced_tool
+    @cancellable_tool
+    def _run(self, quantity: int, max_defect_rate: Optional[Union[float, str]] = None,
+             min_on_time_rate: Optional[Union[float, str]] = None) -> str:
+        try:
+            allocation = allocate_order(
+                pd.DataFrame(self.supplier_records), int(quantity),
+                max_defect_rate=parse_rate(max_defect_rate) if max_defect_rate is not None else None,
+                min_on_time_rate=parse_rate(min_on_time_rate) if min_on_time_rate is not None else None)
+            return json.dumps(allocation, indent=2)
+        except Exception as e:
+            logger.error(f"Error allocating order: {str(e)}")
+            return f"Failed to allocate order: {str(e)}"
+
+_display_patched = False
+
 # Monkey-patch CrewAI's output to reduce indentation
 def patch_crewai_display():
+    """Install the reduced-indentation print once per process; later calls do nothing."""
+    global _display_patched
+    if _display_patched:
+        return
     try:
         import crewai.agents.cache
         import re
@@ -331,64 +556,153 @@ def patch_crewai_display():
             
         # Ersetze die print-Funktion in relevanten Modulen
         sys.modules['crewai.agents.cache'].print = custom_print
+        _display_patched = True
         
     except Exception as e:
         logger.warning(f"Konnte CrewAI-Anzeige nicht anpassen: {str(e)}")
 
-def run_analysis(scenario='standard'):
-    try:
-        # Patch CrewAI display to reduce indentation
-        patch_crewai_display()
-        
-        api_key = get_api_key()
-        if not api_key:
-            raise ValueError("Failed to load API key from config")
-        os.environ["OPENAI_API_KEY"] = api_key
-        logger.info("API key configured successfully")
-
-        # Determine which CSV file to load based on the scenario
-        if scenario == 'limited':
-            supplier_csv_file = 'suppliers_limited.csv'
-            logger.info("Running 'limited' scenario, loading suppliers_limited.csv")
-        else:
-            supplier_csv_file = 'suppliers.csv'
-            logger.info("Running 'standard' scenario, loading suppliers.csv")
-
-        # Load supplier data using the determined filename
+SCENARIO_FILES = {'standard': 'suppliers.csv', 'limited': 'suppliers_limited.csv'}
+
+ScenarioInputs = namedtuple('ScenarioInputs', 'supplier_csv_path suppliers_df supplier_data valve_demand_data demand_state risk_table')
+
+# Stands for the run date in the demand state. It is filled in right before a task runs, so the
+# scenario inputs, memo keys and checkpoint fingerprints stay the same from one day to the next
+AS_OF_DATE = '{as_of_date}'
+
+# The five agents of the crew, in task order; 'task' names the agent's task, 'tool' the tool from
+# PipelineFactory.tools() or the scenario's order allocation tool
+AGENT_SPECS = [
+    dict(role='Demand Forecasting Specialist',
+         goal='Forecast VQC4101-51 SMC valve demand and recommend optimal reorder quantities and timing',
+         backstory="""You are an expert in demand forecasting and inventory management for industrial components.
+            Your expertise includes analyzing usage patterns, seasonal trends, and supply chain dynamics to optimize inventory levels.
+            You ensure that critical components like pneumatic valves are available when needed while minimizing excess inventory costs.""",
+         task='demand_forecast', tool='market_trend', verbose=True),
+    dict(role='Availability Analyst',
+         goal='Analyze supplier database to identify available suppliers for the VQC4101-51 SMC 5/2-Wegeventil valve',
+         backstory='Expert in supply chain analysis with focus on supplier availability for pneumatic components',
+         task='availability_analysis', tool=None, allow_delegation=False, verbose=True),
+    dict(role='Alternative Supplier Researcher',
+         goal='Find alternative suppliers for the VQC4101-51 SMC 5/2-Wegeventil valve',
+         backstory='Experienced in finding and evaluating alternative suppliers for pneumatic components',
+         task='alternative_supplier_research', tool='supplier_search', allow_delegation=False, verbose=True),
+    dict(role='Supplier Performance Analyst',
+         goal='Rank suppliers based on lead time and price metrics for planned valve orders',
+         backstory='Expert in supplier performance evaluation and cost analysis for critical components',
+         task='supplier_ranking', tool='order_allocation', allow_delegation=False, verbose=True),
+    dict(role='Communication Specialist',
+         goal='Summarize analysis findings and communicate results to stakeholders',
+         backstory="""You are an expert in technical communication with a strong background in supply chain management.
+            Your expertise includes distilling complex technical information into clear, actionable reports for management.
+            You ensure that critical information about inventory needs and supplier availability reaches the right people.""",
+         task='executive_summary', tool='email'),
+]
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+class PipelineFactory:
+    """Builds the tools and the deterministic scenario inputs once and hands them to each run.
+
+    Scenario inputs are rebuilt when a data file changes; the run date is filled in per task
+    (AS_OF_DATE). Agents keep per-run state, so every run gets new ones from AGENT_SPECS.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools = None
+        self._scenarios = {}  # supplier CSV file -> (signature, ScenarioInputs, OrderAllocationTool)
+
+    def tools(self):
+        """The shared (supplier search, market trend search, email) tool instances."""
+        with self._lock:
+            if self._tools is None:
+                self._tools = (SupplierSearchTool(), MarketTrendSearchTool(), EmailTool())
+            return self._tools
+
+    def scenario(self, scenario):
+        """(ScenarioInputs, OrderAllocationTool) of a scenario; unknown scenarios use the standard one."""
+        supplier_csv_file = SCENARIO_FILES.get(scenario, SCENARIO_FILES['standard'])
         supplier_csv_path = os.path.join(os.path.dirname(__file__), supplier_csv_file)
         if not os.path.exists(supplier_csv_path):
-             raise FileNotFoundError(f"Supplier CSV file not found: {supplier_csv_path}")
-        suppliers_df = pd.read_csv(supplier_csv_path)
-        logger.info(f"Loaded {len(suppliers_df)} suppliers from {supplier_csv_file}")
-        
-        # Load valve demand data
+            raise FileNotFoundError(f"Supplier CSV file not found: {supplier_csv_path}")
+        history_path = os.path.join(os.path.dirname(__file__), 'valve_history.csv')
+        signature = (_file_signature(supplier_csv_path),
+                     _file_signature(history_path) if os.path.exists(history_path) else None)
+        with self._lock:
+            cached = self._scenarios.get(supplier_csv_file)
+            if cached and cached[0] == signature:
+                return cached[1], cached[2]
+            inputs = load_scenario_inputs(supplier_csv_path, history_path)
+            allocation_tool = OrderAllocationTool(supplier_records=inputs.suppliers_df.to_dict('records'))
+            self._scenarios[supplier_csv_file] = (signature, inputs, allocation_tool)
+            return inputs, allocation_tool
+
+    def agents(self, llm, order_allocation_tool, agent_llms=None):
+        """New agents for a run, in task order, using their LLM from ``agent_llms`` (by role) or else ``llm``.
+
+        None stands for CrewAI's default model.
+        """
+        agent_llms = agent_llms or {}
+        return [self.agent(spec['role'], agent_llms.get(spec['role']) or llm, order_allocation_tool)
+                for spec in AGENT_SPECS]
+
+    def agent(self, role, llm, order_allocation_tool):
+        """New agent of AGENT_SPECS with ``role``, using ``llm``."""
+        supplier_search_tool, market_trend_search_tool, email_tool = self.tools()
+        tools = {'supplier_search': supplier_search_tool, 'market_trend': market_trend_search_tool,
+                 'email': email_tool, 'order_allocation': order_allocation_tool}
+        spec = dict(next(spec for spec in AGENT_SPECS if spec['role'] == role))
+        spec.pop('task')
+        tool = spec.pop('tool')
+        if tool is not None:
+            spec['tools'] = [tools[tool]]
+        return Agent(llm=llm, **spec)
+
+    def warm_up(self, scenarios=tuple(SCENARIO_FILES)):
+        """Patch the display, read the configuration and precompute the inputs of ``scenarios``."""
+        started = time.perf_counter()
+        patch_crewai_display()
         try:
-            valve_history_df = pd.read_csv(os.path.join(os.path.dirname(__file__), 'valve_history.csv'))
-            logger.info(f"Loaded valve demand history with {len(valve_history_df)} records")
-            
-            # Process demand data
-            valve_history_df['date'] = pd.to_datetime(valve_history_df['date'])
-            
-            # Basic demand forecasting
-            total_usage = valve_history_df['valves_used'].sum()
-            avg_monthly_usage = total_usage / (len(valve_history_df) / 12)
-            current_inventory = valve_history_df['inventory_level'].iloc[-1]
-            avg_lead_time = valve_history_df[valve_history_df['lead_time_days'] > 0]['lead_time_days'].mean()
-            
-            # Calculate key metrics
-            monthly_demand_trend = calculate_monthly_demand_trend(valve_history_df)
-            seasonal_factors = calculate_seasonal_factors(valve_history_df)
-            safety_stock_level = int(avg_monthly_usage * 0.15)  # 15% safety stock
-            
-            # Format data for agent consumption
-            valve_demand_data = valve_history_df.to_string(index=False)
-            
-            # Current demand state
-            current_date = datetime.now().strftime('%Y-%m-%d')
-            
-            # State information for the agent
-            demand_state = f"""
-Current Inventory State (as of {current_date}):
+            load_config()
+        except Exception as e:
+            logger.warning(f"Error loading config during warm-up: {str(e)}")
+        self.tools()
+        for scenario in scenarios:
+            self.scenario(scenario)
+        logger.info(f"Pipeline warmed up for {', '.join(scenarios)} in {time.perf_counter() - started:.2f}s")
+
+def load_scenario_inputs(supplier_csv_path, history_path):
+    """Load the supplier and demand data of a scenario and format them for the task descriptions."""
+    suppliers_df = pd.read_csv(supplier_csv_path)
+    logger.info(f"Loaded {len(suppliers_df)} suppliers from {os.path.basename(supplier_csv_path)}")
+
+    # Load valve demand data
+    try:
+        valve_history_df = pd.read_csv(history_path)
+        logger.info(f"Loaded valve demand history with {len(valve_history_df)} records")
+        
+        # Process demand data
+        valve_history_df['date'] = pd.to_datetime(valve_history_df['date'])
+        
+        # Basic demand forecasting
+        signals = compute_demand_signals(valve_history_df)
+        avg_monthly_usage = signals.avg_monthly_usage
+        current_inventory = signals.current_inventory
+        avg_lead_time = signals.avg_lead_time
+        
+        # Calculate key metrics
+        monthly_demand_trend = calculate_monthly_demand_trend(valve_history_df)
+        seasonal_factors = calculate_seasonal_factors(valve_history_df)
+        safety_stock_level = signals.safety_stock_level
+        
+        # Format data for agent consumption
+        valve_demand_data = valve_history_df.to_string(index=False)
+        
+        # State information for the agent
+        demand_state = f"""
+Current Inventory State (as of {AS_OF_DATE}):
 - Current inventory level: {current_inventory} units
 - Average monthly usage: {avg_monthly_usage:.2f} units
 - Average lead time: {avg_lead_time:.2f} days
@@ -397,68 +711,152 @@ Current Inventory State (as of {current_date}):
 - Typical seasonal factors: {seasonal_factors}
 - Current unit price: ${valve_history_df['unit_price'].iloc[-1]:.2f}
 """
-            
-        except Exception as e:
-            logger.warning(f"Failed to load valve demand history: {str(e)}. Using default demand state.")
-            valve_demand_data = "No historical data available."
-            demand_state = "No current demand data available."
         
-        # Convert supplier DataFrame to a formatted string for the agents
-        supplier_data = suppliers_df.to_string(index=False)
+        # Quantify stockout vs. excess inventory risk for the candidate reorder quantities. The forecast
+        # gets a simulation from the history alone, so it does not depend on the supplier file; the
+        # per-supplier table goes to the ranking
+        # A step within the load_inputs (or warm_up) phase, so it is not a phase of its own
+        with span('risk_simulation'):
+            try:
+                demand_risk_df = simulate_demand_risk(valve_history_df)
+                demand_state += f"""
+Stockout risk simulation (Monte Carlo, complete delivery after a lead time from the history plus 30-day review period):
+{format_demand_risk_table(demand_risk_df)}
+"""
+            except Exception as e:
+                logger.warning(f"Demand stockout risk simulation failed: {str(e)}")
+            try:
+                risk_df = simulate_reorder_risk(valve_history_df, suppliers_df)
+                logger.info(f"Simulated stockout risk for {len(risk_df)} supplier/quantity combinations")
+                risk_table = format_risk_table(risk_df)
+            except Exception as e:
+                logger.warning(f"Stockout risk simulation failed: {str(e)}")
+                risk_table = "No stockout risk simulation available."
         
-        # Create specialized search tools for different agents
-        supplier_search_tool = SupplierSearchTool()
-        market_trend_search_tool = MarketTrendSearchTool()
-        email_tool = EmailTool()
-
-        # Agent 1: Demand Forecasting Specialist
-        demand_forecasting_agent = Agent(
-            role='Demand Forecasting Specialist',
-            goal='Forecast VQC4101-51 SMC valve demand and recommend optimal reorder quantities and timing',
-            backstory="""You are an expert in demand forecasting and inventory management for industrial components.
-            Your expertise includes analyzing usage patterns, seasonal trends, and supply chain dynamics to optimize inventory levels.
-            You ensure that critical components like pneumatic valves are available when needed while minimizing excess inventory costs.""",
-            tools=[market_trend_search_tool],
-            verbose=True
-        )
-
-        # Agent 2: Availability Analyst
-        availability_analyst = Agent(
-            role='Availability Analyst',
-            goal='Analyze supplier database to identify available suppliers for the VQC4101-51 SMC 5/2-Wegeventil valve',
-            backstory='Expert in supply chain analysis with focus on supplier availability for pneumatic components',
-            allow_delegation=False,
-            verbose=True
-        )
-
-        # Agent 3: Alternative Supplier Researcher
-        researcher = Agent(
-            role='Alternative Supplier Researcher',
-            goal='Find alternative suppliers for the VQC4101-51 SMC 5/2-Wegeventil valve',
-            backstory='Experienced in finding and evaluating alternative suppliers for pneumatic components',
-            allow_delegation=False,
-            tools=[supplier_search_tool],
-            verbose=True
-        )
-
-        # Agent 4: Supplier Performance Analyst
-        performance_analyst = Agent(
-            role='Supplier Performance Analyst',
-            goal='Rank suppliers based on lead time and price metrics for planned valve orders',
-            backstory='Expert in supplier performance evaluation and cost analysis for critical components',
-            allow_delegation=False,
-            verbose=True
-        )
-
-        # Agent 5: Communication Specialist
-        communication_agent = Agent(
-            role='Communication Specialist',
-            goal='Summarize analysis findings and communicate results to stakeholders',
-            backstory="""You are an expert in technical communication with a strong background in supply chain management.
-            Your expertise includes distilling complex technical information into clear, actionable reports for management.
-            You ensure that critical information about inventory needs and supplier availability reaches the right people.""",
-            tools=[email_tool],
-        )
+    except Exception as e:
+        logger.warning(f"Failed to load valve demand history: {str(e)}. Using default demand state.")
+        valve_demand_data = "No historical data available."
+        demand_state = "No current demand data available."
+        risk_table = "No stockout risk simulation available."
+    
+    # Convert supplier DataFrame to a formatted string for the agents
+    supplier_data = suppliers_df.to_string(index=False)
+    return ScenarioInputs(supplier_csv_path, suppliers_df, supplier_data, valve_demand_data, demand_state, risk_table)
+
+# Shared by all runs of this process; app.py warms it up at startup
+pipeline = PipelineFactory()
+
+# A statement that no supplier has stock, e.g. "no supplier in the database has stock" or
+# "none of the current suppliers have available stock"
+NO_STOCK_STATEMENT = re.compile(r"\b(?:no|none of the)\s+(?:current\s+)?suppliers?\b[^.\n]{0,60}?\b(?:stock|available)\b")
+
+def check_availability_output(raw, suppliers_df):
+    """Why an availability analysis is unusable, or None: it must name every supplier with stock, or report that none has any."""
+    text = (raw or '').lower()
+    in_stock = suppliers_df[suppliers_df['availability'].isin(IN_STOCK_STATUSES)]['supplier_name']
+    if in_stock.empty:
+        return None if NO_STOCK_STATEMENT.search(text) else "it does not report that no supplier has stock"
+    missing = [name for name in in_stock if name.lower() not in text]
+    return f"it does not name {', '.join(missing)}" if missing else None
+
+def check_summary_sent(control, emails_before):
+    """Why an executive summary task failed, or None when its run (``control``) called send_email since ``emails_before``."""
+    return None if control.email_attempts > emails_before else "it did not pass the summary to the send_email tool"
+
+def run_analysis(scenario='standard', llm=None, task_callback=None, agent_status_callback=None, control=None,
+                 run_id=None, checkpoints=None, resume_from=None, memoize=True, cassette=None):
+    """Run the five-agent analysis crew for a scenario.
+
+    ``llm`` overrides the models of all agents (e.g. a fake LLM for benchmarks); otherwise each
+    agent uses its model from [tool.crewai.models], and with the auto policy enabled lightweight
+    tasks run on a fast model and run again on the agent's model if their output fails a check.
+    ``task_callback`` is passed to the crew and called with each completed task output.
+    ``agent_status_callback(agent, status, tool)`` is called when an agent starts, finishes
+    or fails its task and when it starts or finishes a tool call. ``control`` is the run's
+    RunControl; cancelling it or passing a deadline raises RunCancelled out of this call.
+
+    With a TaskCheckpointStore in ``checkpoints``, every finished task is saved under ``run_id``.
+    ``resume_from`` is the id of an earlier run: its saved tasks are not executed again, their
+    outputs are reported through ``task_callback`` and passed on as context to the remaining tasks.
+    With ``memoize``, tasks whose declared inputs are unchanged since an earlier run reuse that
+    run's output from the store.
+
+    ``cassette`` (default: configured by SUPPLIER_ANALYSIS_CASSETTE) records the run's LLM calls,
+    searches and SMTP sessions, or replays them from an earlier recording.
+    """
+    global _agent_status_callback
+    _agent_status_callback = agent_status_callback
+    control = control or RunControl()
+    control.set_timeouts(get_crewai_section('timeouts'))
+    search_limiter.configure(get_crewai_section('search'))
+    page_fetcher.configure(get_crewai_section('fetch'))
+    output_budget.configure(get_crewai_section('tool_output'))
+    cassette = cassette or cassette_from_env(scenario)
+    control.cassette = cassette
+    set_current_control(control)
+    try:
+        phase_started = time.perf_counter()
+
+        # Patch CrewAI display to reduce indentation
+        patch_crewai_display()
+        
+        api_key = get_api_key()
+        if api_key:
+            os.environ["OPENAI_API_KEY"] = api_key
+            logger.info("API key configured successfully")
+        elif cassette is None or cassette.recording:
+            # A replayed run never reaches the model provider
+            raise ValueError("Failed to load API key from config")
+        phase_started = record_span('phase', phase_started, phase='configure')
+
+        logger.info(f"Running '{scenario}' scenario with {SCENARIO_FILES.get(scenario, SCENARIO_FILES['standard'])}")
+        inputs, order_allocation_tool = pipeline.scenario(scenario)
+        supplier_csv_path = inputs.supplier_csv_path
+        suppliers_df = inputs.suppliers_df
+        supplier_data = inputs.supplier_data
+        valve_demand_data = inputs.valve_demand_data
+        demand_state = inputs.demand_state
+        risk_table = inputs.risk_table
+        phase_started = record_span('phase', phase_started, phase='load_inputs')
+
+        # Clear-cut availability (no supplier, or only a few, with stock) is written from rules instead of
+        # by the Availability Analyst, and with no stock at all the ranking prompt gets a summary instead of the table
+        fast_path = {**DEFAULT_FAST_PATH, **get_crewai_section('fast_path')}
+        availability = assess_availability(suppliers_df)
+        availability_result = None
+        ranking_supplier_data = supplier_data
+        if fast_path['enabled']:
+            availability_result = templated_availability(availability, suppliers_df, fast_path['max_in_stock'])
+            if availability_result is not None and not availability.in_stock:
+                ranking_supplier_data = unavailable_summary(availability)
+        phase_started = record_span('phase', phase_started, phase='availability_rules')
+
+        # New agents per run, since they keep per-run state; tools and inputs are shared
+        supplier_search_tool, market_trend_search_tool, email_tool = pipeline.tools()
+        model_choices = {}
+        if llm is None:
+            model_config = get_crewai_section('models')
+            model_choices = {spec['task']: choose_model(model_config, spec['role'], spec['task']) for spec in AGENT_SPECS}
+        agent_llms = {spec['role']: build_llm(model_choices[spec['task']]) for spec in AGENT_SPECS if model_choices}
+        (demand_forecasting_agent, availability_analyst, researcher, performance_analyst,
+         communication_agent) = pipeline.agents(llm, order_allocation_tool, agent_llms)
+
+        # Account tokens, latency and cost of every LLM call per agent and task
+        model_pricing = get_model_pricing()
+
+        def instrument(agent):
+            # The cancellation check wraps the accounting, so calls refused after a cancel are not counted,
+            # and the accounting wraps the cassette, so replayed calls are counted like recorded ones
+            make_cancellable(track_llm_usage(record_llm_calls(agent.llm), model_pricing))
+
+        agent_tasks = {spec['role']: spec['task'] for spec in AGENT_SPECS}
+        for agent in [demand_forecasting_agent, availability_analyst, researcher, performance_analyst, communication_agent]:
+            instrument(agent)
+            choice = model_choices.get(agent_tasks[agent.role])
+            templated = agent_tasks[agent.role] == 'availability_analysis' and availability_result is not None
+            if choice and agent.llm.model != choice.baseline_model and not templated:
+                # Report what running on another model than the agent's own saved or cost
+                record_route(agent_tasks[agent.role], agent.llm.model, choice.baseline_model, pricing=model_pricing)
 
         tasks = [
             Task(
@@ -491,7 +889,7 @@ Current Inventory State (as of {current_date}):
                    - Exact reorder quantity recommendation
                    - When to place the next order (date)
                    - Expected inventory costs
-                   - Risk assessment of stockout vs. excess inventory
+                   - Risk assessment of stockout vs. excess inventory, based on the stockout risk simulation above
                 
                 Search for additional information on SMC valve market trends if needed.""",
                 expected_output="""A comprehensive demand forecast and inventory recommendation including:
@@ -500,7 +898,8 @@ Current Inventory State (as of {current_date}):
                 - Reorder timing recommendation
                 - Safety stock calculations (minimum 15%)
                 - Inventory cost projections""",
-                agent=demand_forecasting_agent
+                agent=demand_forecasting_agent,
+                name='demand_forecast'
             ),
             Task(
                 description=f"""Based on the demand forecast and inventory recommendations, analyze the supplier database for the VQC4101-51 SMC 5/2-Wegeventil valve:
@@ -517,10 +916,11 @@ Current Inventory State (as of {current_date}):
                 
                 If no suppliers have available stock, clearly indicate this as a critical supply chain risk.""",
                 expected_output="A detailed analysis of current valve suppliers and their status, only including those with available stock",
-                agent=availability_analyst
+                agent=availability_analyst,
+                name='availability_analysis'
             ),
             Task(
-                description="""Using the availability analysis and demand forecast, search for alternative suppliers of the VQC4101-51 SMC 5/2-Wegeventil valve.
+                description="""Search for alternative suppliers of the VQC4101-51 SMC 5/2-Wegeventil valve.
                 
                 Focus on suppliers that can:
                 1. Provide genuine SMC parts or authorized equivalents
@@ -539,13 +939,17 @@ Current Inventory State (as of {current_date}):
                 
                 Do not use hardcoded or estimated price values. Always search for and report the most current pricing information available.""",
                 expected_output="A list of alternative suppliers with their contact information, current dynamically-fetched pricing, and delivery capabilities",
-                agent=researcher
+                agent=researcher,
+                name='alternative_supplier_research'
             ),
             Task(
                 description=f"""Analyze and rank ALL potential suppliers, including both current suppliers from the database AND alternative suppliers found by the researcher:
                 
                 Current supplier data:
-                {supplier_data}
+                {ranking_supplier_data}
+                
+                Stockout risk simulation (Monte Carlo, lead time plus 30-day review period, best quantities per supplier):
+                {risk_table}
                 
                 CRITICAL REQUIREMENTS:
                 1. Consider TWO sources of suppliers:
@@ -554,6 +958,7 @@ Current Inventory State (as of {current_date}):
                 
                 2. Rank ALL suppliers based on:
                    - Ability to deliver within the required lead time based on the demand forecast
+                   - Stockout risk of current suppliers at the forecast reorder quantity, from the simulation above
                    - Price competitiveness using dynamically fetched current prices 
                    - Part authenticity and quality assurance
                    - Geographic location and shipping capabilities
@@ -571,6 +976,10 @@ Current Inventory State (as of {current_date}):
                    - Clearly indicates whether each supplier is from current database or newly identified
                    - Provides shipping options and cost implications for each
                    - Lists the dynamically fetched, current pricing for each supplier
+                
+                5. If the best current supplier has "Limited Stock" or cannot cover the forecast quantity alone,
+                   use the allocate_order tool with the forecast reorder quantity and report the resulting split
+                   across current suppliers, including quantities and expected total cost.
                    
                 If no suppliers (either current or alternative) have stock available, report this as a critical issue requiring immediate attention.""",
                 expected_output="""A comprehensive ranked list including:
@@ -578,8 +987,10 @@ Current Inventory State (as of {current_date}):
                 - Clear indication of supplier source (current vs. newly identified)
                 - Comparative analysis of capabilities and costs
                 - Shipping options and lead times
+                - Order allocation across current suppliers where a single supplier is not sufficient
                 - Critical supply issue alert if no viable suppliers found""",
-                agent=performance_analyst
+                agent=performance_analyst,
+                name='supplier_ranking'
             ),
             Task(
                 description="""Compile a professional executive summary of the supply chain analysis findings.
@@ -651,29 +1062,165 @@ Current Inventory State (as of {current_date}):
                 - Clear recommendations
                 - Actionable next steps
                 - Financial implications""",
-                agent=communication_agent
+                agent=communication_agent,
+                name='executive_summary'
             )
         ]
 
-        crew = Crew(
-            agents=[
-                demand_forecasting_agent,
-                availability_analyst,
-                researcher,
-                performance_analyst,
-                communication_agent
-            ],
-            tasks=tasks,
-            verbose=True
-        )
-
-        result = crew.kickoff()
+        # Declared inputs per task. A task's context is exactly its upstream tasks, and its output is
+        # memoized under a hash of these inputs. The demand forecast only reads the demand history, so
+        # it is shared by all scenarios; the ranking depends on both files through the stockout simulation.
+        # The researcher needs the forecast for the required lead time and quantity, but not the current
+        # suppliers' availability: it looks for suppliers outside the database, so it is shared as well.
+        history_path = os.path.join(os.path.dirname(__file__), 'valve_history.csv')
+        upstream_of_summary = ('demand_forecast', 'availability_analysis', 'alternative_supplier_research', 'supplier_ranking')
+        task_inputs = {
+            'demand_forecast': TaskInputs(files=(history_path,), tools=(market_trend_search_tool,)),
+            'availability_analysis': TaskInputs(files=(supplier_csv_path,), tasks=('demand_forecast',)),
+            'alternative_supplier_research': TaskInputs(tasks=('demand_forecast',), tools=(supplier_search_tool,)),
+            'supplier_ranking': TaskInputs(files=(supplier_csv_path, history_path), tasks=upstream_of_summary[:3],
+                                           tools=(order_allocation_tool,)),
+            # Sends the email, so it always runs
+            'executive_summary': TaskInputs(tasks=upstream_of_summary, tools=(email_tool,), memoize=False),
+        }
+        tasks_by_name = {task.name: task for task in tasks}
+        for task in tasks:
+            task.context = [tasks_by_name[name] for name in task_inputs[task.name].tasks] or None
+
+        # Checkpoints are only reused while the inputs of all tasks are unchanged
+        fingerprint = tasks_fingerprint(tasks, task_inputs)
+        positions = {task.name: position for position, task in enumerate(tasks)}
+        input_keys = {}
+
+        # Outputs the fast model produced in this run are checked before they count; restored, memoized
+        # and templated outputs are not. A rejected output is neither saved nor reported, and the task
+        # runs again on the agent's model
+        emails_before = {}
+        output_checks = {'availability_analysis': lambda raw: check_availability_output(raw, suppliers_df),
+                         'executive_summary': lambda raw: check_summary_sent(control, emails_before['executive_summary'])}
+        checked = {name for name, choice in model_choices.items() if choice.auto and name in output_checks}
+        rejected = {}
+
+        def on_task_completed(output):
+            if output.name in checked:
+                problem = output_checks[output.name](output.raw)
+                if problem:
+                    rejected[output.name] = problem
+                    return
+            accept(output)
+
+        def accept(output):
+            if checkpoints is not None and run_id is not None:
+                checkpoints.save(run_id, scenario, fingerprint, positions[output.name], output.name, output.agent, output.raw)
+            if checkpoints is not None and output.name in input_keys and output.raw:
+                checkpoints.memoize(input_keys[output.name], output.name, output.agent, output.raw)
+            if task_callback is not None:
+                task_callback(output)
+
+        def restore(task, agent, raw, source, fields=None):
+            task.output = TaskOutput(description=task.description, name=task.name, expected_output=task.expected_output,
+                                     agent=agent, raw=raw)
+            record_span('task', time.perf_counter(), fields=fields, agent=task.agent.role, status=source)
+            accept(task.output)
+            _report_agent_status(task.agent.role, 'Completed')
+
+        restored = []
+        if checkpoints is not None and resume_from is not None:
+            restored = checkpoints.completed_tasks(resume_from, fingerprint)[:len(tasks)]
+            if restored:
+                logger.info(f"Resuming run {resume_from}, reusing the outputs of: {', '.join(c['task'] for c in restored)}")
+            else:
+                logger.warning(f"No usable checkpoints of run {resume_from} (none saved or inputs changed), running all tasks")
+        record_span('phase', phase_started, phase='build_crew')
+
+        # Tasks run one at a time in their own crew, so each sees only its declared context
+        result = None
+        for position, task in enumerate(tasks):
+            if position < len(restored):
+                restore(task, restored[position]['agent'], restored[position]['output'], 'restored')
+                continue
+            if task.name == 'availability_analysis' and availability_result is not None:
+                # The time saved is estimated from this agent's earlier tasks, else from any agent's
+                role = task.agent.role
+                saved = mean_duration('task', agent=role, status='completed') or mean_duration('task', status='completed')
+                logger.info(f"{len(availability.in_stock)} of {len(suppliers_df)} suppliers have stock, "
+                            f"using the rule-based availability analysis instead of the {role}"
+                            + (f" (saves ~{saved:.1f}s)" if saved is not None else ""))
+                restore(task, role, availability_result, 'templated',
+                        fields={'saved_s': round(saved, 4) if saved is not None else None})
+                continue
+            inputs = task_inputs[task.name]
+            if checkpoints is not None and memoize and inputs.memoize:
+                input_keys[task.name] = task_input_key(task, inputs, {name: tasks_by_name[name].output.raw
+                                                                      for name in inputs.tasks})
+                memoized = checkpoints.memoized(input_keys[task.name], MEMO_MAX_AGE_SECONDS)
+                if memoized:
+                    logger.info(f"Inputs of {task.name} are unchanged, reusing its memoized output")
+                    restore(task, memoized[0], memoized[1], 'memoized')
+                    continue
+            emails_before[task.name] = control.email_attempts
+            task.description = task.description.replace(AS_OF_DATE, datetime.now().strftime('%Y-%m-%d'))
+            crew = Crew(agents=[task.agent], tasks=[task], task_callback=on_task_completed, verbose=True)
+            with span('phase', phase='kickoff'):
+                result = crew.kickoff()
+            if task.name in rejected:
+                choice = model_choices[task.name]
+                logger.warning(f"Output of {task.name} on {choice.model} failed its check ({rejected.pop(task.name)}), "
+                               f"running it again on {choice.baseline_model}")
+                checked.discard(task.name)
+                task.agent = pipeline.agent(task.agent.role, build_llm(choice, choice.baseline_model), order_allocation_tool)
+                instrument(task.agent)
+                record_route(task.name, choice.model, choice.baseline_model, escalated=True, pricing=model_pricing)
+                crew = Crew(agents=[task.agent], tasks=[task], task_callback=on_task_completed, verbose=True)
+                with span('phase', phase='kickoff'):
+                    result = crew.kickoff()
+
+        if result is None:
+            logger.info("All tasks were reused from checkpoints or earlier runs")
+            result = tasks[-1].output.raw
+        routing = (current_usage() or {}).get('routing')
+        if routing:
+            logger.info(f"Model routing saved ${routing['cost_saved_usd']:.4f} and {routing['latency_saved_s']:.1f}s "
+                        f"of LLM time compared to the agents' own models")
         logger.info("Analysis completed successfully")
         return result
 
+    except RunCancelled:
+        raise
     except Exception as e:
         logger.error(f"Error during analysis: {str(e)}")
         raise
+    finally:
+        set_current_control(None)
+        if cassette is not None:
+            try:
+                cassette.save()
+            except Exception as e:
+                logger.error(f"Error saving cassette: {str(e)}")
+        # An abandoned run may unwind after the next run installed its callback
+        if _agent_status_callback is agent_status_callback:
+            _agent_status_callback = None
+
+DemandSignals = namedtuple('DemandSignals', 'current_inventory avg_monthly_usage avg_lead_time safety_stock_level '
+                                             'reorder_point trend_pct')
+DemandSignals.__doc__ = """Deterministic inventory signals of a part's demand history.
+
+``reorder_point`` is the expected usage over the average lead time plus the safety stock,
+``trend_pct`` the change of the average usage from the first to the last month in the history.
+"""
+
+def compute_demand_signals(df):
+    """DemandSignals of a demand history with parsed dates."""
+    total_usage = df['valves_used'].sum()
+    avg_monthly_usage = total_usage / (len(df) / 12)
+    avg_lead_time = df[df['lead_time_days'] > 0]['lead_time_days'].mean()
+    safety_stock_level = int(avg_monthly_usage * 0.15)  # 15% safety stock
+    monthly_avg = df.groupby(df['date'].dt.month)['valves_used'].mean()
+    trend_pct = (monthly_avg.iloc[-1] / monthly_avg.iloc[0] - 1) * 100 if len(monthly_avg) >= 2 else 0.0
+    # Without any recorded delivery the reorder point is just the safety stock
+    lead_time_usage = 0 if pd.isna(avg_lead_time) else round(avg_monthly_usage / 30 * avg_lead_time)
+    return DemandSignals(int(df['inventory_level'].iloc[-1]), float(avg_monthly_usage), float(avg_lead_time),
+                         safety_stock_level, int(lead_time_usage) + safety_stock_level, float(trend_pct))
 
 def calculate_monthly_demand_trend(df):
     """Calculate the monthly demand trend description."""
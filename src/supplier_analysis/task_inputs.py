@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+
+# Memoized outputs of tasks with web search tools go stale, so entries older than this are not reused
+MEMO_MAX_AGE_SECONDS = 24 * 3600
+
+TaskInputs = namedtuple('TaskInputs', 'files tasks tools memoize', defaults=((), (), (), True))
+TaskInputs.__doc__ = """Declared inputs of a crew task.
+
+``files`` are data files whose content the task depends on, ``tasks`` the names of the upstream
+tasks whose outputs are its only context, ``tools`` the tools it may call. Tasks with side
+effects (sending the email) set ``memoize=False`` and always run.
+"""
+
+_digest_lock = threading.Lock()
+_file_digests = {}  # path -> ((mtime_ns, size), digest)
+
+
+def file_digest(path):
+    """sha256 of a file's content, recomputed only when its modification time or size changes."""
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _digest_lock:
+        cached = _file_digests.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    with _digest_lock:
+        _file_digests[path] = (signature, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def _task_payload(task, inputs):
+    agent = task.agent
+    return {
+        'task': task.name,
+        'description': task.description,
+        'expected_output': task.expected_output,
+        'agent': [agent.role, agent.goal, agent.backstory, getattr(agent.llm, 'model', None)],
+        'tools': sorted(tool.name for tool in inputs.tools),
+        'files': {os.path.basename(path): file_digest(path) for path in inputs.files},
+    }
+
+
+def task_input_key(task, inputs, upstream_outputs):
+    """Content hash of everything a task's output depends on.
+
+    Covers the task description (before the run date is filled in) and expected output, the
+    agent and its model, the declared tools, the content of the declared files and the outputs
+    of the declared upstream tasks (``upstream_outputs`` maps task name to raw output).
+    """
+    payload = _task_payload(task, inputs)
+    payload['upstream'] = {name: hashlib.sha256(upstream_outputs[name].encode('utf-8')).hexdigest()
+                           for name in inputs.tasks}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def tasks_fingerprint(tasks, task_inputs):
+    """Hash of the inputs of all ``tasks`` (``task_inputs`` maps task name to TaskInputs), without upstream outputs.
+
+    Checkpoints of a run are only reused while it is unchanged. Like task_input_key it hashes the
+    description before the run date is filled in, so a run can be resumed on a later day.
+    """
+    payload = [_task_payload(task, task_inputs[task.name]) for task in tasks]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:16]
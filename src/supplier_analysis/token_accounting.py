@@ -0,0 +1,299 @@
+import logging
+import threading
+import time
+
+from .instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+# USD per 1M tokens (prompt, completion); extend or override via [tool.crewai.pricing] in the config
+MODEL_PRICES = {
+    'gpt-4': (30.0, 60.0),
+    'gpt-4-turbo': (10.0, 30.0),
+    'gpt-4o': (2.5, 10.0),
+    'gpt-4o-mini': (0.15, 0.6),
+    'gpt-4.1': (2.0, 8.0),
+    'gpt-4.1-mini': (0.4, 1.6),
+    'gpt-4.1-nano': (0.1, 0.4),
+    'gpt-3.5-turbo': (0.5, 1.5),
+}
+
+# Rough characters-per-token ratio used when a provider reports no usage
+CHARS_PER_TOKEN = 4
+
+_lock = threading.Lock()
+_current = threading.local()
+_run_calls = None
+_run_routes = None
+_totals = {}
+_usage_recorder_class = None
+
+
+def new_usage_recorder():
+    """Per-call callback that receives the usage block CrewAI forwards from LiteLLM.
+
+    The class is built on first use, so importing this module (e.g. from the Flask app
+    for /api/status) does not pull in LiteLLM.
+    """
+    global _usage_recorder_class
+    if _usage_recorder_class is None:
+        from litellm.integrations.custom_logger import CustomLogger
+
+        class UsageRecorder(CustomLogger):
+            def __init__(self):
+                super().__init__()
+                self.usage = None
+
+            def log_success_event(self, kwargs, response_obj, start_time, end_time):
+                # LiteLLM itself also calls registered loggers with the raw response; only CrewAI passes a dict
+                if isinstance(response_obj, dict) and response_obj.get('usage'):
+                    self.usage = response_obj['usage']
+
+        _usage_recorder_class = UsageRecorder
+    return _usage_recorder_class()
+
+
+def set_current_task(agent, task):
+    """Attribute subsequent LLM calls in this thread to ``agent`` and ``task``."""
+    _current.agent = agent
+    _current.task = task
+
+
+def current_task():
+    """(agent, task) the LLM calls of this thread are attributed to, 'unknown' when not set."""
+    return getattr(_current, 'agent', None) or 'unknown', getattr(_current, 'task', None) or 'unknown'
+
+
+def clear_current_task():
+    _current.agent = None
+    _current.task = None
+
+
+def model_price(model, pricing=None):
+    """(prompt, completion) USD per 1M tokens for a model, ignoring provider prefixes like 'openai/'."""
+    name = model.split('/')[-1] if model else ''
+    prices = {**MODEL_PRICES, **(pricing or {})}
+    if name in prices:
+        return tuple(prices[name])
+    # Dated snapshots such as gpt-4o-2024-08-06 fall back to the longest matching base model
+    matches = [base for base in prices if name.startswith(base)]
+    return tuple(prices[max(matches, key=len)]) if matches else None
+
+
+def _usage_value(usage, field):
+    if isinstance(usage, dict):
+        return int(usage.get(field) or 0)
+    return int(getattr(usage, field, 0) or 0)
+
+
+def _estimate_tokens(content):
+    if isinstance(content, list):
+        content = "\n".join(str(m.get('content', '')) for m in content)
+    return max(len(str(content or '')) // CHARS_PER_TOKEN, 1)
+
+
+def track_llm_usage(llm, pricing=None):
+    """Wrap ``llm.call`` so every call records tokens, model, latency and cost.
+
+    Calls are attributed to the agent and task set with set_current_task(). Wrapping is
+    idempotent, so an LLM instance shared by several agents is only wrapped once.
+    """
+    if llm is None or getattr(llm, '_usage_tracked', False):
+        return llm
+    original_call = llm.call
+
+    def call(messages, tools=None, callbacks=None, available_functions=None):
+        recorder = new_usage_recorder()
+        agent = getattr(_current, 'agent', None) or 'unknown'
+        task = getattr(_current, 'task', None) or 'unknown'
+        response = None
+        started = time.perf_counter()
+        try:
+            with span('llm_call', agent=agent, model=llm.model):
+                response = original_call(messages, tools, [*(callbacks or []), recorder], available_functions)
+            return response
+        finally:
+            latency = time.perf_counter() - started
+            if recorder.usage:
+                prompt_tokens = _usage_value(recorder.usage, 'prompt_tokens')
+                completion_tokens = _usage_value(recorder.usage, 'completion_tokens')
+                estimated = False
+            else:
+                prompt_tokens = _estimate_tokens(messages)
+                completion_tokens = _estimate_tokens(response) if response is not None else 0
+                estimated = True
+            record_call(llm.model, agent, task, prompt_tokens, completion_tokens, latency, estimated, pricing)
+
+    llm.call = call
+    llm._usage_tracked = True
+    return llm
+
+
+def record_call(model, agent, task, prompt_tokens, completion_tokens, latency, estimated=False, pricing=None):
+    price = model_price(model, pricing)
+    cost = (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000 if price else None
+    entry = {
+        'agent': agent,
+        'task': task,
+        'model': model,
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'latency_s': round(latency, 4),
+        'cost_usd': round(cost, 6) if cost is not None else None,
+        'estimated': estimated,
+    }
+    with _lock:
+        if _run_calls is not None:
+            _run_calls.append(entry)
+        totals = _totals.setdefault((agent, model), {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'cost_usd': 0.0,
+                                                     'latency_s': 0.0})
+        totals['calls'] += 1
+        totals['prompt_tokens'] += prompt_tokens
+        totals['completion_tokens'] += completion_tokens
+        totals['cost_usd'] += cost or 0.0
+        totals['latency_s'] += latency
+    return entry
+
+
+def start_run():
+    """Begin collecting LLM calls for a run and return the live list of call records."""
+    global _run_calls, _run_routes
+    with _lock:
+        _run_calls = []
+        _run_routes = {}
+        return _run_calls
+
+
+def stop_run():
+    """Stop collecting and return the usage summary of the run."""
+    global _run_calls, _run_routes
+    with _lock:
+        calls, _run_calls = _run_calls or [], None
+        routes, _run_routes = _run_routes or {}, None
+    return summarize_usage(calls, routes)
+
+
+def current_usage():
+    """Usage summary of the run in progress, or None when no run is collecting."""
+    with _lock:
+        calls = list(_run_calls) if _run_calls is not None else None
+        routes = dict(_run_routes or {})
+    return summarize_usage(calls, routes) if calls is not None else None
+
+
+def record_route(task, model, baseline_model, escalated=False, pricing=None):
+    """Note that ``task`` runs on ``model`` instead of ``baseline_model``, so the run summary compares the two."""
+    with _lock:
+        if _run_routes is not None:
+            _run_routes[task] = {'model': model, 'baseline_model': baseline_model, 'escalated': escalated,
+                                 'baseline_price': model_price(baseline_model, pricing)}
+
+
+def summarize_routing(calls, routes):
+    """Cost and latency of the routed tasks against running them on their baseline model.
+
+    For an escalated task the baseline is its rerun on the baseline model. Otherwise the
+    baseline cost is the task's tokens at the baseline price, and the baseline latency is its
+    number of calls times the mean call latency of the baseline model in this process, when
+    that model has served calls.
+    """
+    with _lock:
+        model_latency = {}
+        for (_, model), totals in _totals.items():
+            latency, count = model_latency.get(model, (0.0, 0))
+            model_latency[model] = (latency + totals['latency_s'], count + totals['calls'])
+
+    tasks = {}
+    for task, route in routes.items():
+        task_calls = [c for c in calls if c['task'] == task]
+        cost = sum(c['cost_usd'] or 0.0 for c in task_calls)
+        latency = sum(c['latency_s'] for c in task_calls)
+        price = route['baseline_price']
+        if route['escalated']:
+            rerun = [c for c in task_calls if c['model'] == route['baseline_model']]
+            baseline_cost = sum(c['cost_usd'] or 0.0 for c in rerun)
+            baseline_latency = sum(c['latency_s'] for c in rerun)
+        else:
+            baseline_cost = (sum(c['prompt_tokens'] * price[0] + c['completion_tokens'] * price[1] for c in task_calls)
+                             / 1_000_000 if price else None)
+            total_latency, count = model_latency.get(route['baseline_model'], (0.0, 0))
+            baseline_latency = len(task_calls) * total_latency / count if count else None
+        tasks[task] = {
+            'model': route['model'],
+            'baseline_model': route['baseline_model'],
+            'escalated': route['escalated'],
+            'calls': len(task_calls),
+            'cost_usd': round(cost, 6),
+            'baseline_cost_usd': round(baseline_cost, 6) if baseline_cost is not None else None,
+            'latency_s': round(latency, 4),
+            'baseline_latency_s': round(baseline_latency, 4) if baseline_latency is not None else None,
+        }
+    return {
+        'tasks': tasks,
+        'cost_saved_usd': round(sum(t['baseline_cost_usd'] - t['cost_usd'] for t in tasks.values()
+                                    if t['baseline_cost_usd'] is not None), 6),
+        'latency_saved_s': round(sum(t['baseline_latency_s'] - t['latency_s'] for t in tasks.values()
+                                     if t['baseline_latency_s'] is not None), 4),
+    }
+
+
+def run_call_count():
+    """Number of calls recorded for the run in progress, or None when no run is collecting."""
+    with _lock:
+        return len(_run_calls) if _run_calls is not None else None
+
+
+def summarize_usage(calls, routes=None):
+    """Roll call records up into run totals and per-agent, per-task and per-model breakdowns.
+
+    With the ``routes`` of tasks that ran on another model than their agent's, a 'routing'
+    entry compares them with their baseline model (see summarize_routing).
+    """
+    def rollup(key):
+        groups = {}
+        for call in calls:
+            group = groups.setdefault(call[key], {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+                                                  'latency_s': 0.0, 'cost_usd': 0.0})
+            group['calls'] += 1
+            group['prompt_tokens'] += call['prompt_tokens']
+            group['completion_tokens'] += call['completion_tokens']
+            group['latency_s'] = round(group['latency_s'] + call['latency_s'], 4)
+            group['cost_usd'] = round(group['cost_usd'] + (call['cost_usd'] or 0.0), 6)
+        return groups
+
+    calls = list(calls)
+    summary = {
+        'calls': len(calls),
+        'prompt_tokens': sum(c['prompt_tokens'] for c in calls),
+        'completion_tokens': sum(c['completion_tokens'] for c in calls),
+        'latency_s': round(sum(c['latency_s'] for c in calls), 4),
+        'cost_usd': round(sum(c['cost_usd'] or 0.0 for c in calls), 6),
+        'estimated': any(c['estimated'] for c in calls),
+        'by_agent': rollup('agent'),
+        'by_task': rollup('task'),
+        'by_model': rollup('model'),
+    }
+    if routes:
+        summary['routing'] = summarize_routing(calls, routes)
+    return summary
+
+
+def render_prometheus():
+    """Render cumulative token, call and cost counters per agent and model in Prometheus text format."""
+    with _lock:
+        snapshot = {key: dict(totals) for key, totals in _totals.items()}
+
+    lines = ["# HELP supplier_analysis_llm_calls_total LLM calls per agent and model.",
+             "# TYPE supplier_analysis_llm_calls_total counter"]
+    lines += [f'supplier_analysis_llm_calls_total{{agent="{agent}",model="{model}"}} {t["calls"]}'
+              for (agent, model), t in sorted(snapshot.items())]
+    lines += ["# HELP supplier_analysis_llm_tokens_total LLM tokens per agent, model and token type.",
+              "# TYPE supplier_analysis_llm_tokens_total counter"]
+    for (agent, model), t in sorted(snapshot.items()):
+        lines.append(f'supplier_analysis_llm_tokens_total{{agent="{agent}",model="{model}",type="prompt"}} {t["prompt_tokens"]}')
+        lines.append(f'supplier_analysis_llm_tokens_total{{agent="{agent}",model="{model}",type="completion"}} {t["completion_tokens"]}')
+    lines += ["# HELP supplier_analysis_llm_cost_usd_total Estimated LLM cost in USD per agent and model.",
+              "# TYPE supplier_analysis_llm_cost_usd_total counter"]
+    lines += [f'supplier_analysis_llm_cost_usd_total{{agent="{agent}",model="{model}"}} {t["cost_usd"]:.6f}'
+              for (agent, model), t in sorted(snapshot.items())]
+    return "\n".join(lines) + "\n"
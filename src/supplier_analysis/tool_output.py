@@ -0,0 +1,126 @@
+import logging
+import re
+import threading
+import zlib
+from collections import namedtuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .token_accounting import CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+# Overridable in [tool.crewai.tool_output]: estimated tokens one search tool call may return,
+# words per shingle, and the shingle overlap (Jaccard) above which two bodies count as the same text
+DEFAULT_BUDGET = {'max_tokens': 800, 'shingle_size': 3, 'similarity': 0.6}
+
+# Query parameters that only track the click and do not change the page: exact names, and
+# prefixes of parameter families such as utm_source or mc_cid
+TRACKING_PARAMETERS = ('ref', 'gclid', 'fbclid', 'msclkid', 'srsltid')
+TRACKING_PREFIXES = ('utm_', 'mc_')
+
+ResultEntry = namedtuple('ResultEntry', 'url title body text boost', defaults=(0.0,))
+ResultEntry.__doc__ = """One search result as a tool reports it.
+
+``text`` is the formatted entry, ``boost`` raises its rank when the tool extracted something
+from it (a price, a trend figure, a risk).
+"""
+
+_WORD = re.compile(r'\w+')
+
+
+def canonical_url(url):
+    """URL without scheme, 'www.', fragment, tracking parameters and trailing slash, for comparing results."""
+    parts = urlsplit((url or '').strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if key.lower() not in TRACKING_PARAMETERS and not key.lower().startswith(TRACKING_PREFIXES))
+    return urlunsplit(('', host, parts.path.rstrip('/') or '/', urlencode(query), ''))
+
+
+def shingles(text, size):
+    """Hashed word ``size``-grams of ``text``; short texts give their whole word sequence as one shingle."""
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {zlib.crc32(' '.join(words).encode())} if words else set()
+    return {zlib.crc32(' '.join(words[i:i + size]).encode()) for i in range(len(words) - size + 1)}
+
+
+def similarity(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class OutputBudget:
+    """Deduplicates, ranks and trims the results a search tool returns to the agent.
+
+    Results are ranked by how many query terms their title and body contain, plus their
+    ``boost``, and earlier results win ties. Going down the ranking, a result is dropped when
+    its canonical URL or a near-identical body (shingle overlap of at least ``similarity``)
+    was already kept, or when it no longer fits into ``max_tokens``. The kept results are
+    rendered in their sections in ranked order, followed by a note of what was dropped.
+    """
+
+    def __init__(self, budget=None):
+        self._lock = threading.Lock()
+        self.configure(budget)
+
+    def configure(self, budget=None):
+        budget = budget or {}
+        with self._lock:
+            self.budget = {key: budget.get(key, default) for key, default in DEFAULT_BUDGET.items()}
+
+    def compact(self, query, sections, empty):
+        """Render ``sections``, a list of (heading or None, [ResultEntry]), or return ``empty`` if there are no results."""
+        budget = self.budget
+        terms = {word for word in _WORD.findall(query.lower()) if len(word) > 2}
+        ranked = []
+        for section, (_, entries) in enumerate(sections):
+            for entry in entries:
+                text = f"{entry.title} {entry.body}".lower()
+                relevance = sum(term in text for term in terms) / len(terms) if terms else 0.0
+                ranked.append((relevance + entry.boost, -len(ranked), section, entry))
+        if not ranked:
+            return empty
+        ranked.sort(reverse=True, key=lambda item: item[:2])
+
+        kept = {section: [] for section in range(len(sections))}
+        seen_urls, seen_shingles = set(), []
+        duplicates, over_budget, used_tokens = 0, 0, 0
+        for _, _, section, entry in ranked:
+            # Results without a link are told apart by their title and snippet instead
+            url = canonical_url(entry.url) if (entry.url or '').strip() else ('', entry.title, entry.body)
+            body_shingles = shingles(entry.body, budget['shingle_size'])
+            if url in seen_urls or any(similarity(body_shingles, other) >= budget['similarity'] for other in seen_shingles):
+                duplicates += 1
+                continue
+            tokens = estimate_tokens(entry.text)
+            # The best result is always returned, even when it alone exceeds the budget
+            if used_tokens and used_tokens + tokens > budget['max_tokens']:
+                over_budget += 1
+                continue
+            used_tokens += tokens
+            seen_urls.add(url)
+            seen_shingles.append(body_shingles)
+            kept[section].append(entry)
+
+        lines = []
+        for section, (heading, _) in enumerate(sections):
+            if kept[section]:
+                if heading:
+                    lines.append(f"\n{heading}")
+                lines += [entry.text for entry in kept[section]]
+        if duplicates or over_budget:
+            lines.append(f"(Omitted {duplicates + over_budget} of {len(ranked)} results: {duplicates} as duplicates, "
+                         f"{over_budget} as lower-ranked results over the {budget['max_tokens']} token budget)")
+            logger.info(f"Search results for {query!r}: kept {len(ranked) - duplicates - over_budget} of {len(ranked)}, "
+                        f"{duplicates} duplicates, {over_budget} over budget, ~{used_tokens} tokens")
+        return "\n".join(lines).lstrip("\n")
+
+
+# Shared by all search tools of this process
+output_budget = OutputBudget()
@@ -0,0 +1,104 @@
+import asyncio
+import base64
+import logging
+from email.message import EmailMessage
+
+from src.supplier_analysis.async_smtp import AsyncSMTP
+
+
+class FakeSMTPServer:
+    """Local SMTP server offering only AUTH LOGIN; keeps the command lines and the raw DATA it received."""
+
+    def __init__(self):
+        self.commands = []
+        self.data = None
+
+    async def handle(self, reader, writer):
+        def reply(line):
+            writer.write(f"{line}\r\n".encode())
+
+        reply('220 localhost ready')
+        while True:
+            raw = await reader.readline()
+            if not raw:
+                break
+            line = raw.decode().rstrip('\r\n')
+            self.commands.append(line)
+            if line.startswith('EHLO'):
+                reply('250-localhost')
+                reply('250 AUTH LOGIN')
+            elif line == 'AUTH LOGIN':
+                reply('334 ' + base64.b64encode(b'Username:').decode())
+                line = (await reader.readline()).decode().rstrip('\r\n')
+                self.commands.append(line)
+                reply('334 ' + base64.b64encode(b'Password:').decode())
+                line = (await reader.readline()).decode().rstrip('\r\n')
+                self.commands.append(line)
+                reply('235 Authentication successful')
+            elif line.startswith(('MAIL FROM', 'RCPT TO')):
+                reply('250 OK')
+            elif line == 'DATA':
+                reply('354 End data with <CR><LF>.<CR><LF>')
+                self.data = await reader.readuntil(b'\r\n.\r\n')
+                reply('250 Queued')
+            elif line == 'QUIT':
+                reply('221 Bye')
+                await writer.drain()
+                break
+            await writer.drain()
+        writer.close()
+
+
+def send(server, msg, user, password):
+    async def main():
+        listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            async with AsyncSMTP('127.0.0.1', port, timeout=5) as smtp:
+                await smtp.login(user, password)
+                await smtp.send_message(msg)
+    asyncio.run(main())
+
+
+def make_message(body):
+    msg = EmailMessage()
+    msg['From'] = 'sender@example.com'
+    msg['To'] = 'buyer@example.com'
+    msg['Subject'] = 'Executive Summary'
+    msg.set_content(body)
+    return msg
+
+
+def test_data_is_dot_stuffed_and_terminated():
+    server = FakeSMTPServer()
+    send(server, make_message("First line\n.hidden line\n..two dots\nLast line"), 'user@example.com', 'secret')
+    assert server.data.endswith(b'\r\nLast line\r\n.\r\n')
+    lines = server.data.split(b'\r\n')
+    assert b'..hidden line' in lines
+    assert b'...two dots' in lines
+    assert b'.hidden line' not in lines
+    assert server.commands[-2:] == ['DATA', 'QUIT']
+    assert 'RCPT TO:<buyer@example.com>' in server.commands
+
+
+def test_auth_login_sends_credentials_but_does_not_log_them(caplog):
+    server = FakeSMTPServer()
+    with caplog.at_level(logging.DEBUG, logger='src.supplier_analysis.async_smtp'):
+        send(server, make_message("Body"), 'user@example.com', 'secret')
+    user_token = base64.b64encode(b'user@example.com').decode()
+    password_token = base64.b64encode(b'secret').decode()
+    auth = server.commands.index('AUTH LOGIN')
+    assert server.commands[auth + 1:auth + 3] == [user_token, password_token]
+    assert 'SMTP send: <password>' in caplog.text
+    assert user_token not in caplog.text
+    assert password_token not in caplog.text
+
+
+def test_bcc_is_sent_to_but_not_removed_from_the_message():
+    server = FakeSMTPServer()
+    msg = make_message("Body")
+    msg['Bcc'] = 'audit@example.com'
+    send(server, msg, 'user@example.com', 'secret')
+    assert 'RCPT TO:<audit@example.com>' in server.commands
+    assert b'audit@example.com' not in server.data
+    assert msg['Bcc'] == 'audit@example.com'  # a retry or a recording sees the message as it was passed
@@ -0,0 +1,46 @@
+import pandas as pd
+
+from src.supplier_analysis.availability_rules import assess_availability, templated_availability, unavailable_summary
+
+
+def make_suppliers(*rows):
+    """Supplier table from (name, availability) pairs, with the other columns the templates print."""
+    return pd.DataFrame([{'supplier_name': name, 'availability': availability, 'on_time_delivery_rate': '95%',
+                          'quality_defect_rate': '0.3%', 'price_per_unit': 140.0, 'minimum_order_quantity': 10,
+                          'response_time_hours': 2, 'rating': 4.2}
+                         for name, availability in rows])
+
+
+def templated(suppliers, max_in_stock=1):
+    return templated_availability(assess_availability(suppliers), suppliers, max_in_stock)
+
+
+def test_empty_supplier_table_is_left_to_the_analyst():
+    assert templated(pd.DataFrame(columns=['supplier_name', 'availability'])) is None
+
+
+def test_no_supplier_with_stock():
+    suppliers = make_suppliers(('Festo', 'Not Available'), ('Bosch', 'Discontinued'))
+    text = templated(suppliers)
+    assert text.startswith("CRITICAL SUPPLY CHAIN RISK: no supplier in the database has stock")
+    assert "All 2 current suppliers are excluded from recommendations: Festo (Not Available), Bosch (Discontinued)." in text
+    assert unavailable_summary(assess_availability(suppliers)).startswith("None of the 2 current suppliers has stock")
+
+
+def test_single_supplier_with_stock():
+    suppliers = make_suppliers(('Festo', 'Not Available'), ('Bosch', 'Limited Stock'))
+    text = templated(suppliers)
+    assert text.startswith("1 of 2 current suppliers of the")
+    assert "- Bosch: Limited Stock, on-time delivery 95%" in text
+    assert "- Single source: Bosch is the only current supplier with stock" in text
+    assert "- Limited stock at Bosch" in text
+    assert "Excluded from recommendations: Festo (Not Available)." in text
+
+
+def test_more_suppliers_with_stock_than_max_in_stock():
+    suppliers = make_suppliers(('Festo', 'Available'), ('Bosch', 'Limited Stock'), ('Parker', 'Available'))
+    assert templated(suppliers, max_in_stock=2) is None
+    text = templated(suppliers, max_in_stock=3)
+    assert text.startswith("3 of 3 current suppliers of the")
+    assert "Single source" not in text
+    assert "Excluded from recommendations" not in text
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from src.supplier_analysis.cancellation import RunCancelled, RunControl, check_side_effect, set_current_control
+from src.supplier_analysis.cassette import active_cassette
+
+
+def slow_side_effect(release, sent, blocked):
+    """Tool body that waits for ``release``, then performs its side effect unless it is refused."""
+    def tool():
+        release.wait(5)
+        try:
+            check_side_effect()
+        except RunCancelled:
+            blocked.set()
+            raise
+        sent.append('email')
+        return 'sent'
+    return tool
+
+
+def test_cancelled_run_refuses_new_tool_calls():
+    control = RunControl()
+    control.cancel()
+    called = []
+    with pytest.raises(RunCancelled):
+        control.run_tool('send_email', lambda: called.append(1))
+    assert called == []
+
+
+def test_abandoned_tool_after_cancel_does_not_send():
+    control = RunControl()
+    release, blocked, sent = threading.Event(), threading.Event(), []
+    threading.Timer(0.2, control.cancel).start()
+    with pytest.raises(RunCancelled):
+        control.run_tool('send_email', slow_side_effect(release, sent, blocked))
+    # The abandoned thread continues and reaches the send only now
+    release.set()
+    assert blocked.wait(2)
+    assert sent == []
+
+
+def test_tool_abandoned_after_its_deadline_does_not_send():
+    control = RunControl({'tools': {'send_email': 0.2}})
+    release, blocked, sent = threading.Event(), threading.Event(), []
+    result = control.run_tool('send_email', slow_side_effect(release, sent, blocked))
+    assert 'did not respond' in result
+    assert not control.cancelled  # the run itself continues
+    release.set()
+    assert blocked.wait(2)
+    assert sent == []
+
+
+def test_tool_within_its_deadline_sends():
+    control = RunControl()
+    release, blocked, sent = threading.Event(), threading.Event(), []
+    release.set()
+    assert control.run_tool('send_email', slow_side_effect(release, sent, blocked)) == 'sent'
+    assert sent == ['email']
+
+
+def test_run_deadline_times_out():
+    control = RunControl({'run': 0.1})
+    time.sleep(0.15)
+    with pytest.raises(RunCancelled) as raised:
+        control.check()
+    assert raised.value.status == 'timed_out'
+
+
+def test_overlapping_runs_use_their_own_cassette():
+    seen = {}
+
+    def run(name, started, finish):
+        control = RunControl()
+        control.cassette = f"cassette-{name}"
+        set_current_control(control)
+        try:
+            started.set()
+            finish.wait(2)
+            # Tool calls run in their own thread and still see their run's cassette
+            seen[name] = control.run_tool('search_suppliers', active_cassette)
+        finally:
+            set_current_control(None)
+
+    first_started, second_started, finish = threading.Event(), threading.Event(), threading.Event()
+    first = threading.Thread(target=run, args=('first', first_started, finish))
+    second = threading.Thread(target=run, args=('second', second_started, finish))
+    first.start()
+    first_started.wait(2)
+    second.start()
+    second_started.wait(2)
+    finish.set()
+    first.join(5)
+    second.join(5)
+    assert seen == {'first': 'cassette-first', 'second': 'cassette-second'}
+    assert active_cassette() is None
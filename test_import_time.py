@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Cumulative import time budget for `import app` in milliseconds, override with IMPORT_BUDGET_MS
+IMPORT_BUDGET_MS = int(os.environ.get('IMPORT_BUDGET_MS', 1000))
+
+# Modules that must only be imported once an analysis actually runs
+LAZY_MODULES = ['crewai', 'litellm', 'duckduckgo_search', 'pandas', 'smtplib']
+
+
+def measure_import(module='app'):
+    """Import a module in a fresh interpreter with -X importtime and return {module: cumulative_us}."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    timings = {}
+    for line in completed.stderr.splitlines():
+        # Format: "import time:  self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def test_app_import_time():
+    timings = measure_import('app')
+    eager = [m for m in LAZY_MODULES if m in timings]
+    assert not eager, f"Heavy modules imported at app startup: {', '.join(eager)}"
+
+    app_ms = timings['app'] / 1000
+    logger.info(f"import app took {app_ms:.1f} ms (budget {IMPORT_BUDGET_MS} ms)")
+    assert app_ms <= IMPORT_BUDGET_MS, f"import app took {app_ms:.1f} ms, budget is {IMPORT_BUDGET_MS} ms"
+
+
+if __name__ == '__main__':
+    test_app_import_time()
+    logger.info("Import time budget check passed")
@@ -0,0 +1,150 @@
+import os
+
+import pytest
+
+from src.supplier_analysis import monitoring
+from src.supplier_analysis.monitoring import MonitorScheduler
+
+PART = 'VQC4101-51'
+
+# Ten valves a month and a 30-day lead time: safety stock 18 units, reorder point 138 units
+HEALTHY, BELOW_REORDER_POINT, BELOW_SAFETY_STOCK = 200, 100, 10
+
+
+class FakeTrigger:
+    """Records the runs the scheduler starts; returns None (no run could start) while ``busy``."""
+
+    def __init__(self):
+        self.calls = []
+        self.busy = False
+
+    def __call__(self, scenario, reason):
+        if self.busy:
+            return None
+        self.calls.append((scenario, reason))
+        return f"run-{len(self.calls)}"
+
+
+class PartFiles:
+    """Demand history and supplier file of the tracked part in a temporary data directory."""
+
+    def __init__(self, data_dir):
+        self.history = os.path.join(data_dir, 'history.csv')
+        self.suppliers = os.path.join(data_dir, 'suppliers.csv')
+        self._mtime = 1_000_000_000
+        self.write_history(HEALTHY)
+        self.write_suppliers({'Festo': 'Available', 'Bosch': 'Limited Stock'})
+
+    def write_history(self, inventory):
+        rows = [f"2024-{month:02d}-15,10,{inventory},30" for month in range(1, 13)]
+        self._write(self.history, "date,valves_used,inventory_level,lead_time_days\n" + "\n".join(rows) + "\n")
+
+    def write_suppliers(self, availability):
+        rows = [f"{name},{PART} SMC 5/2-Wegeventil,{status}" for name, status in availability.items()]
+        self._write(self.suppliers, "supplier_name,product,availability\n" + "\n".join(rows) + "\n")
+
+    def touch(self):
+        """A new modification time with the same content, so the next check reads the files again."""
+        for path in (self.history, self.suppliers):
+            self._bump(path)
+
+    def _write(self, path, text):
+        with open(path, 'w') as f:
+            f.write(text)
+        self._bump(path)
+
+    def _bump(self, path):
+        # Explicit modification times, so rewrites within the same clock tick still change the signature
+        self._mtime += 1
+        os.utime(path, ns=(self._mtime, self._mtime))
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    monkeypatch.setattr(monitoring, 'DATA_DIR', str(tmp_path))
+    return PartFiles(str(tmp_path))
+
+
+def make_scheduler(trigger, cooldown=0):
+    parts = [{'part': PART, 'scenario': 'limited', 'history': 'history.csv', 'suppliers': 'suppliers.csv'}]
+    return MonitorScheduler(trigger, config={'cooldown': cooldown, 'parts': parts})
+
+
+def check(scheduler):
+    (result,) = scheduler.check()
+    return result
+
+
+def test_persistent_condition_triggers_once(files):
+    trigger = FakeTrigger()
+    scheduler = make_scheduler(trigger)
+    assert check(scheduler).conditions == []
+
+    files.write_history(BELOW_REORDER_POINT)
+    result = check(scheduler)
+    assert result.new == ['below_reorder_point'] and result.triggered and result.run_id == 'run-1'
+    assert trigger.calls == [('limited', f"{PART}: below_reorder_point")]
+
+    files.touch()
+    result = check(scheduler)
+    assert result.conditions == ['below_reorder_point'] and result.new == [] and not result.triggered
+    assert check(scheduler).skipped  # unchanged files are not read again
+    assert len(trigger.calls) == 1
+
+
+def test_cleared_condition_is_rearmed(files):
+    trigger = FakeTrigger()
+    scheduler = make_scheduler(trigger)
+    files.write_history(BELOW_REORDER_POINT)
+    assert check(scheduler).triggered
+
+    files.write_history(HEALTHY)
+    assert check(scheduler).conditions == []
+
+    files.write_history(BELOW_REORDER_POINT)
+    result = check(scheduler)
+    assert result.new == ['below_reorder_point'] and result.triggered
+    assert len(trigger.calls) == 2
+
+
+def test_new_condition_is_held_during_the_cooldown(files):
+    trigger = FakeTrigger()
+    scheduler = make_scheduler(trigger, cooldown=3600)
+    files.write_history(BELOW_REORDER_POINT)
+    assert check(scheduler).triggered  # no run before, so no cooldown yet
+
+    files.write_history(BELOW_SAFETY_STOCK)
+    result = check(scheduler)
+    assert result.new == ['below_safety_stock'] and not result.triggered
+    # Pending conditions are checked again even though the files did not change
+    result = check(scheduler)
+    assert not result.skipped and result.new == ['below_safety_stock'] and not result.triggered
+    assert scheduler.status()['parts'][PART]['pending']
+    assert len(trigger.calls) == 1
+
+    scheduler.config['cooldown'] = 0
+    trigger.busy = True
+    assert not check(scheduler).triggered  # still pending while no run can start
+    trigger.busy = False
+    result = check(scheduler)
+    assert result.new == ['below_safety_stock'] and result.triggered
+    assert trigger.calls[-1] == ('limited', f"{PART}: below_safety_stock")
+    assert not scheduler.status()['parts'][PART]['pending']
+
+
+def test_availability_change_fires_once_per_change(files):
+    trigger = FakeTrigger()
+    scheduler = make_scheduler(trigger)
+    assert check(scheduler).conditions == []  # the first check only records the availability
+
+    files.write_suppliers({'Festo': 'Not Available', 'Bosch': 'Limited Stock'})
+    result = check(scheduler)
+    assert result.new == ['availability_changed'] and result.triggered
+
+    files.touch()
+    assert check(scheduler).conditions == []
+
+    files.write_suppliers({'Festo': 'Not Available', 'Bosch': 'Not Available'})
+    result = check(scheduler)
+    assert result.new == ['availability_changed'] and result.triggered
+    assert [reason for _, reason in trigger.calls] == [f"{PART}: availability_changed"] * 2
@@ -0,0 +1,69 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src.supplier_analysis.order_allocation import allocate_order
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+LIMITED_SUPPLIERS = os.path.join(PROJECT_ROOT, 'src', 'supplier_analysis', 'suppliers_limited.csv')
+
+
+def make_suppliers(*rows):
+    """Supplier table from (name, availability, price, minimum order, defect rate, on-time rate) tuples."""
+    return pd.DataFrame([{'supplier_name': name, 'availability': availability, 'price_per_unit': price,
+                          'minimum_order_quantity': moq, 'quality_defect_rate': defect, 'on_time_delivery_rate': on_time}
+                         for name, availability, price, moq, defect, on_time in rows])
+
+
+def test_small_order_rounds_up_to_minimum_order():
+    result = allocate_order(pd.read_csv(LIMITED_SUPPLIERS), 4)
+    assert result['feasible']
+    assert len(result['allocations']) == 1
+    allocation = result['allocations'][0]
+    assert allocation['supplier'] == 'PremiumTools'  # the only supplier with a minimum order of 5
+    assert allocation['quantity'] == 5
+    assert result['total_quantity'] == 5
+    assert result['expected_total_cost'] >= result['lower_bound']
+
+
+def test_split_respects_share_cap():
+    suppliers = make_suppliers(('Cheap', 'Available', 100.0, 10, '0.1%', '99%'),
+                               ('Dear', 'Available', 120.0, 10, '0.1%', '99%'))
+    assert [a['supplier'] for a in allocate_order(suppliers, 100)['allocations']] == ['Cheap']
+
+    result = allocate_order(suppliers, 100, max_supplier_share=0.6)
+    assert {a['supplier']: a['quantity'] for a in result['allocations']} == {'Cheap': 60, 'Dear': 40}
+    assert result['optimality_gap'] == 0
+
+
+def test_limited_stock_supplier_is_capped():
+    suppliers = make_suppliers(('Limited', 'Limited Stock', 100.0, 10, '0.1%', '99%'),
+                               ('Regular', 'Available', 110.0, 10, '0.1%', '99%'))
+    result = allocate_order(suppliers, 100)
+    assert {a['supplier']: a['quantity'] for a in result['allocations']} == {'Limited': 50, 'Regular': 50}
+
+
+def test_risk_limits_exclude_suppliers():
+    suppliers = make_suppliers(('Risky', 'Available', 90.0, 10, '2%', '70%'),
+                               ('Safe', 'Available', 120.0, 10, '0.1%', '99%'))
+    result = allocate_order(suppliers, 50, max_defect_rate=0.01, min_on_time_rate=0.9)
+    assert [a['supplier'] for a in result['allocations']] == ['Safe']
+    assert [e['supplier'] for e in result['excluded']] == ['Risky']
+
+
+def test_infeasible_without_orderable_suppliers():
+    suppliers = make_suppliers(('Gone', 'Not Available', 100.0, 10, '0.1%', '99%'),
+                               ('Risky', 'Available', 90.0, 10, '5%', '99%'))
+    result = allocate_order(suppliers, 20, max_defect_rate=0.01)
+    assert not result['feasible']
+    assert result['allocations'] == []
+    assert result['lower_bound'] is None
+    assert {e['supplier'] for e in result['excluded']} == {'Gone', 'Risky'}
+
+
+def test_non_positive_quantity_is_rejected():
+    suppliers = make_suppliers(('Cheap', 'Available', 100.0, 10, '0.1%', '99%'))
+    for quantity in (0, -5):
+        with pytest.raises(ValueError):
+            allocate_order(suppliers, quantity)
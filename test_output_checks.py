@@ -0,0 +1,28 @@
+import pandas as pd
+
+from src.supplier_analysis.cancellation import RunControl
+from src.supplier_analysis.supplier_analysis import check_availability_output, check_summary_sent
+
+NO_STOCK = pd.DataFrame({'supplier_name': ['Festo', 'Bosch'], 'availability': ['Not Available', 'Discontinued']})
+
+
+def test_no_stock_needs_the_statement():
+    assert check_availability_output("CRITICAL SUPPLY CHAIN RISK: no supplier in the database has stock.", NO_STOCK) is None
+    assert check_availability_output("None of the current suppliers have available stock.", NO_STOCK) is None
+    assert check_availability_output("Festo is the critical supplier with stock for this valve.", NO_STOCK) is not None
+    assert check_availability_output("No supplier issues found.", NO_STOCK) is not None
+
+
+def test_in_stock_suppliers_must_be_named():
+    suppliers = pd.DataFrame({'supplier_name': ['Festo', 'Bosch'], 'availability': ['Available', 'Limited Stock']})
+    assert check_availability_output("Festo and Bosch have stock.", suppliers) is None
+    assert check_availability_output("Only Festo has stock.", suppliers) == "it does not name Bosch"
+
+
+def test_summary_check_counts_only_the_runs_own_emails():
+    run, other_run = RunControl(), RunControl()
+    before = run.email_attempts
+    other_run.email_attempts += 1  # e.g. an abandoned run or a concurrent worker sending mail
+    assert check_summary_sent(run, before) is not None
+    run.email_attempts += 1
+    assert check_summary_sent(run, before) is None
@@ -0,0 +1,90 @@
+import asyncio
+import os
+
+import httpx
+
+from src.supplier_analysis.page_fetcher import PageFetcher
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+PAGE_DIR = os.path.join(PROJECT_ROOT, 'benchmarks', 'fixtures', 'pages')
+
+
+class FakeSite:
+    """httpx transport serving the canned benchmark pages with ETags, recording the requests."""
+
+    def __init__(self):
+        self.pages = {}
+        for name in os.listdir(PAGE_DIR):
+            with open(os.path.join(PAGE_DIR, name), 'rb') as f:
+                self.pages[name] = f.read()
+        self.versions = {}
+        self.requests = []
+
+    def handler(self, request):
+        self.requests.append(request)
+        name = request.url.path.strip('/')
+        if name == 'missing':
+            return httpx.Response(404)
+        if name == 'large':
+            return httpx.Response(200, headers={'Content-Type': 'text/html; charset=utf-8'},
+                                  content=b'<p>Datasheet and CAD downloads.</p>\n' * 5000)
+        etag = f'"{name}-{self.versions.get(name, 1)}"'
+        if request.headers.get('If-None-Match') == etag:
+            return httpx.Response(304, headers={'ETag': etag})
+        return httpx.Response(200, headers={'Content-Type': 'text/html; charset=utf-8', 'ETag': etag},
+                              content=self.pages[name])
+
+
+def make_fetcher(site, **limits):
+    return PageFetcher(limits, transport=httpx.MockTransport(site.handler))
+
+
+def fetch(fetcher, *names):
+    return asyncio.run(fetcher.fetch_all([f"https://shop.example/{name}" for name in names]))
+
+
+def test_reads_structured_and_text_markers():
+    site = FakeSite()
+    schema, text = fetch(make_fetcher(site), 'schema_offer.html', 'text_offer.html')
+    # Structured offer data wins over the amounts in scripts, styles and the footer
+    assert schema.prices == ('151.20 USD',)
+    assert schema.stock == 'in stock'
+    assert text.status == 200 and text.prices and text.error is None
+    assert not schema.cached and not schema.truncated
+
+
+def test_fresh_pages_come_from_the_cache():
+    site = FakeSite()
+    fetcher = make_fetcher(site, fresh_seconds=300)
+    first, = fetch(fetcher, 'schema_offer.html')
+    second, = fetch(fetcher, 'schema_offer.html')
+    assert len(site.requests) == 1
+    assert second.cached and second.prices == first.prices
+    assert fetcher.stats['cache_hits'] == 1
+
+
+def test_stale_pages_are_revalidated_with_their_etag():
+    site = FakeSite()
+    fetcher = make_fetcher(site, fresh_seconds=0)
+    first, = fetch(fetcher, 'schema_offer.html')
+    second, = fetch(fetcher, 'schema_offer.html')
+    assert site.requests[1].headers['If-None-Match'] == '"schema_offer.html-1"'
+    assert second.cached and second.prices == first.prices and second.stock == first.stock
+    assert fetcher.stats['revalidated'] == 1
+
+    # A changed page is downloaded and scanned again
+    site.versions['schema_offer.html'] = 2
+    site.pages['schema_offer.html'] = site.pages['schema_offer.html'].replace(b'151.20', b'139.00')
+    third, = fetch(fetcher, 'schema_offer.html')
+    assert not third.cached and third.prices == ('139.00 USD',)
+    assert fetcher.stats['revalidated'] == 1
+
+
+def test_limits_pages_and_bytes():
+    site = FakeSite()
+    fetcher = make_fetcher(site, max_pages=2, max_bytes=4096)
+    pages = fetch(fetcher, 'large', 'missing', 'schema_offer.html', 'large')
+    assert [page.url.rsplit('/', 1)[1] for page in pages] == ['large', 'missing']
+    large, missing = pages
+    assert large.truncated and large.prices == ()
+    assert missing.status == 404 and missing.error == 'HTTP 404'
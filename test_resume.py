@@ -0,0 +1,36 @@
+import os
+
+from benchmarks.fakes import FakeLLM
+from benchmarks.run_benchmarks import benchmark_environment
+from src.supplier_analysis import supplier_analysis
+from src.supplier_analysis.run_state import TaskCheckpointStore
+
+TASKS = ['demand_forecast', 'availability_analysis', 'alternative_supplier_research', 'supplier_ranking',
+         'executive_summary']
+
+# Auto policy on, with a baseline model other than the fast model so the policy applies
+AUTO_POLICY = """
+[tool.crewai.models]
+model = "gpt-4o"
+
+[tool.crewai.models.auto]
+enabled = true
+"""
+
+
+def test_resume_with_the_auto_policy_reuses_the_outputs_unchecked(tmp_path, monkeypatch):
+    # Every configured model is served by the fake LLM under its own name
+    monkeypatch.setattr(supplier_analysis, 'build_llm', lambda choice, model=None: FakeLLM(model=model or choice.model))
+    store = TaskCheckpointStore(str(tmp_path / 'checkpoints.db'))
+    with benchmark_environment() as sink:
+        with open(os.environ['SUPPLIER_ANALYSIS_CONFIG'], 'a') as f:
+            f.write(AUTO_POLICY)
+        supplier_analysis.run_analysis('limited', checkpoints=store, run_id='first')
+        assert len(sink.messages) == 1
+
+        outputs = []
+        supplier_analysis.run_analysis('limited', checkpoints=store, run_id='second', resume_from='first',
+                                       task_callback=outputs.append)
+    # The restored summary passes although this run sent no email
+    assert [output.name for output in outputs] == TASKS
+    assert len(sink.messages) == 1
@@ -0,0 +1,201 @@
+import asyncio
+import time
+
+import pytest
+from duckduckgo_search.exceptions import DuckDuckGoSearchException, RatelimitException
+
+from src.supplier_analysis import search_limiter as search_limiter_module
+from src.supplier_analysis import search_providers
+from src.supplier_analysis.search_limiter import SearchLimiter, SearchUnavailable
+from src.supplier_analysis.search_providers import RateLimitedSearchClient
+
+
+class RateLimited(Exception):
+    pass
+
+
+def make_limiter(**limits):
+    # Fast defaults: no throttling and tiny backoff delays
+    return SearchLimiter({'rate': 1000.0, 'burst': 1000, 'backoff_base': 0.001, 'backoff_max': 0.002, **limits})
+
+
+def flaky(failures, result='ok'):
+    """Coroutine function that raises RateLimited ``failures`` times and then returns ``result``."""
+    calls = []
+
+    async def func():
+        calls.append(time.monotonic())
+        if len(calls) <= failures:
+            raise RateLimited("202 Ratelimit")
+        return result
+    func.calls = calls
+    return func
+
+
+def call(limiter, backend, func, retry_on=(RateLimited,)):
+    return asyncio.run(limiter.acall(backend, func, retry_on=retry_on))
+
+
+def test_retries_rate_limited_calls():
+    limiter = make_limiter(max_retries=3)
+    func = flaky(2)
+    assert call(limiter, 'html', func) == 'ok'
+    assert len(func.calls) == 3
+    counters = limiter.counters()
+    assert counters[('html', 'rate_limited')] == 2
+    assert counters[('html', 'retried')] == 2
+    assert counters[('html', 'requests')] == 3
+
+
+def test_gives_up_after_max_retries():
+    limiter = make_limiter(max_retries=2, failure_threshold=100)
+    func = flaky(10)
+    with pytest.raises(SearchUnavailable):
+        call(limiter, 'html', func)
+    assert len(func.calls) == 3
+
+
+def test_backoff_is_exponential_and_capped(monkeypatch):
+    limiter = make_limiter(max_retries=4, failure_threshold=100, backoff_base=1.0, backoff_max=3.0)
+    bounds, sleeps = [], []
+    # Full jitter draws from [0, bound]; taking the bound shows the schedule without waiting for it
+    monkeypatch.setattr(search_limiter_module.random, 'uniform', lambda low, high: bounds.append(high) or high)
+
+    async def sleep(delay):
+        sleeps.append(delay)
+    monkeypatch.setattr(search_limiter_module.asyncio, 'sleep', sleep)
+    assert call(limiter, 'html', flaky(4)) == 'ok'
+    assert bounds == [1.0, 2.0, 3.0, 3.0]
+    assert sleeps == bounds
+
+
+def test_circuit_breaker_opens_and_recovers():
+    limiter = make_limiter(max_retries=0, failure_threshold=2, cooldown=0.2)
+    for _ in range(2):
+        with pytest.raises(SearchUnavailable):
+            call(limiter, 'html', flaky(1))
+    assert limiter.circuit_open
+
+    func = flaky(0)
+    with pytest.raises(SearchUnavailable):
+        call(limiter, 'lite', func)
+    assert func.calls == []  # rejected without calling the backend
+    assert limiter.counters()[('lite', 'rejected')] == 1
+    assert 'supplier_analysis_search_circuit_open 1' in limiter.render_prometheus()
+
+    time.sleep(0.25)
+    assert not limiter.circuit_open
+    assert call(limiter, 'lite', func) == 'ok'
+
+
+def test_success_resets_consecutive_failures():
+    limiter = make_limiter(max_retries=1, failure_threshold=2)
+    for _ in range(3):
+        # One rate-limited attempt followed by a success never reaches the threshold of two in a row
+        assert call(limiter, 'html', flaky(1)) == 'ok'
+    assert not limiter.circuit_open
+
+
+def test_token_bucket_throttles_bursts():
+    limiter = make_limiter(rate=20.0, burst=1)
+    started = time.monotonic()
+    for _ in range(3):
+        call(limiter, 'html', flaky(0))
+    # The first call uses the burst token, the next two wait 1/20 s each
+    assert time.monotonic() - started >= 0.09
+    assert limiter.counters()[('html', 'throttled')] == 2
+
+
+def test_async_calls_share_the_concurrency_limit():
+    limiter = make_limiter(concurrency=2)
+    in_flight, peak = 0, 0
+
+    async def search():
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        return 'ok'
+
+    async def main():
+        return await asyncio.gather(*(limiter.acall('html', search) for _ in range(6)))
+
+    assert asyncio.run(main()) == ['ok'] * 6
+    assert peak == 2
+
+
+def test_async_retries_rate_limited_calls():
+    limiter = make_limiter(max_retries=3)
+    attempts = []
+
+    async def search():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimited("202 Ratelimit")
+        return 'ok'
+
+    assert asyncio.run(limiter.acall('html', search, retry_on=(RateLimited,))) == 'ok'
+    assert limiter.counters()[('html', 'retried')] == 2
+
+
+def test_search_client_retries_ddgs_auto_backend(monkeypatch):
+    limiter = make_limiter(max_retries=3)
+    monkeypatch.setattr(search_providers, 'search_limiter', limiter)
+
+    class FakeDDGS:
+        def __init__(self):
+            self.calls = []
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return None
+
+        def text(self, keywords, backend, max_results=None):
+            self.calls.append(backend)
+            if len(self.calls) == 1:
+                # What DDGS raises once every backend tried by 'auto' was rate limited
+                raise DuckDuckGoSearchException(RatelimitException("202 Ratelimit"))
+            return [{'title': keywords, 'href': 'https://example.com', 'body': 'SMC valve'}][:max_results]
+
+    ddgs = FakeDDGS()
+
+    async def main():
+        async with RateLimitedSearchClient(lambda: ddgs) as client:
+            return await client.atext('SMC valve', max_results=5)
+
+    assert asyncio.run(main())[0]['title'] == 'SMC valve'
+    assert ddgs.calls == ['auto', 'auto']
+    assert limiter.counters()[('auto', 'retried')] == 1
+
+
+def test_concurrent_searches_use_their_own_client(monkeypatch):
+    monkeypatch.setattr(search_providers, 'search_limiter', make_limiter(concurrency=3))
+    clients = []
+
+    class FakeDDGS:
+        def __init__(self):
+            clients.append(self)
+            self.busy = False
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return None
+
+        def text(self, keywords, backend, max_results=None):
+            assert not self.busy
+            self.busy = True
+            time.sleep(0.02)
+            self.busy = False
+            return [{'title': keywords, 'href': 'https://example.com', 'body': keywords}]
+
+    async def main():
+        async with RateLimitedSearchClient(FakeDDGS) as client:
+            return await asyncio.gather(*(client.atext(f"query {i}") for i in range(3)))
+
+    assert [results[0]['title'] for results in asyncio.run(main())] == ['query 0', 'query 1', 'query 2']
+    assert len(clients) == 3
@@ -0,0 +1,37 @@
+import os
+
+from src.supplier_analysis.static_assets import AssetManifest
+
+ACCEPT_ANY = {'br': True, 'gzip': True}
+
+
+def write(path, text, mtime):
+    with open(path, 'w') as f:
+        f.write(text)
+    os.utime(path, (mtime, mtime))
+
+
+def test_edited_asset_replaces_its_old_hash(tmp_path):
+    css = tmp_path / 'styles.css'
+    write(css, 'body { color: red; }', 1_000_000)
+    manifest = AssetManifest(str(tmp_path)).build()
+    old_url = manifest.url('styles.css')
+    old_name = old_url.split('/assets/', 1)[1]
+    assert manifest.encoded(old_name, ACCEPT_ANY)[0] == b'body { color: red; }'
+
+    write(css, 'body { color: blue; }', 1_000_100)
+    new_url = manifest.url('styles.css')
+    assert new_url != old_url
+    assert manifest.encoded(new_url.split('/assets/', 1)[1], ACCEPT_ANY)[0] == b'body { color: blue; }'
+    assert manifest.encoded(old_name, ACCEPT_ANY) is None
+    assert len(manifest._assets) == 1
+
+
+def test_touched_asset_keeps_its_hash(tmp_path):
+    js = tmp_path / 'app.js'
+    write(js, 'console.log(1);', 1_000_000)
+    manifest = AssetManifest(str(tmp_path)).build()
+    url = manifest.url('app.js')
+    os.utime(js, (1_000_100, 1_000_100))
+    assert manifest.url('app.js') == url
+    assert manifest.encoded(url.split('/assets/', 1)[1], ACCEPT_ANY) is not None
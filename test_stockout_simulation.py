@@ -0,0 +1,142 @@
+import pandas as pd
+
+from src.supplier_analysis.stockout_simulation import (build_demand_profile, format_demand_risk_table, format_risk_table,
+                                                       parse_rate, simulate_demand_risk, simulate_reorder_risk)
+
+# Fewer trajectories than the pipeline uses keep the tests fast; the comparisons below hold with a wide margin
+TRAJECTORIES = 4000
+
+
+def make_history():
+    dates = pd.date_range('2024-01-01', periods=24, freq='15D')
+    return pd.DataFrame({
+        'date': dates.strftime('%Y-%m-%d'),
+        'valves_used': [10, 12, 8, 15, 9, 11] * 4,
+        'inventory_level': [40] * 23 + [20],
+        'lead_time_days': [0, 30, 0, 0, 35, 0] * 4,
+    })
+
+
+def make_suppliers(*rows):
+    """Supplier table from (name, availability, on-time rate, defect rate, minimum order) tuples."""
+    return pd.DataFrame([{'supplier_name': name, 'availability': availability, 'on_time_delivery_rate': on_time,
+                          'quality_defect_rate': defect, 'minimum_order_quantity': moq}
+                         for name, availability, on_time, defect, moq in rows])
+
+
+def risk(df, supplier, quantity):
+    return df[(df['supplier'] == supplier) & (df['reorder_quantity'] == quantity)].iloc[0]
+
+
+def test_parse_rate():
+    assert parse_rate('98%') == 0.98
+    assert parse_rate(0.25) == 0.25
+    assert parse_rate(2) == 0.02
+    assert parse_rate(' 0.5% ') == 0.005
+
+
+def test_demand_profile():
+    profile = build_demand_profile(make_history())
+    assert profile['current_inventory'] == 20
+    assert sorted(set(profile['lead_times'])) == [30, 35]
+    assert 0 < profile['event_probability'] <= 1
+
+
+def test_larger_orders_lower_stockout_risk():
+    suppliers = make_suppliers(('A', 'Available', '95%', '0.5%', 0))
+    df = simulate_reorder_risk(make_history(), suppliers, candidate_quantities=[5, 50, 200],
+                               n_trajectories=TRAJECTORIES)
+    probabilities = [risk(df, 'A', q)['stockout_probability'] for q in (5, 50, 200)]
+    assert probabilities == sorted(probabilities, reverse=True)
+    assert probabilities[0] > probabilities[-1]
+    assert risk(df, 'A', 200)['expected_ending_inventory'] > risk(df, 'A', 5)['expected_ending_inventory']
+
+
+def test_supplier_attributes_shift_risk():
+    suppliers = make_suppliers(('Reliable', 'Available', '100%', '0%', 0),
+                               ('Late', 'Available', '10%', '0%', 0),
+                               ('Limited', 'Limited Stock', '100%', '0%', 0),
+                               ('Gone', 'Not Available', '100%', '0%', 0))
+    df = simulate_reorder_risk(make_history(), suppliers, candidate_quantities=[40], n_trajectories=TRAJECTORIES)
+    assert set(df['supplier']) == {'Reliable', 'Late', 'Limited'}
+    reliable = risk(df, 'Reliable', 40)
+    assert risk(df, 'Late', 40)['expected_shortfall'] > reliable['expected_shortfall']
+    assert risk(df, 'Limited', 40)['fill_rate'] < reliable['fill_rate']
+
+
+def test_minimum_order_quantity_raises_quantity():
+    suppliers = make_suppliers(('Bulk', 'Available', '95%', '0.5%', 60))
+    df = simulate_reorder_risk(make_history(), suppliers, candidate_quantities=[10, 30, 90],
+                               n_trajectories=TRAJECTORIES)
+    assert list(df['reorder_quantity']) == [60, 90]
+
+
+def test_seeded_runs_are_reproducible():
+    suppliers = make_suppliers(('A', 'Available', '90%', '1%', 0))
+    first = simulate_reorder_risk(make_history(), suppliers, n_trajectories=TRAJECTORIES, seed=7)
+    second = simulate_reorder_risk(make_history(), suppliers, n_trajectories=TRAJECTORIES, seed=7)
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_no_orderable_supplier_gives_baseline():
+    suppliers = make_suppliers(('Gone', 'Not Available', '100%', '0%', 0))
+    df = simulate_reorder_risk(make_history(), suppliers, n_trajectories=TRAJECTORIES)
+    assert list(df['supplier']) == ['No orderable supplier']
+    assert df['reorder_quantity'].iloc[0] == 0
+    # 20 units on hand against about 45 units of expected demand over lead time plus review period
+    assert df['stockout_probability'].iloc[0] > 0.8
+    assert 'No orderable supplier' in format_risk_table(df)
+
+
+def make_steady_history(days=60, daily_use=2, lead_time=10, inventory=10):
+    """History with the same demand every day and one lead time, so every trajectory is identical."""
+    dates = pd.date_range('2024-01-01', periods=days, freq='D')
+    return pd.DataFrame({'date': dates.strftime('%Y-%m-%d'), 'valves_used': [daily_use] * days,
+                         'inventory_level': [inventory] * days, 'lead_time_days': [lead_time] * days})
+
+
+def test_fill_rate_and_shortfall_figures():
+    # 2 units a day: 20 during the 10-day lead time, 60 in the 30-day review period, 80 in total;
+    # 10 units on hand leave 10 short before the order arrives
+    suppliers = make_suppliers(('Exact', 'Available', '100%', '0%', 0))
+    df = simulate_reorder_risk(make_steady_history(), suppliers, candidate_quantities=[40, 100], n_trajectories=200)
+    large = risk(df, 'Exact', 100)
+    assert large['stockout_probability'] == 1.0
+    assert large['expected_shortfall'] == 10
+    assert large['fill_rate'] == 1 - 10 / 80
+    assert large['expected_ending_inventory'] == 40
+    small = risk(df, 'Exact', 40)
+    assert small['expected_shortfall'] == 30  # another 20 short in the review period
+    assert small['fill_rate'] == 1 - 30 / 80
+    assert small['expected_ending_inventory'] == 0
+
+    baseline = simulate_reorder_risk(make_steady_history(), make_suppliers(('Gone', 'Not Available', '100%', '0%', 0)),
+                                     n_trajectories=200)
+    assert baseline['expected_shortfall'].iloc[0] == 70
+    assert baseline['fill_rate'].iloc[0] == 1 - 70 / 80
+
+
+def test_seed_selects_the_sample():
+    suppliers = make_suppliers(('A', 'Available', '90%', '1%', 0))
+    first = simulate_reorder_risk(make_history(), suppliers, n_trajectories=TRAJECTORIES, seed=7)
+    other = simulate_reorder_risk(make_history(), suppliers, n_trajectories=TRAJECTORIES, seed=8)
+    assert not first['expected_shortfall'].equals(other['expected_shortfall'])
+
+
+def test_demand_risk_does_not_need_a_supplier():
+    # Like an ideal supplier: the whole order arrives on time and without defects
+    df = simulate_demand_risk(make_steady_history(), candidate_quantities=[100, 40], n_trajectories=200)
+    assert list(df['reorder_quantity']) == [40, 100]
+    assert 'supplier' not in df.columns
+    assert list(df['expected_shortfall']) == [30, 10]
+    assert list(df['expected_ending_inventory']) == [0, 40]
+
+    ideal = make_suppliers(('Ideal', 'Available', '100%', '0%', 0))
+    by_supplier = simulate_reorder_risk(make_history(), ideal, candidate_quantities=[5, 50, 200],
+                                        n_trajectories=TRAJECTORIES)
+    alone = simulate_demand_risk(make_history(), candidate_quantities=[5, 50, 200], n_trajectories=TRAJECTORIES)
+    probabilities = list(alone['stockout_probability'])
+    assert probabilities == sorted(probabilities, reverse=True)
+    for quantity, figures in alone.set_index('reorder_quantity').iterrows():
+        assert abs(figures['fill_rate'] - risk(by_supplier, 'Ideal', quantity)['fill_rate']) < 0.05
+    assert format_demand_risk_table(alone).splitlines()[1].split()[0] == '5'
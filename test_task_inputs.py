@@ -0,0 +1,43 @@
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+from src.supplier_analysis.supplier_analysis import AS_OF_DATE, load_scenario_inputs
+from src.supplier_analysis.task_inputs import TaskInputs, task_input_key, tasks_fingerprint
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'supplier_analysis')
+
+
+def make_task(name, description):
+    agent = SimpleNamespace(role='Analyst', goal='goal', backstory='backstory', llm=SimpleNamespace(model='gpt-4o-mini'))
+    return SimpleNamespace(name=name, description=description, expected_output='a report', agent=agent)
+
+
+def test_demand_state_leaves_the_date_to_the_run():
+    inputs = load_scenario_inputs(os.path.join(DATA_DIR, 'suppliers.csv'), os.path.join(DATA_DIR, 'valve_history.csv'))
+    assert f"as of {AS_OF_DATE}" in inputs.demand_state
+    assert datetime.now().strftime('%Y-%m-%d') not in inputs.demand_state
+
+
+def test_demand_state_does_not_depend_on_the_suppliers():
+    history_path = os.path.join(DATA_DIR, 'valve_history.csv')
+    standard = load_scenario_inputs(os.path.join(DATA_DIR, 'suppliers.csv'), history_path)
+    limited = load_scenario_inputs(os.path.join(DATA_DIR, 'suppliers_limited.csv'), history_path)
+    assert standard.demand_state == limited.demand_state
+    assert "Stockout risk simulation" in standard.demand_state  # from the history alone
+    assert standard.risk_table != limited.risk_table  # the per-supplier simulation goes to the ranking
+
+
+def test_fingerprint_follows_file_content(tmp_path):
+    data = tmp_path / 'history.csv'
+    data.write_text('date,valves_used\n2024-01-01,10\n')
+    task = make_task('demand_forecast', f"State as of {AS_OF_DATE}")
+    task_inputs = {'demand_forecast': TaskInputs(files=(str(data),))}
+    fingerprint = tasks_fingerprint([task], task_inputs)
+    key = task_input_key(task, task_inputs['demand_forecast'], {})
+    assert tasks_fingerprint([task], task_inputs) == fingerprint
+
+    data.write_text('date,valves_used\n2024-01-01,12\n')
+    os.utime(data, ns=(0, 1))  # a different modification time, so the digest is recomputed
+    assert tasks_fingerprint([task], task_inputs) != fingerprint
+    assert task_input_key(task, task_inputs['demand_forecast'], {}) != key
@@ -0,0 +1,86 @@
+from src.supplier_analysis.token_accounting import CHARS_PER_TOKEN
+from src.supplier_analysis.tool_output import OutputBudget, ResultEntry, canonical_url
+
+QUERY = 'SMC VQC4101 valve price'
+
+
+def entry(url, title, body, boost=0.0, padding=0):
+    """ResultEntry formatted like the search tools do, with ``padding`` extra characters of text."""
+    return ResultEntry(url, title, body, f"Source: {title}\nURL: {url}\nSummary: {body}\n" + 'x' * padding, boost)
+
+
+def test_canonical_url_ignores_tracking_and_presentation():
+    assert (canonical_url('https://www.example.com/valves/VQC4101/?utm_source=ddg&gclid=abc&color=blue#specs')
+            == canonical_url('http://example.com/valves/VQC4101?color=blue'))
+    assert canonical_url('https://example.com/valves?id=1') != canonical_url('https://example.com/valves?id=2')
+    assert canonical_url('https://example.com') == canonical_url('https://example.com/')
+
+
+def test_tracking_parameter_duplicate_is_dropped():
+    budget = OutputBudget()
+    output = budget.compact(QUERY, [(None, [
+        entry('https://shop.example.com/vqc4101', 'SMC VQC4101 valve', 'SMC VQC4101 valve price 142 EUR in stock'),
+        entry('https://www.shop.example.com/vqc4101/?utm_source=duckduckgo', 'SMC VQC4101 valve offer',
+              'Order the pneumatic valve online with fast shipping'),
+    ])], 'No results.')
+    assert output.count('URL: ') == 1
+    assert 'utm_source' not in output
+    assert output.endswith("(Omitted 1 of 2 results: 1 as duplicates, 0 as lower-ranked results over the 800 token budget)")
+
+
+def test_near_duplicate_body_is_dropped():
+    body = 'The SMC VQC4101-51 5/2 valve is available from stock at a price of 142 EUR per unit, delivery in 3 days'
+    output = OutputBudget().compact(QUERY, [(None, [
+        entry('https://a.example.com/valve', 'SMC VQC4101 at A', body),
+        entry('https://b.example.com/valve', 'SMC VQC4101 at B', body + ' worldwide'),
+        entry('https://c.example.com/valve', 'SMC VQC4101 at C', 'Datasheet and dimensions of the VQC series valves'),
+    ])], 'No results.')
+    assert 'a.example.com' in output and 'c.example.com' in output
+    assert 'b.example.com' not in output
+    assert "1 as duplicates" in output
+
+
+def test_budget_keeps_the_best_results_and_reports_the_rest():
+    # Each entry is ~125 tokens, so a 300 token budget fits two of them
+    size = 100 * CHARS_PER_TOKEN
+    entries = [entry(f"https://site{i}.example.com/", f"Result {i}", f"Listing {i} of pneumatic valve number {i * 7}",
+                     padding=size) for i in range(4)]
+    best = entry('https://best.example.com/', 'SMC VQC4101 valve price', 'SMC VQC4101 valve price 142 EUR', padding=size)
+    output = OutputBudget({'max_tokens': 300}).compact(QUERY, [(None, entries), ('PRICES:', [best])], 'No results.')
+    # The best match is kept from the later section, the next one is the earliest of the equally ranked rest
+    assert 'best.example.com' in output and 'site0.example.com' in output
+    assert output.count('URL: ') == 2
+    assert output.index('site0') < output.index('PRICES:')  # kept results stay in their sections
+    assert output.endswith("(Omitted 3 of 5 results: 0 as duplicates, 3 as lower-ranked results over the 300 token budget)")
+
+
+def test_best_result_is_kept_even_over_budget():
+    huge = entry('https://best.example.com/', 'SMC VQC4101 valve price', 'SMC VQC4101 valve price 142 EUR',
+                 padding=2000 * CHARS_PER_TOKEN)
+    other = entry('https://other.example.com/', 'Pneumatics', 'General catalogue of fittings')
+    output = OutputBudget({'max_tokens': 100}).compact(QUERY, [(None, [other, huge])], 'No results.')
+    assert 'best.example.com' in output
+    assert 'other.example.com' not in output
+    assert "1 as lower-ranked results over the 100 token budget" in output
+
+
+def test_no_results_returns_the_empty_message():
+    assert OutputBudget().compact(QUERY, [(None, []), ('PRICES:', [])], 'No results.') == 'No results.'
+    output = OutputBudget().compact(QUERY, [(None, [entry('https://a.example.com/', 'SMC valve', 'SMC VQC4101')])], '')
+    assert 'Omitted' not in output
+
+
+def test_only_tracking_parameters_are_stripped():
+    assert canonical_url('https://example.com/p?ref=newsletter') == canonical_url('https://example.com/p')
+    assert canonical_url('https://example.com/p?mc_cid=1&mc_eid=2') == canonical_url('https://example.com/p')
+    for key in ('reference', 'refid', 'region'):
+        assert canonical_url(f'https://example.com/p?{key}=1') != canonical_url(f'https://example.com/p?{key}=2')
+
+
+def test_results_without_link_are_not_merged():
+    output = OutputBudget().compact(QUERY, [(None, [
+        entry('', 'SMC VQC4101 at A', 'Valve in stock at supplier A for 142 EUR'),
+        entry('', 'SMC VQC4101 at B', 'Pneumatic valve from distributor B, ships next week'),
+    ])], 'No results.')
+    assert 'at A' in output and 'at B' in output
+    assert 'Omitted' not in output